@@ -1,8 +1,12 @@
 
 # api_main.py
 import fastapi
-from fastapi import FastAPI, File, UploadFile, HTTPException, BackgroundTasks
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi import FastAPI, File, UploadFile, HTTPException, BackgroundTasks, Query
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from typing import Optional
+import io
 import shutil
 import pathlib
 import logging
@@ -10,6 +14,13 @@ import uuid # For unique temporary filenames
 import os # For path manipulation
 from datetime import datetime # Ensure datetime is imported
 import re # Ensure re is imported
+import asyncio
+import math
+import time
+import zipfile
+from contextlib import asynccontextmanager
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
 # --- Import your existing logic ---
 # Use direct imports assuming all files are in the same root directory
@@ -19,6 +30,9 @@ try:
     import excel_writer
     import pdf_writer
     import text_writer
+    import upload_ingest
+    import artifact_index
+    import file_responses
     from pdf_auto.config import BASE_DIR # BASE_DIR should point to the project root
 except ImportError as e:
      print(f"ERROR: Could not import processing modules. Ensure they are accessible.")
@@ -27,6 +41,9 @@ except ImportError as e:
      # raise SystemExit("Core processing modules not found.")
      pass
 
+from config import (OUTPUT_MEDIA_TYPES, PDF_OUTPUT_PROFILES, PDF_UNAVAILABLE_PROFILES, DEFAULT_PDF_PROFILE, API_PROCESS_WORKERS, API_QUEUE_DEPTH, API_RETRY_AFTER_SECONDS, UPLOAD_MAX_BYTES,
+                    BATCH_MAX_FILES, BATCH_MAX_BYTES, BATCH_CONCURRENCY, BATCH_HISTORY)
+
 # --- Configure Logging ---
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -39,11 +56,104 @@ OUTPUT_DIR_API = BASE_DIR / "api_output" # Separate directory for API outputs
 TEMP_DIR.mkdir(exist_ok=True)
 OUTPUT_DIR_API.mkdir(exist_ok=True)
 
+# --- Output Deduplication (content hash + options + config version -> existing outputs) ---
+ARTIFACTS = artifact_index.ArtifactIndex(OUTPUT_DIR_API)
+OUTPUT_FILE_KEYS = {"xlsx": "excel", "pdf": "pdf", "txt": "txt"} # return_format -> key in output_files
+_PENDING_OUTPUTS = {} # dedup key -> Future of the index entry, while the first identical upload is processed
+
+def _output_set_response(entry: dict, deduplicated: bool) -> dict:
+    return {
+        "message": "Processing successful",
+        "output_files": entry["files"], # Dictionary of {type: filename}
+        "base_filename": entry["base_filename"], # Useful for constructing download URLs
+        "deduplicated": deduplicated, # True if an identical upload was processed before
+    }
+
+# --- Processing Pool (CPU-bound work off the event loop) ---
+_PROCESS_POOL = None
+_in_flight = 0 # Requests holding a slot (running or waiting for a worker); only touched on the event loop
+_avg_task_seconds = float(API_RETRY_AFTER_SECONDS)
+
+def _process_pool() -> ProcessPoolExecutor:
+    """ Process pool for parsing/rendering, created on first use. """
+    global _PROCESS_POOL
+    if _PROCESS_POOL is None:
+        _PROCESS_POOL = ProcessPoolExecutor(max_workers=API_PROCESS_WORKERS)
+    return _PROCESS_POOL
+
+def _retry_after_seconds() -> int:
+    """ Estimated wait until a slot frees up: queued tasks ahead, spread over the workers. """
+    waiting = max(0, _in_flight - API_PROCESS_WORKERS) + 1
+    return max(1, math.ceil(_avg_task_seconds * waiting / API_PROCESS_WORKERS))
+
+@asynccontextmanager
+async def _counted_slot():
+    """ Counts one task in _in_flight while it runs or waits for a worker, and feeds the task time average. """
+    global _in_flight, _avg_task_seconds
+    _in_flight += 1
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        _in_flight -= 1
+        _avg_task_seconds = 0.8 * _avg_task_seconds + 0.2 * (time.monotonic() - start)
+
+@asynccontextmanager
+async def processing_slot():
+    """ Reserves one of API_PROCESS_WORKERS + API_QUEUE_DEPTH slots (batch files included), or answers 429 with Retry-After. """
+    if _in_flight >= API_PROCESS_WORKERS + API_QUEUE_DEPTH:
+        retry_after = _retry_after_seconds()
+        logging.warning(f"API: Processing queue full ({_in_flight} requests), rejecting with Retry-After {retry_after}s.")
+        raise HTTPException(status_code=429, detail="Too many files in processing, please retry later.",
+                            headers={"Retry-After": str(retry_after)})
+    async with _counted_slot():
+        yield
+
+async def run_in_process_pool(fn, *args):
+    """ Awaits fn(*args) in the processing pool; a crashed pool is replaced for the next request. """
+    global _PROCESS_POOL
+    try:
+        return await asyncio.wrap_future(_process_pool().submit(fn, *args))
+    except BrokenProcessPool:
+        logging.error("API: Processing pool broke (worker died), starting a new one for the next request.")
+        _PROCESS_POOL = None
+        raise
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    if _PROCESS_POOL is not None:
+        _PROCESS_POOL.shutdown(wait=False, cancel_futures=True)
+
 # --- Create FastAPI app ---
-app = FastAPI(title="PDF Processing API", description="Processes D&M KG PDF files.")
+app = FastAPI(title="PDF Processing API", description="Processes D&M KG PDF files.", lifespan=lifespan)
+
+# --- Upload size limit before the body is read ---
+MULTIPART_OVERHEAD_BYTES = 64 * 1024 # Boundaries and part headers around the PDF
+UPLOAD_LIMITS = {"/process_batch/": BATCH_MAX_BYTES} # Path -> request size limit; default UPLOAD_MAX_BYTES
+
+class UploadSizeLimitMiddleware:
+    """
+    Answers 413 from the Content-Length header alone; ingest_pdf_stream enforces the limit on the bytes too.
+    Plain ASGI middleware: responses pass through untouched (streaming, zero-copy downloads).
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["method"] == "POST":
+            content_length = Headers(scope=scope).get("content-length")
+            limit = UPLOAD_LIMITS.get(scope["path"], UPLOAD_MAX_BYTES)
+            if content_length and content_length.isdigit() and int(content_length) > limit + MULTIPART_OVERHEAD_BYTES:
+                logging.warning(f"API: Rejected {scope['path']} upload of {content_length} bytes (limit {limit}).")
+                response = JSONResponse(status_code=413, content={"detail": f"Upload exceeds the limit of {limit // (1024 * 1024)} MB."})
+                return await response(scope, receive, send)
+        await self.app(scope, receive, send)
+
+app.add_middleware(UploadSizeLimitMiddleware)
 
 # --- Refactored Processing Logic ---
-def run_processing_task(input_pdf_path: pathlib.Path, base_filename: str):
+def run_processing_task(input_pdf_path: pathlib.Path, base_filename: str, pdf_profile: Optional[str] = None):
     """
     Runs the core PDF processing steps (Parse -> Map -> Write Outputs).
     Returns a dictionary with results including paths to generated files or error info.
@@ -85,7 +195,7 @@ def run_processing_task(input_pdf_path: pathlib.Path, base_filename: str):
              logging.warning("Failed to generate Excel file.") # Continue processing other formats
 
         # 4. Write Combined PDF
-        pdf_file = pdf_writer.write_combined_pdf(mapped_data, output_dir, base_filename)
+        pdf_file = pdf_writer.write_combined_pdf(mapped_data, output_dir, base_filename, profile=pdf_profile)
         if pdf_file:
              results["files"]["pdf"] = pdf_file
              logging.info(f"Successfully generated PDF: {pdf_file}")
@@ -121,6 +231,74 @@ def run_processing_task(input_pdf_path: pathlib.Path, base_filename: str):
     return results
 
 
+# --- In-Memory Processing (no disk round-trip) ---
+# Output format -> writer; every writer accepts a binary `sink` instead of an output directory
+IN_MEMORY_WRITERS = {
+    "xlsx": excel_writer.write_to_excel,
+    "pdf": pdf_writer.write_combined_pdf,
+    "txt": text_writer.write_auftrag_export_txt,
+}
+
+def map_uploaded_pdf(pdf_bytes: bytes) -> dict:
+    """ Parses and maps the uploaded PDF bytes. Raises ValueError if either step fails. """
+    extracted_data = pdf_parser.extract_data_from_pdf(pdf_bytes)
+    if not extracted_data or not extracted_data.get("positions"):
+        raise ValueError("PDF Parsing failed to identify any position items.")
+    mapped_data = data_mapper.map_data_to_template(extracted_data)
+    if not mapped_data:
+        raise ValueError("Failed to map extracted data (mapper returned None).")
+    return mapped_data
+
+def run_in_memory_task(pdf_bytes: bytes, output_format: str, pdf_profile: Optional[str] = None) -> bytes:
+    """
+    Parses the uploaded PDF bytes, maps the data and renders a single output format into memory.
+    Returns the generated file content. Raises ValueError if any step fails.
+    """
+    mapped_data = map_uploaded_pdf(pdf_bytes)
+
+    buffer = io.BytesIO()
+    writer_kwargs = {"profile": pdf_profile} if output_format == "pdf" else {}
+    if not IN_MEMORY_WRITERS[output_format](mapped_data, sink=buffer, **writer_kwargs):
+        raise ValueError(f"Failed to generate {output_format.upper()} output.")
+    return buffer.getvalue()
+
+
+# --- Outputs of a stored upload (shared by /process_pdf/ and /process_batch/) ---
+async def existing_outputs(dedup_key: str, filename: str) -> Optional[dict]:
+    """ Index entry of an identical earlier upload; waits if an identical upload is being processed right now. """
+    existing = ARTIFACTS.lookup(dedup_key)
+    if existing is None and dedup_key in _PENDING_OUTPUTS:
+        logging.info(f"API: Identical upload of {filename} is being processed, waiting for its outputs.")
+        existing = await asyncio.shield(_PENDING_OUTPUTS[dedup_key]) # None if that attempt failed
+    return existing
+
+async def process_to_outputs(input_pdf_path: pathlib.Path, base_filename: str, dedup_key: str, pdf_profile: Optional[str]):
+    """
+    Runs run_processing_task in the process pool and records the outputs in ARTIFACTS.
+    Identical uploads arriving meanwhile wait for this result instead of processing again.
+    Returns (index entry, None) or (None, error message).
+    """
+    pending = asyncio.get_running_loop().create_future()
+    _PENDING_OUTPUTS.setdefault(dedup_key, pending)
+    entry, results = None, {}
+    try:
+        logging.info(f"API: Starting processing task for {base_filename}...")
+        results = await run_in_process_pool(run_processing_task, input_pdf_path, base_filename, pdf_profile)
+        logging.info(f"API: Processing task finished for {base_filename}. Success: {results['success']}")
+        if results["success"]:
+            # Return paths relative to the API output directory
+            relative_paths = {
+                key: pathlib.Path(path).name # Return only the filename
+                for key, path in results["files"].items()
+            }
+            entry = ARTIFACTS.record(dedup_key, base_filename, relative_paths)
+    finally:
+        pending.set_result(entry)
+        if _PENDING_OUTPUTS.get(dedup_key) is pending:
+            del _PENDING_OUTPUTS[dedup_key]
+    return entry, (None if entry is not None else results.get("error", "Unknown processing error"))
+
+
 # --- API Endpoint Definition ---
 @app.post("/process_pdf/",
           summary="Process Uploaded PDF",
@@ -129,11 +307,15 @@ def run_processing_task(input_pdf_path: pathlib.Path, base_filename: str):
           response_model=dict # Basic dict response for now
           )
 async def process_pdf_endpoint(
+    request: fastapi.Request,
     # background_tasks: BackgroundTasks, # Keep if needed for background option
-    file: UploadFile = File(..., description="The D&M KG PDF file to process.") # Added description
+    file: UploadFile = File(..., description="The D&M KG PDF file to process."), # Added description
+    return_format: Optional[str] = Query(None, description="If set (xlsx, pdf or txt), the generated file is returned directly in the response instead of being stored for /download."),
+    pdf_profile: Optional[str] = Query(None, description="PDF output profile: standard, draft (fast preview) or archive (compressed, embedded font)."),
     ):
     """
-    API endpoint to upload a PDF, process it, and return file paths.
+    API endpoint to upload a PDF, process it, and return file paths
+    (or, with `return_format`, the generated file itself).
     """
     # --- Input Validation ---
     if not file or not file.filename:
@@ -142,47 +324,75 @@ async def process_pdf_endpoint(
     if not file.filename.lower().endswith(".pdf"):
         logging.warning(f"API: Received invalid file type: {file.filename}")
         raise HTTPException(status_code=400, detail="Invalid file type. Please upload a PDF.")
+    if return_format is not None and return_format.lower() not in IN_MEMORY_WRITERS:
+        raise HTTPException(status_code=400, detail=f"Invalid return_format. Use one of: {', '.join(IN_MEMORY_WRITERS)}.")
+    if pdf_profile is not None and pdf_profile.lower() not in PDF_OUTPUT_PROFILES:
+        raise HTTPException(status_code=400, detail=f"Invalid pdf_profile. Use one of: {', '.join(PDF_OUTPUT_PROFILES)}.")
+    pdf_profile = pdf_profile.lower() if pdf_profile else None
+    if pdf_profile in PDF_UNAVAILABLE_PROFILES:
+        raise HTTPException(status_code=400, detail=f"pdf_profile '{pdf_profile}' is not available on this server: {PDF_UNAVAILABLE_PROFILES[pdf_profile]}.")
 
     temp_pdf_path = None # Initialize outside try
     try:
-        # Create a unique temporary file path
+        # --- Ingest: one pass over the body (hash, size, %PDF, page-1 markers); bad files never reach a worker ---
         temp_id = uuid.uuid4()
-        # Sanitize filename: replace non-alphanumeric (excluding . and -) with underscore
-        safe_filename = re.sub(r'[^\w\.-]', '_', file.filename)
-        temp_pdf_path = TEMP_DIR / f"{temp_id}_{safe_filename}"
-
-        # Save the uploaded file temporarily
+        if return_format is None:
+            # Sanitize filename: replace non-alphanumeric (excluding . and -) with underscore
+            safe_filename = re.sub(r'[^\w\.-]', '_', file.filename)
+            temp_pdf_path = TEMP_DIR / f"{temp_id}_{safe_filename}"
         logging.info(f"API: Receiving file {file.filename}...")
-        with temp_pdf_path.open("wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        logging.info(f"API: Saved PDF temporarily to {temp_pdf_path}")
-
-        # --- Generate Base Filename for output files ---
-        today_str = datetime.now().strftime("%Y%m%d_%H%M%S")
-        base_filename = f"{today_str}_{temp_id}" # Unique base name
-
-        # --- Run processing SYNCHRONOUSLY ---
-        # If processing takes > ~30-60s, consider background tasks
-        logging.info(f"API: Starting synchronous processing task for {base_filename}...")
-        results = run_processing_task(temp_pdf_path, base_filename)
-        logging.info(f"API: Processing task finished for {base_filename}. Success: {results['success']}")
-
-
-        if results["success"]:
-             # Return paths relative to the API output directory
-             relative_paths = {
-                 key: pathlib.Path(path).name # Return only the filename
-                 for key, path in results["files"].items()
-             }
-             logging.info(f"API: Returning success for {base_filename}. Files: {relative_paths}")
-             return {
-                 "message": "Processing successful",
-                 "output_files": relative_paths, # Dictionary of {type: filename}
-                 "base_filename": base_filename, # Useful for constructing download URLs
-             }
-        else:
-            logging.error(f"API: Processing failed for {base_filename}. Error: {results.get('error')}")
-            raise HTTPException(status_code=500, detail=f"Processing failed: {results.get('error', 'Unknown processing error')}")
+        try:
+            upload = await run_in_threadpool(upload_ingest.ingest_pdf_stream, file.file, temp_pdf_path, file.filename)
+        except upload_ingest.UploadRejected as e:
+            raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+        # --- Deduplication: an identical upload (same options, same config version) reuses its outputs ---
+        dedup_key = artifact_index.dedup_key(upload.sha256, pdf_profile or DEFAULT_PDF_PROFILE)
+        existing = await existing_outputs(dedup_key, file.filename)
+        if existing is not None:
+            if return_format is None:
+                logging.info(f"API: {file.filename} was processed before, returning outputs of {existing['base_filename']}.")
+                return _output_set_response(existing, deduplicated=True)
+            stored_name = existing["files"].get(OUTPUT_FILE_KEYS[return_format.lower()])
+            if stored_name:
+                logging.info(f"API: {file.filename} was processed before, returning stored {stored_name}.")
+                return await file_responses.download_response(request, OUTPUT_DIR_API / stored_name, stored_name)
+
+        # Parsing and rendering run in the process pool; the slot bounds running + waiting requests
+        async with processing_slot():
+            # --- In-memory mode: no temp input file, no stored outputs, no second /download request ---
+            if return_format is not None:
+                output_format = return_format.lower()
+                pdf_bytes = upload.content
+                base_filename = f"{datetime.now():%Y%m%d_%H%M%S}_{uuid.uuid4()}"
+                logging.info(f"API: Processing {file.filename} in memory -> {output_format}")
+                headers = {"Content-Disposition": f'attachment; filename="{base_filename}.{output_format}"'}
+                try:
+                    if output_format == "txt":
+                        # TXT rows are streamed in batches while they are generated
+                        mapped_data = await run_in_process_pool(map_uploaded_pdf, pdf_bytes)
+                        rows = text_writer.iter_auftrag_export_txt(mapped_data.get("kopf", {}), mapped_data.get("positionen", []))
+                        return StreamingResponse(rows, media_type=OUTPUT_MEDIA_TYPES[output_format], headers=headers)
+                    content = await run_in_process_pool(run_in_memory_task, pdf_bytes, output_format, pdf_profile)
+                except ValueError as e:
+                    logging.error(f"API: In-memory processing failed for {file.filename}: {e}")
+                    raise HTTPException(status_code=500, detail=f"Processing failed: {e}")
+                return Response(content=content, media_type=OUTPUT_MEDIA_TYPES[output_format], headers=headers)
+
+            logging.info(f"API: Saved PDF temporarily to {temp_pdf_path}")
+
+            # --- Generate Base Filename for output files ---
+            today_str = datetime.now().strftime("%Y%m%d_%H%M%S")
+            base_filename = f"{today_str}_{temp_id}" # Unique base name
+
+            # --- Run processing in the process pool (the event loop keeps serving other requests) ---
+            entry, error = await process_to_outputs(temp_pdf_path, base_filename, dedup_key, pdf_profile)
+            if entry is not None:
+                 logging.info(f"API: Returning success for {base_filename}. Files: {entry['files']}")
+                 return _output_set_response(entry, deduplicated=False)
+            else:
+                logging.error(f"API: Processing failed for {base_filename}. Error: {error}")
+                raise HTTPException(status_code=500, detail=f"Processing failed: {error}")
 
     except HTTPException as http_exc:
          # Don't log again, just re-raise
@@ -205,14 +415,182 @@ async def process_pdf_endpoint(
                   logging.error(f"API: Error deleting temp file {temp_pdf_path}: {e}")
 
 
+# --- Batch Uploads (many PDFs per request, processed concurrently, polled by batch id) ---
+_BATCHES = {} # batch_id -> batch state; finished batches beyond BATCH_HISTORY are dropped
+_BATCH_TASKS = set() # Running batch tasks (a reference keeps them alive until they finish)
+_batch_slots = None # Semaphore(BATCH_CONCURRENCY) shared by all batches, created on the event loop
+
+def _batch_semaphore() -> asyncio.Semaphore:
+    global _batch_slots
+    if _batch_slots is None:
+        _batch_slots = asyncio.Semaphore(BATCH_CONCURRENCY)
+    return _batch_slots
+
+def _ingest_batch_uploads(files: list, batch_dir: pathlib.Path) -> list:
+    """
+    Stores the PDFs of a batch (multipart parts, or the .pdf members of uploaded .zip files) in batch_dir.
+    Returns [{"filename", "path", "upload"} or {"filename", "error"}, ...]; a rejected file does not stop the others.
+    Raises UploadRejected if the batch holds more than BATCH_MAX_FILES PDFs.
+    """
+    items, sources = [], [] # sources: (filename, opener of the PDF stream)
+    for file in files:
+        name = file.filename or "upload"
+        if name.lower().endswith(".zip"):
+            try:
+                archive = zipfile.ZipFile(file.file)
+            except zipfile.BadZipFile:
+                items.append({"filename": name, "error": "Not a valid zip file."})
+                continue
+            for info in archive.infolist():
+                member = pathlib.PurePosixPath(info.filename)
+                if info.is_dir() or member.suffix.lower() != ".pdf" or member.name.startswith(".") or "__MACOSX" in member.parts:
+                    continue
+                sources.append((f"{name}/{info.filename}", lambda archive=archive, info=info: archive.open(info)))
+        elif name.lower().endswith(".pdf"):
+            sources.append((name, lambda file=file: file.file))
+        else:
+            items.append({"filename": name, "error": "Invalid file type. Please upload PDFs or a zip of PDFs."})
+    if len(sources) > BATCH_MAX_FILES:
+        raise upload_ingest.UploadRejected(413, f"Batch holds {len(sources)} PDFs, the limit is {BATCH_MAX_FILES}.")
+
+    for index, (filename, open_stream) in enumerate(sources):
+        safe_filename = re.sub(r'[^\w\.-]', '_', pathlib.PurePosixPath(filename).name)
+        path = batch_dir / f"{index:04d}_{safe_filename}"
+        try:
+            with open_stream() as stream:
+                items.append({"filename": filename, "path": path, "upload": upload_ingest.ingest_pdf_stream(stream, path, filename)})
+        except upload_ingest.UploadRejected as e:
+            items.append({"filename": filename, "error": e.detail})
+        except (OSError, zipfile.BadZipFile) as e: # Corrupt zip member
+            logging.warning(f"API: Could not read batch file {filename}: {e}")
+            items.append({"filename": filename, "error": f"Could not read file: {e}"})
+    return items
+
+async def _process_batch_file(result: dict, item: dict, pdf_profile: Optional[str]):
+    """ Processes one PDF of a batch and fills in its result; errors stay with this file. """
+    entry, deduplicated, error = None, True, None
+    try:
+        dedup_key = artifact_index.dedup_key(item["upload"].sha256, pdf_profile or DEFAULT_PDF_PROFILE)
+        entry = await existing_outputs(dedup_key, item["filename"])
+        if entry is None:
+            async with _batch_semaphore():
+                # An identical file of this or another batch may have finished while waiting
+                entry = await existing_outputs(dedup_key, item["filename"])
+                if entry is None:
+                    result["status"] = "processing"
+                    base_filename = f"{datetime.now():%Y%m%d_%H%M%S}_{uuid.uuid4()}"
+                    # Counted like a single upload (never rejected: the batch was accepted), so uploads
+                    # arriving meanwhile get 429 / Retry-After for the workers this batch keeps busy
+                    async with _counted_slot():
+                        entry, error = await process_to_outputs(item["path"], base_filename, dedup_key, pdf_profile)
+                    deduplicated = False
+    except Exception as e:
+        logging.error(f"API: Batch file {item['filename']} failed: {e}", exc_info=True)
+        error = f"Processing error: {e}"
+    finally:
+        item["path"].unlink(missing_ok=True)
+
+    if entry is not None:
+        result.update(status="completed", output_files=entry["files"], base_filename=entry["base_filename"], deduplicated=deduplicated)
+    else:
+        result.update(status="failed", error=error)
+
+async def _run_batch(batch: dict, items: list, pdf_profile: Optional[str], batch_dir: pathlib.Path):
+    try:
+        await asyncio.gather(*(
+            _process_batch_file(result, item, pdf_profile)
+            for result, item in zip(batch["files"], items) if "upload" in item
+        ), return_exceptions=True)
+    finally:
+        shutil.rmtree(batch_dir, ignore_errors=True)
+        batch["status"] = "completed"
+        batch["finished"] = datetime.now().isoformat(timespec="seconds")
+        counts = _batch_counts(batch)
+        logging.info(f"API: Batch {batch['batch_id']} finished: {counts['completed']} completed, {counts['failed']} failed.")
+        finished = [batch_id for batch_id, state in _BATCHES.items() if state["status"] == "completed"]
+        for batch_id in finished[:-BATCH_HISTORY]:
+            del _BATCHES[batch_id]
+
+def _batch_counts(batch: dict) -> dict:
+    counts = {"pending": 0, "processing": 0, "completed": 0, "failed": 0}
+    for result in batch["files"]:
+        counts[result["status"]] += 1
+    return counts
+
+def _batch_response(batch: dict) -> dict:
+    return {**batch, "total": len(batch["files"]), **_batch_counts(batch)}
+
+@app.post("/process_batch/",
+          summary="Process a Batch of PDFs",
+          description=f"Upload up to {BATCH_MAX_FILES} D&M KG PDFs (several files, or zip archives of PDFs). "
+                      "They are processed concurrently; poll /batch_status/{batch_id} for per-file results, or set wait=true.",
+          status_code=fastapi.status.HTTP_202_ACCEPTED,
+          )
+async def process_batch_endpoint(
+    files: list[UploadFile] = File(..., description="PDF files and/or zip archives of PDF files."),
+    pdf_profile: Optional[str] = Query(None, description="PDF output profile: standard, draft (fast preview) or archive (compressed, embedded font)."),
+    wait: bool = Query(False, description="Wait for the whole batch and return the per-file results (200) instead of a batch id to poll (202)."),
+    ):
+    """ Accepts a batch, stores its PDFs and processes them in the background; one failing PDF does not abort the batch. """
+    if pdf_profile is not None and pdf_profile.lower() not in PDF_OUTPUT_PROFILES:
+        raise HTTPException(status_code=400, detail=f"Invalid pdf_profile. Use one of: {', '.join(PDF_OUTPUT_PROFILES)}.")
+    pdf_profile = pdf_profile.lower() if pdf_profile else None
+    if pdf_profile in PDF_UNAVAILABLE_PROFILES:
+        raise HTTPException(status_code=400, detail=f"pdf_profile '{pdf_profile}' is not available on this server: {PDF_UNAVAILABLE_PROFILES[pdf_profile]}.")
+
+    batch_id = str(uuid.uuid4())
+    batch_dir = TEMP_DIR / f"batch_{batch_id}"
+    batch_dir.mkdir()
+    try:
+        items = await run_in_threadpool(_ingest_batch_uploads, files, batch_dir)
+    except upload_ingest.UploadRejected as e:
+        shutil.rmtree(batch_dir, ignore_errors=True)
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    finally:
+        for file in files:
+            await file.close()
+
+    batch = {
+        "batch_id": batch_id,
+        "status": "processing",
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "finished": None,
+        "files": [
+            {"filename": item["filename"], "status": "pending" if "upload" in item else "failed", "error": item.get("error"),
+             "base_filename": None, "output_files": {}, "deduplicated": False}
+            for item in items
+        ],
+    }
+    _BATCHES[batch_id] = batch
+    logging.info(f"API: Batch {batch_id} accepted with {len(items)} files ({sum('upload' in item for item in items)} valid PDFs).")
+    task = asyncio.create_task(_run_batch(batch, items, pdf_profile, batch_dir))
+    _BATCH_TASKS.add(task)
+    task.add_done_callback(_BATCH_TASKS.discard)
+
+    if wait:
+        await asyncio.shield(task) # A disconnecting client does not cancel the batch
+        return JSONResponse(status_code=200, content=_batch_response(batch))
+    return _batch_response(batch)
+
+@app.get("/batch_status/{batch_id}",
+         summary="Get Batch Progress and Results",
+         description="Per-file status (pending, processing, completed, failed), output files and errors of a batch.",
+         )
+async def batch_status(batch_id: str):
+    batch = _BATCHES.get(batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return _batch_response(batch)
+
+
 # --- Optional: Download Endpoint ---
-@app.get("/download/{filename}",
+@app.api_route("/download/{filename}", methods=["GET", "HEAD"],
          summary="Download Generated File",
-         description="Downloads a previously generated output file (Excel, PDF, or TXT). Use the filename returned by the /process_pdf/ endpoint.",
+         description="Downloads a previously generated output file (Excel, PDF, or TXT). Use the filename returned by the /process_pdf/ endpoint. Supports Range, If-Range, If-None-Match and If-Modified-Since.",
          response_description="The requested file for download.",
          )
-async def download_file(filename: str):
-    """ Downloads a generated file from the API output directory. """
+async def download_file(filename: str, request: fastapi.Request):
+    """ Downloads a generated file from the API output directory (conditional and range requests, see file_responses). """
     # Basic security: prevent path traversal
     if ".." in filename or filename.startswith("/"):
          raise HTTPException(status_code=400, detail="Invalid filename.")
@@ -221,18 +599,33 @@ async def download_file(filename: str):
     logging.info(f"API: Download request for: {filename} (Path: {file_path})")
 
     if file_path.is_file():
-        # Guess media type based on extension
-        media_type = 'application/octet-stream'
-        low_filename = filename.lower()
-        if low_filename.endswith(".xlsx"): media_type = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        elif low_filename.endswith(".pdf"): media_type = 'application/pdf'
-        elif low_filename.endswith(".txt"): media_type = 'text/plain; charset=utf-8' # Specify charset
-
-        return FileResponse(path=str(file_path), media_type=media_type, filename=filename) # Pass filename for browser
+        return await file_responses.download_response(request, file_path, filename)
     else:
         logging.warning(f"API: Download failed - File not found: {file_path}")
         raise HTTPException(status_code=404, detail=f"File not found: {filename}")
 
+# --- ZIP Bundle of all outputs ---
+@app.get("/download_zip/{base_filename}",
+         summary="Download All Generated Files as ZIP",
+         description="Streams a ZIP with every output file (Excel, PDF, TXT) of one processing run. Use the base_filename returned by /process_pdf/.",
+         response_description="ZIP archive of the outputs.",
+         )
+async def download_zip(base_filename: str):
+    """ One request instead of one /download per file; the archive is built while it is sent. """
+    if not re.fullmatch(r"[\w-]+", base_filename):
+        raise HTTPException(status_code=400, detail="Invalid base_filename.")
+
+    # Outputs are named <base_filename>.<ext> or <base_filename>_<suffix>.<ext>
+    files = sorted(
+        (path.name, path) for path in OUTPUT_DIR_API.glob(f"{base_filename}*")
+        if path.is_file() and path.name[len(base_filename):len(base_filename) + 1] in (".", "_")
+    )
+    if not files:
+        logging.warning(f"API: ZIP download failed - no outputs for {base_filename}")
+        raise HTTPException(status_code=404, detail=f"No output files found for: {base_filename}")
+    logging.info(f"API: ZIP download for {base_filename}: {[name for name, _ in files]}")
+    return file_responses.zip_bundle_response(files, f"{base_filename}.zip")
+
 # --- Root endpoint ---
 @app.get("/", include_in_schema=False) # Hide from default docs
 async def read_root():
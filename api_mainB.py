@@ -1,29 +1,36 @@
 # api_main.py
 import fastapi
-from fastapi import FastAPI, File, UploadFile, HTTPException, BackgroundTasks, Depends
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi import FastAPI, File, UploadFile, HTTPException, Query
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-import shutil
 import pathlib
 import logging
 import uuid
 import os
 import datetime
 import re
-from sqlalchemy.orm import Session # Import Session
+import time
+import functools
+import asyncio
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 
 # --- Your processing imports ---
-import pdf_parser
-import data_mapper
-import excel_writer
-import pdf_writer
-import text_writer
-from config import BASE_DIR
+import upload_ingest
+import file_responses
+import artifact_store
+import job_events
+import status_cache
+from fastapi.concurrency import run_in_threadpool
+from config import BASE_DIR, PDF_OUTPUT_PROFILES, PDF_UNAVAILABLE_PROFILES, JOB_EVENTS_MAX_JOBS, JOB_EVENTS_POLL_SECONDS, JOBS_PAGE_SIZE, JOBS_PAGE_MAX
+from typing import Optional
 
 # --- Database Imports ---
 import models # Import your models
+import job_store # Queries of the job tables (one round-trip per job incl. outputs)
 import schemas # Import your Pydantic schemas (create schemas.py based on models)
-from database import SessionLocal, engine, get_db # Import SessionLocal, engine, get_db
+from database import engine, async_session_scope, get_async_engine, pool_stats
 
 # --- Create DB Tables (only needed once, or use Alembic) ---
 # Comment out after first run or use Alembic for migrations
@@ -37,96 +44,120 @@ TEMP_DIR = BASE_DIR / "temp_files"; TEMP_DIR.mkdir(exist_ok=True)
 OUTPUT_DIR_API = BASE_DIR / "api_output"; OUTPUT_DIR_API.mkdir(exist_ok=True)
 INPUT_STORAGE_DIR = BASE_DIR / "input_storage"; INPUT_STORAGE_DIR.mkdir(exist_ok=True) # Store input PDFs persistently
 
-app = FastAPI(title="PDF Processing API", description="Processes PDFs, stores results in DB.")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await run_in_threadpool(job_store.ensure_schema, engine) # Columns / indexes added since the tables were created
+    watcher = asyncio.create_task(watch_job_progress())
+    yield
+    watcher.cancel()
+    await get_async_engine().dispose()
+
+app = FastAPI(title="PDF Processing API", description="Processes PDFs, stores results in DB; job_worker.py processes the queued jobs.", lifespan=lifespan)
+
+# --- Job progress events (server-sent events instead of polling /job_status/) ---
+JOB_EVENTS = job_events.JobEventHub()
+# --- /job_status/ responses, kept fresh by the same watcher (watch_job_progress) ---
+STATUS_CACHE = status_cache.StatusCache()
+
+# --- Connection pool exhausted: ask the client to come back instead of piling up more waiters ---
+@app.exception_handler(PoolTimeoutError)
+async def pool_timeout_handler(request: fastapi.Request, exc: PoolTimeoutError):
+    logging.warning(f"API: No database connection free for {request.url.path}: {exc}")
+    return JSONResponse(status_code=503, content={"detail": "Database busy, please retry."}, headers={"Retry-After": "1"})
 
 # --- CORS ---
 origins = ["http://localhost:3000", "http://127.0.0.1:3000", "http://localhost", "http://127.0.0.1"] # Add others
 app.add_middleware(CORSMiddleware, allow_origins=origins, allow_credentials=True, allow_methods=["*"], allow_headers=["*"])
 
 # =============================================================================
-# Background Task - Processing Logic (Modified)
+# Database access - async engine (database.async_session_scope): queries and pool
+# waits never block the event loop, so status polls do not hold up uploads
 # =============================================================================
-def run_processing_task(db: Session, job_id: str, input_pdf_path: pathlib.Path, original_filename: str):
-    """ Runs PDF processing and updates database. """
-    output_dir = OUTPUT_DIR_API
-    # Generate unique base filename for outputs based on job_id
-    base_filename = f"{datetime.datetime.now():%Y%m%d_%H%M%S}_{job_id}"
-    job = None # Initialize job variable
-
-    try:
-        # --- Get Job from DB ---
-        job = db.query(models.UploadJob).filter(models.UploadJob.job_id == job_id).first()
-        if not job:
-            logging.error(f"Background Task: Job {job_id} not found in DB.")
-            return # Cannot proceed
-
-        # --- Update Job Status to Processing ---
-        job.status = models.JobStatus.PROCESSING
-        db.commit()
-        logging.info(f"Background Task: Started processing job {job_id} for {original_filename}")
-
-        # 1. Parse PDF
-        extracted_data = pdf_parser.extract_data_from_pdf(input_pdf_path)
-        if not extracted_data: raise ValueError("Failed to extract data from PDF.")
-
-        # 2. Map Data
-        mapped_data = data_mapper.map_data_to_template(extracted_data)
-        if not mapped_data: raise ValueError("Failed to map extracted data.")
-
-        output_file_records = [] # To store DB records for output files
-
-        # 3. Write Excel & Record
-        excel_path_str = excel_writer.write_to_excel(mapped_data, output_dir, base_filename)
-        if excel_path_str:
-            excel_filename = pathlib.Path(excel_path_str).name
-            output_file_records.append(models.OutputFile(
-                job_id=job.id, file_type=models.OutputFileType.EXCEL,
-                filename=excel_filename, file_path=str(pathlib.Path(excel_path_str).relative_to(BASE_DIR)) # Store relative path maybe
-            ))
-            logging.info(f"Generated Excel: {excel_filename}")
-        else: logging.warning("Failed to generate Excel file.")
-
-        # 4. Write Combined PDF & Record
-        pdf_path_str = pdf_writer.write_combined_pdf(mapped_data, output_dir, base_filename)
-        if pdf_path_str:
-            pdf_filename = pathlib.Path(pdf_path_str).name
-            output_file_records.append(models.OutputFile(
-                job_id=job.id, file_type=models.OutputFileType.PDF,
-                filename=pdf_filename, file_path=str(pathlib.Path(pdf_path_str).relative_to(BASE_DIR))
-            ))
-            logging.info(f"Generated PDF: {pdf_filename}")
-        else: logging.warning("Failed to generate Combined PDF.")
-
-        # 5. Write TXT & Record
-        txt_path_str = text_writer.write_auftrag_export_txt(mapped_data, output_dir, base_filename)
-        if txt_path_str:
-            txt_filename = pathlib.Path(txt_path_str).name
-            output_file_records.append(models.OutputFile(
-                job_id=job.id, file_type=models.OutputFileType.TXT,
-                filename=txt_filename, file_path=str(pathlib.Path(txt_path_str).relative_to(BASE_DIR))
-            ))
-            logging.info(f"Generated TXT: {txt_filename}")
-        else: logging.warning("Failed to generate TXT file.") # Maybe raise error if TXT is mandatory
-
-        # --- Update Job Status to Completed ---
-        job.status = models.JobStatus.COMPLETED
-        # Add output file records to the session
-        db.add_all(output_file_records)
-        db.commit()
-        logging.info(f"Background Task: Successfully completed job {job_id}")
+_JOB_STATES = OrderedDict() # job_id -> last observed state of the job row (see _job_state)
 
-    except Exception as e:
-        logging.error(f"Background Task: Error processing job {job_id}: {e}", exc_info=True)
-        if job: # Update status to FAILED if job object exists
-            job.status = models.JobStatus.FAILED
-            job.error_message = str(e)[:255] # Truncate error message if needed
-            db.commit()
-    finally:
-        # Optional: Clean up the temporary input PDF (or keep it for debugging)
-        # if input_pdf_path.exists():
-        #     try: input_pdf_path.unlink()
-        #     except OSError: logging.error(f"Error deleting temp file {input_pdf_path}")
-        pass
+def _job_state(job: models.UploadJob) -> dict:
+    state = {"status": job.status.value, "stage": job.stage, "positions": job.position_count,
+             "attempts": job.attempts or 0, "error": job.error_message, "next_attempt_at": job.next_attempt_at}
+    if job.status == models.JobStatus.COMPLETED:
+        state["output_files"] = {output.file_type.value: output.filename for output in job.output_files}
+    return state
+
+async def _load_job_states(job_ids: list) -> dict:
+    """ The rows of all given jobs (outputs joined in, no lazy loads in async code). """
+    async with async_session_scope() as db:
+        jobs = await job_store.load_jobs(db, job_ids)
+        return {job_id: _job_state(job) for job_id, job in jobs.items()}
+
+def _publish_job_changes(job_id: str, state: dict):
+    """ Turns the difference to the last observed state of the job into events. """
+    previous = _JOB_STATES.get(job_id, {})
+    _JOB_STATES[job_id] = state
+    _JOB_STATES.move_to_end(job_id)
+    while len(_JOB_STATES) > JOB_EVENTS_MAX_JOBS:
+        _JOB_STATES.popitem(last=False)
+
+    status, new_attempt = state["status"], state["attempts"] != previous.get("attempts")
+    if status == models.JobStatus.PENDING.value:
+        if status != previous.get("status") or new_attempt:
+            if state["attempts"]:
+                JOB_EVENTS.publish(job_id, "retrying", state["attempts"], attempts=state["attempts"], error=state["error"], next_attempt_at=state["next_attempt_at"])
+            else:
+                JOB_EVENTS.publish(job_id, "queued", 0)
+    elif status == models.JobStatus.PROCESSING.value:
+        if status != previous.get("status") or new_attempt:
+            JOB_EVENTS.publish(job_id, "processing", state["attempts"])
+        if state["positions"] is not None and state["positions"] != previous.get("positions"):
+            JOB_EVENTS.publish(job_id, "parsed", state["attempts"], positions=state["positions"])
+        if state["stage"] and state["stage"] != previous.get("stage"):
+            JOB_EVENTS.publish(job_id, "stage", state["attempts"], stage=state["stage"])
+    elif status != previous.get("status"):
+        if status == models.JobStatus.COMPLETED.value:
+            for file_type, filename in state["output_files"].items():
+                JOB_EVENTS.publish(job_id, "output", state["attempts"], file_type=file_type, filename=filename)
+            JOB_EVENTS.publish(job_id, "completed", state["attempts"], output_files=state["output_files"])
+        else:
+            JOB_EVENTS.publish(job_id, "failed", state["attempts"], error=state["error"])
+
+async def _create_job(job_id: str, original_filename: str, input_path: pathlib.Path, pdf_profile: Optional[str]) -> dict:
+    """ Inserts the queue entry of a new job (and caches its status); returns its state. """
+    checked_at = time.monotonic()
+    async with async_session_scope() as db:
+        # Queued as PENDING: a worker leases it (job_queue.lease_jobs); input path stored relative to BASE_DIR
+        new_job = await job_store.create_job(db, job_id, original_filename, str(input_path.relative_to(BASE_DIR)), pdf_profile)
+    logging.info(f"API: Created Job {job_id} (DB ID: {new_job.id}) for {original_filename}")
+    STATUS_CACHE.put(job_id, job_store.job_status_response(new_job), checked_at)
+    return _job_state(new_job)
+
+async def _load_job_status(job_id: str) -> Optional[schemas.JobStatusResponse]:
+    async with async_session_scope() as db:
+        job = await job_store.load_job(db, job_id) # Job and outputs in one query
+        return job_store.job_status_response(job) if job else None
+
+async def watch_job_progress():
+    """
+    Feeds JOB_EVENTS and keeps STATUS_CACHE current: one query per JOB_EVENTS_POLL_SECONDS for all jobs
+    with an open event stream or a recently polled, unfinished status (status changes written by the workers).
+    """
+    while True:
+        await asyncio.sleep(JOB_EVENTS_POLL_SECONDS)
+        streamed, polled = JOB_EVENTS.subscribed_jobs(), STATUS_CACHE.watched_jobs()
+        if not streamed and not polled:
+            continue
+        checked_at = time.monotonic()
+        try:
+            async with async_session_scope() as db:
+                jobs = await job_store.load_jobs(db, set(streamed) | set(polled))
+        except Exception as e:
+            logging.error(f"API: Reading job progress failed: {e}")
+            continue
+        for job_id in streamed:
+            if job_id in jobs:
+                _publish_job_changes(job_id, _job_state(jobs[job_id]))
+        for job_id in polled:
+            if job_id in jobs:
+                STATUS_CACHE.put(job_id, job_store.job_status_response(jobs[job_id]), checked_at)
+            else:
+                STATUS_CACHE.invalidate(job_id) # Row deleted
 
 # =============================================================================
 # API Endpoints
@@ -134,52 +165,40 @@ def run_processing_task(db: Session, job_id: str, input_pdf_path: pathlib.Path,
 
 @app.post("/process_pdf/",
           summary="Upload PDF for Processing",
-          status_code=fastapi.status.HTTP_202_ACCEPTED) # Return 202 Accepted for background tasks
+          status_code=fastapi.status.HTTP_202_ACCEPTED) # Return 202 Accepted, a queue worker processes the job
 async def process_pdf_endpoint(
-    background_tasks: BackgroundTasks,
     file: UploadFile = File(..., description="The PDF file to process."),
-    db: Session = Depends(get_db) # Inject DB session
+    pdf_profile: Optional[str] = Query(None, description="PDF output profile: standard, draft (fast preview) or archive (compressed, embedded font)."),
     ) -> dict:
-    """ Accepts PDF upload, stores metadata, and starts background processing. """
+    """ Accepts PDF upload, stores metadata and queues the job (upload_jobs table) for job_worker.py. """
     if not file or not file.filename: raise HTTPException(status_code=400, detail="No file provided.")
     if not file.filename.lower().endswith(".pdf"): raise HTTPException(status_code=400, detail="Invalid file type.")
+    if pdf_profile is not None and pdf_profile.lower() not in PDF_OUTPUT_PROFILES:
+        raise HTTPException(status_code=400, detail=f"Invalid pdf_profile. Use one of: {', '.join(PDF_OUTPUT_PROFILES)}.")
+    pdf_profile = pdf_profile.lower() if pdf_profile else None
+    if pdf_profile in PDF_UNAVAILABLE_PROFILES:
+        raise HTTPException(status_code=400, detail=f"pdf_profile '{pdf_profile}' is not available on this server: {PDF_UNAVAILABLE_PROFILES[pdf_profile]}.")
 
-    temp_pdf_path = None
     persisted_input_path = None
     job_id = str(uuid.uuid4()) # Generate unique ID for this job
 
+    # 1. Save Uploaded File Persistently, hashed and checked in the same pass (bad files never create a job)
+    safe_filename = re.sub(r'[^\w\._-]', '_', file.filename)
+    persisted_input_path = INPUT_STORAGE_DIR / f"{job_id}_{safe_filename}"
     try:
-        # 1. Save Uploaded File Persistently (optional but good practice)
-        safe_filename = re.sub(r'[^\w\._-]', '_', file.filename)
-        persisted_input_path = INPUT_STORAGE_DIR / f"{job_id}_{safe_filename}"
-        with persisted_input_path.open("wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        logging.info(f"API: Saved input PDF persistently to {persisted_input_path}")
+        await run_in_threadpool(upload_ingest.ingest_pdf_stream, file.file, persisted_input_path, file.filename)
+    except upload_ingest.UploadRejected as e:
+        await file.close()
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    logging.info(f"API: Saved input PDF persistently to {persisted_input_path}")
 
+    try:
         # 2. Create Job Record in DB
-        new_job = models.UploadJob(
-            job_id=job_id,
-            original_filename=file.filename,
-            input_file_path=str(persisted_input_path.relative_to(BASE_DIR)), # Store relative path
-            status=models.JobStatus.PENDING
-        )
-        db.add(new_job)
-        db.commit()
-        db.refresh(new_job) # Get the auto-generated ID, status, etc.
-        logging.info(f"API: Created Job {job_id} (DB ID: {new_job.id}) for {file.filename}")
-
-        # 3. Add Processing Task to Background
-        # Pass DB session factory or handle session scoping carefully in task
-        # Simpler approach: pass necessary data (job_id, path)
-        # Complex: Pass SessionLocal and create session inside task (requires careful handling)
-        # For simplicity here, we'll query the job object again inside the task
-        # NOTE: Need to ensure the DB session used by the background task is managed correctly.
-        # Creating a new session inside the task is often safer.
-        background_tasks.add_task(run_processing_task, SessionLocal(), job_id, persisted_input_path, file.filename)
-        logging.info(f"API: Added job {job_id} to background tasks.")
-
-        # 4. Return Job ID to Client Immediately
-        return {"message": "File upload accepted, processing started.", "job_id": job_id}
+        state = await _create_job(job_id, file.filename, persisted_input_path, pdf_profile)
+        _publish_job_changes(job_id, state)
+
+        # 3. Return Job ID to Client Immediately (the committed row is the queue entry)
+        return {"message": "File upload accepted, job queued for processing.", "job_id": job_id}
 
     except Exception as e:
         logging.error(f"API Error during upload/job creation for {file.filename}: {e}", exc_info=True)
@@ -195,34 +214,101 @@ async def process_pdf_endpoint(
 @app.get("/job_status/{job_id}",
          summary="Get Job Status and Results",
          response_model=schemas.JobStatusResponse) # Use a Pydantic model for response structure (define in schemas.py)
-async def get_job_status(job_id: str, db: Session = Depends(get_db)):
-    """ Poll this endpoint to check job status and get output filenames when completed. """
-    job = db.query(models.UploadJob).filter(models.UploadJob.job_id == job_id).first()
-    if not job:
-        raise HTTPException(status_code=404, detail="Job not found")
-
-    output_files_dict = {}
-    if job.status == models.JobStatus.COMPLETED:
-        outputs = db.query(models.OutputFile).filter(models.OutputFile.job_id == job.id).all()
-        for output in outputs:
-            output_files_dict[output.file_type.value] = output.filename # e.g., {"excel": "...", "pdf": ...}
-
-    # You'll need to create schemas.py with Pydantic models like JobStatusResponse
-    return schemas.JobStatusResponse(
-        job_id=job.job_id,
-        status=job.status,
-        original_filename=job.original_filename,
-        upload_time=job.upload_time,
-        error_message=job.error_message,
-        output_files=output_files_dict
-    )
-
-@app.get("/download/{filename}", summary="Download Generated File")
-async def download_file(filename: str):
-    """ Downloads a generated file from the API output directory. """
+async def get_job_status(job_id: str):
+    """ Poll this endpoint to check job status and get output filenames when completed (served from STATUS_CACHE when fresh). """
+    response = STATUS_CACHE.get(job_id)
+    if response is None:
+        checked_at = time.monotonic()
+        response = await _load_job_status(job_id)
+        if response is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        STATUS_CACHE.put(job_id, response, checked_at)
+    return response
+
+@app.get("/jobs",
+         summary="List and Search Jobs",
+         response_model=schemas.JobListResponse)
+async def list_jobs_endpoint(
+    status: Optional[models.JobStatus] = Query(None, description="Only jobs with this status."),
+    uploaded_after: Optional[datetime.datetime] = Query(None, description="Uploaded at or after this time (ISO 8601)."),
+    uploaded_before: Optional[datetime.datetime] = Query(None, description="Uploaded before this time (ISO 8601)."),
+    filename: Optional[str] = Query(None, description="Part of the original filename (case-insensitive)."),
+    order_number: Optional[str] = Query(None, description="Auftragsname or Kunden-Auftrags-Nr extracted from the PDF (exact)."),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page."),
+    limit: int = Query(JOBS_PAGE_SIZE, ge=1, le=JOBS_PAGE_MAX),
+    ):
+    """
+    Jobs newest first, filtered, one page at a time. Pages continue from a cursor (upload_time, id of the
+    last job shown) instead of an offset, so every page is one index range scan, however deep.
+    """
+    try:
+        async with async_session_scope() as db:
+            jobs, next_cursor = await job_store.list_jobs(
+                db, limit, cursor=cursor, status=status, uploaded_after=uploaded_after, uploaded_before=uploaded_before,
+                filename=filename, order_number=order_number)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return schemas.JobListResponse(jobs=[job_store.job_list_item(job) for job in jobs], next_cursor=next_cursor)
+
+@app.get("/job_events/{job_id}",
+         summary="Stream Job Progress (Server-Sent Events)",
+         response_class=StreamingResponse)
+async def stream_job_events(job_id: str, request: fastapi.Request):
+    """
+    text/event-stream of the job's events: queued, processing, stage (parsing, mapping, excel, pdf, txt),
+    parsed (position count), output (each generated file), then completed (output_files) or failed (error).
+    A job waiting for a retry gets retrying (attempts, error, next_attempt_at) and processing again.
+    The stream ends after the terminal event. Reconnecting clients send Last-Event-ID and only get newer events
+    (ids come from the job row, see job_events.event_id); a reconnect after the end gets the terminal event again.
+    Progress is read from the job rows by one watcher query for all open streams (watch_job_progress).
+    """
+    last_event_id = request.headers.get("last-event-id", "")
+    after_id = int(last_event_id) if last_event_id.isdigit() else 0
+    if not JOB_EVENTS.known(job_id):
+        # No events of this job in this process (restart, other API process, evicted): start from the current
+        # row and send its state whatever the client saw before
+        states = await _load_job_states([job_id])
+        if job_id not in states:
+            raise HTTPException(status_code=404, detail="Job not found")
+        _JOB_STATES.pop(job_id, None) # Publish the whole state, not the difference to a state seen before eviction
+        _publish_job_changes(job_id, states[job_id])
+        after_id = 0
+
+    async def event_stream():
+        async for event in JOB_EVENTS.subscribe(job_id, after_id):
+            yield job_events.format_sse(event)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+async def _artifact_download(request: fastapi.Request, output: models.OutputFile):
+    """ Response for an output kept in the artifact store: sendfile and ranges if the store is local, else streamed. """
+    store = artifact_store.get_artifact_store()
+    local_path = await run_in_threadpool(store.local_path, output.content_sha256)
+    if local_path is not None:
+        return await file_responses.download_response(request, local_path, output.filename)
+    try:
+        return await file_responses.artifact_response(request, functools.partial(store.open_stream, output.content_sha256),
+                                                      output.filename, output.content_sha256, output.file_size)
+    except artifact_store.ArtifactNotFound:
+        logging.error(f"API: Artifact {output.content_sha256[:12]} of {output.filename} is missing in the {store.name} store")
+        raise HTTPException(status_code=404, detail=f"File not found: {output.filename}")
+
+@app.api_route("/download/{filename}", methods=["GET", "HEAD"], summary="Download Generated File")
+async def download_file(filename: str, request: fastapi.Request):
+    """
+    Downloads a generated file: from the artifact store (outputs of queued jobs), or from the API output
+    directory for files from before it (conditional and range requests, see file_responses).
+    """
     if ".." in filename or "/" in filename or "\\" in filename or "\0" in filename:
          raise HTTPException(status_code=400, detail="Invalid filename.")
 
+    async with async_session_scope() as db:
+        output = await job_store.find_output(db, filename)
+    if output is not None and output.content_sha256:
+        logging.info(f"API: Download request for: {filename} (artifact {output.content_sha256[:12]})")
+        return await _artifact_download(request, output)
+
     # Files are expected in OUTPUT_DIR_API
     file_path = (OUTPUT_DIR_API / filename).resolve()
 
@@ -232,16 +318,44 @@ async def download_file(filename: str):
 
     logging.info(f"API: Download request for: {filename} (Path: {file_path})")
     if file_path.is_file():
-        media_type = 'application/octet-stream'
-        low_filename = filename.lower()
-        if low_filename.endswith(".xlsx"): media_type = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        elif low_filename.endswith(".pdf"): media_type = 'application/pdf'
-        elif low_filename.endswith(".txt"): media_type = 'text/plain; charset=utf-8'
-        return FileResponse(path=str(file_path), media_type=media_type, filename=filename)
+        return await file_responses.download_response(request, file_path, filename)
     else:
         logging.warning(f"API: Download failed - File not found: {file_path}")
         raise HTTPException(status_code=404, detail=f"File not found: {filename}")
 
+@app.get("/download_zip/{job_id}", summary="Download All Generated Files of a Job as ZIP")
+async def download_job_zip(job_id: str):
+    """ Streams a ZIP with every output file of a completed job; the archive is built while it is sent. """
+    async with async_session_scope() as db:
+        job = await job_store.load_job(db, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.status != models.JobStatus.COMPLETED:
+        raise HTTPException(status_code=409, detail=f"Job is {job.status.value}, outputs are not available.")
+
+    store = artifact_store.get_artifact_store()
+    files = []
+    for output in job.output_files:
+        if output.content_sha256: # Read from the store when the entry is due
+            files.append((output.filename, functools.partial(store.open_stream, output.content_sha256)))
+        elif (OUTPUT_DIR_API / output.filename).is_file():
+            files.append((output.filename, OUTPUT_DIR_API / output.filename))
+    if not files:
+        logging.warning(f"API: ZIP download failed - no output files on disk for job {job_id}")
+        raise HTTPException(status_code=404, detail="No output files found for this job.")
+    logging.info(f"API: ZIP download for job {job_id}: {[name for name, _ in files]}")
+    return file_responses.zip_bundle_response(files, f"{job_id}.zip")
+
+@app.get("/db_pool", summary="Database Connection Pool Statistics")
+async def db_pool_stats():
+    """ Pool size and limit, connections checked out / idle / in overflow, and counters since start (this API process). """
+    return pool_stats()
+
+@app.get("/status_cache", summary="Job Status Cache Statistics")
+async def status_cache_stats():
+    """ Entries, watched (unfinished, recently polled) jobs, hits / misses / hit ratio and refresh counters (this API process). """
+    return STATUS_CACHE.stats()
+
 @app.get("/", include_in_schema=False)
 async def read_root():
     from fastapi.responses import RedirectResponse
@@ -0,0 +1,107 @@
+# artifact_index.py
+"""
+Index of generated output sets, keyed by upload content hash + processing options + config
+version, so an identical upload reuses the existing artifacts instead of being processed again.
+One small JSON file per key (written atomically), which keeps lookups O(1) and safe across
+API worker processes. Also provides strong ETags (content SHA-256) for the download endpoints.
+"""
+import hashlib
+import json
+import logging
+import os
+import pathlib
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Optional
+
+from config import BASE_DIR, OUTPUT_CONFIG_VERSION, OUTPUT_VERSION_SOURCES
+
+HASH_CHUNK_BYTES = 1024 * 1024
+
+def file_sha256(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(HASH_CHUNK_BYTES):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+@lru_cache(maxsize=1)
+def config_version() -> str:
+    """ OUTPUT_CONFIG_VERSION, or a hash of everything that shapes the outputs (code, config, template). """
+    if OUTPUT_CONFIG_VERSION:
+        return OUTPUT_CONFIG_VERSION
+    digest = hashlib.sha256()
+    for name in OUTPUT_VERSION_SOURCES:
+        path = BASE_DIR / name
+        digest.update(name.encode())
+        digest.update(file_sha256(path).encode() if path.is_file() else b"-")
+    return digest.hexdigest()[:16]
+
+def dedup_key(content_sha256: str, *options) -> str:
+    """ Key of an output set: upload content, options that change the outputs (e.g. PDF profile), config version. """
+    material = ":".join([content_sha256, config_version(), *(str(option) for option in options)])
+    return hashlib.sha256(material.encode()).hexdigest()
+
+# --- Strong ETags ---
+_ETAG_CACHE: Dict[str, tuple] = {} # path -> ((mtime_ns, size), etag)
+_ETAG_CACHE_MAX = 4096
+
+def file_etag(path: pathlib.Path) -> str:
+    """ Strong ETag (quoted content SHA-256); re-hashed only when mtime or size change. """
+    stat_result = os.stat(path)
+    signature = (stat_result.st_mtime_ns, stat_result.st_size)
+    cached = _ETAG_CACHE.get(str(path))
+    if cached and cached[0] == signature:
+        return cached[1]
+    etag = f'"{file_sha256(path)}"'
+    if len(_ETAG_CACHE) >= _ETAG_CACHE_MAX:
+        _ETAG_CACHE.clear()
+    _ETAG_CACHE[str(path)] = (signature, etag)
+    return etag
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """ If-None-Match evaluation (weak comparison, as RFC 9110 prescribes for this header). """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in if_none_match.split(","))
+
+# --- Output Set Index ---
+class ArtifactIndex:
+    """ key -> {"base_filename", "files": {type: filename}, "created"}; files live in output_dir. """
+    def __init__(self, output_dir: pathlib.Path):
+        self.output_dir = pathlib.Path(output_dir)
+        self.index_dir = self.output_dir / ".artifact_index"
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+
+    def _entry_path(self, key: str) -> pathlib.Path:
+        return self.index_dir / f"{key}.json"
+
+    def lookup(self, key: str) -> Optional[Dict]:
+        """ The indexed output set, or None if unknown or any of its files is gone. """
+        entry_path = self._entry_path(key)
+        try:
+            with open(entry_path, encoding="utf-8") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logging.warning(f"Unreadable artifact index entry {entry_path.name}: {e}")
+            return None
+        if not all((self.output_dir / filename).is_file() for filename in entry["files"].values()):
+            logging.info(f"Artifact index entry {key[:12]} is stale (outputs removed), reprocessing.")
+            return None
+        return entry
+
+    def record(self, key: str, base_filename: str, files: Dict[str, str]) -> Dict:
+        """ Stores an output set (files: type -> filename in output_dir). """
+        entry = {"base_filename": base_filename, "files": files, "config_version": config_version(),
+                 "created": datetime.now().isoformat(timespec="seconds")}
+        entry_path = self._entry_path(key)
+        tmp_path = entry_path.with_name(f".{entry_path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, entry_path)
+        return entry
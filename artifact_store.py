@@ -0,0 +1,205 @@
+# artifact_store.py
+"""
+Content-addressed storage of the outputs of queued jobs (job_worker.py writes, api_mainB serves).
+An artifact is stored under the SHA-256 of its bytes, so identical outputs are kept once and a
+stored artifact never changes; models.OutputFile references it by content_sha256 instead of a
+path on one machine, which lets API nodes and workers run anywhere. Reads are streams of
+ARTIFACT_CHUNK_BYTES pieces. Backends (ARTIFACT_STORE_BACKEND):
+  local  files under ARTIFACT_LOCAL_DIR/ab/cd/<sha256> (single node, or a shared volume)
+  db     artifact_blobs / artifact_chunks tables of the job database
+  s3     a bucket on S3 or an S3-compatible server (MinIO, LocalStack: ARTIFACT_S3_ENDPOINT_URL); needs boto3
+"""
+import logging
+import os
+import pathlib
+import shutil
+import threading
+from functools import lru_cache
+from typing import Iterator, Optional, Tuple
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.exc import IntegrityError
+
+import artifact_index
+import models
+from config import (ARTIFACT_STORE_BACKEND, ARTIFACT_LOCAL_DIR, ARTIFACT_S3_BUCKET, ARTIFACT_S3_PREFIX,
+                    ARTIFACT_S3_ENDPOINT_URL, ARTIFACT_S3_REGION, ARTIFACT_CHUNK_BYTES)
+
+class ArtifactNotFound(Exception):
+    """ No artifact with this digest in the store. """
+
+class ArtifactStore:
+    """ Backend interface: exists, _write (content not stored yet), open_stream; put_file hashes and deduplicates. """
+    name = "base"
+
+    def put_file(self, path) -> Tuple[str, int, bool]:
+        """ Stores the file's content unless the store has it already; returns (sha256, size, newly stored). """
+        path = pathlib.Path(path)
+        digest, size = artifact_index.file_sha256(path), path.stat().st_size
+        if self.exists(digest):
+            return digest, size, False
+        self._write(digest, path, size)
+        logging.info(f"Artifact Store ({self.name}): Stored {digest[:12]} ({size} bytes, {path.name})")
+        return digest, size, True
+
+    def exists(self, digest: str) -> bool:
+        raise NotImplementedError
+
+    def _write(self, digest: str, path: pathlib.Path, size: int):
+        raise NotImplementedError
+
+    def open_stream(self, digest: str, chunk_size: int = ARTIFACT_CHUNK_BYTES) -> Iterator[bytes]:
+        """ Iterator over the artifact's bytes; ArtifactNotFound is raised here, not while iterating. """
+        raise NotImplementedError
+
+    def local_path(self, digest: str) -> Optional[pathlib.Path]:
+        """ Path of the artifact if the backend keeps it as a local file (lets the API use sendfile and ranges). """
+        return None
+
+    def read_bytes(self, digest: str) -> bytes:
+        return b"".join(self.open_stream(digest))
+
+def _iter_file(file, chunk_size: int) -> Iterator[bytes]:
+    with file:
+        while chunk := file.read(chunk_size):
+            yield chunk
+
+# --- local: one file per digest ---
+class LocalArtifactStore(ArtifactStore):
+    name = "local"
+
+    def __init__(self, root=ARTIFACT_LOCAL_DIR):
+        self.root = pathlib.Path(root)
+
+    def _path(self, digest: str) -> pathlib.Path:
+        return self.root / digest[:2] / digest[2:4] / digest
+
+    def exists(self, digest: str) -> bool:
+        return self._path(digest).is_file()
+
+    def _write(self, digest: str, path: pathlib.Path, size: int):
+        target = self._path(digest)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = target.with_name(f".{digest}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            shutil.copyfile(path, tmp_path)
+            os.replace(tmp_path, target) # Atomic: readers see all of it or nothing; a concurrent writer wrote the same bytes
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+    def open_stream(self, digest: str, chunk_size: int = ARTIFACT_CHUNK_BYTES) -> Iterator[bytes]:
+        try:
+            file = open(self._path(digest), "rb")
+        except FileNotFoundError:
+            raise ArtifactNotFound(digest)
+        return _iter_file(file, chunk_size)
+
+    def local_path(self, digest: str) -> Optional[pathlib.Path]:
+        path = self._path(digest)
+        return path if path.is_file() else None
+
+# --- db: header row + chunk rows, written in one transaction ---
+class DatabaseArtifactStore(ArtifactStore):
+    name = "db"
+    READ_BATCH_CHUNKS = 8 # Chunks per query while streaming; no connection is held between batches
+
+    def __init__(self, engine=None):
+        if engine is None:
+            from database import engine
+        self.engine = engine
+
+    def exists(self, digest: str) -> bool:
+        with self.engine.connect() as conn:
+            return conn.execute(select(models.ArtifactBlob.sha256).where(models.ArtifactBlob.sha256 == digest)).first() is not None
+
+    def _write(self, digest: str, path: pathlib.Path, size: int):
+        try:
+            with self.engine.begin() as conn, open(path, "rb") as f:
+                conn.execute(insert(models.ArtifactBlob).values(sha256=digest, size=size))
+                seq = 0
+                while chunk := f.read(ARTIFACT_CHUNK_BYTES):
+                    conn.execute(insert(models.ArtifactChunk).values(sha256=digest, seq=seq, data=chunk))
+                    seq += 1
+        except IntegrityError:
+            logging.info(f"Artifact Store (db): {digest[:12]} was stored concurrently.")
+
+    def open_stream(self, digest: str, chunk_size: int = ARTIFACT_CHUNK_BYTES) -> Iterator[bytes]:
+        # Stored chunks have ARTIFACT_CHUNK_BYTES; chunk_size does not re-slice them
+        with self.engine.connect() as conn:
+            chunks = conn.execute(select(func.count(models.ArtifactChunk.seq)).where(models.ArtifactChunk.sha256 == digest)).scalar()
+            if not chunks and not self.exists(digest):
+                raise ArtifactNotFound(digest)
+        return self._iter_chunks(digest, chunks)
+
+    def _iter_chunks(self, digest: str, chunks: int) -> Iterator[bytes]:
+        for first in range(0, chunks, self.READ_BATCH_CHUNKS):
+            with self.engine.connect() as conn:
+                batch = conn.execute(
+                    select(models.ArtifactChunk.data).where(models.ArtifactChunk.sha256 == digest,
+                                                           models.ArtifactChunk.seq >= first,
+                                                           models.ArtifactChunk.seq < first + self.READ_BATCH_CHUNKS)
+                    .order_by(models.ArtifactChunk.seq)
+                ).scalars().all()
+            yield from batch
+
+# --- s3: one object per digest (benchmarks/check_s3_artifact_store.py runs it against moto or MinIO) ---
+class S3ArtifactStore(ArtifactStore):
+    name = "s3"
+
+    def __init__(self, bucket: str = ARTIFACT_S3_BUCKET, prefix: str = ARTIFACT_S3_PREFIX,
+                 endpoint_url: Optional[str] = ARTIFACT_S3_ENDPOINT_URL, region: Optional[str] = ARTIFACT_S3_REGION, client=None):
+        if client is None:
+            try:
+                import boto3
+            except ImportError as e:
+                raise RuntimeError("The s3 artifact store needs boto3. Please run: pip install boto3") from e
+            client = boto3.client("s3", endpoint_url=endpoint_url, region_name=region)
+        self.client = client
+        self._client_error = client.exceptions.ClientError # botocore's ClientError, also on a given client
+        self.bucket, self.prefix = bucket, prefix
+
+    def _key(self, digest: str) -> str:
+        return f"{self.prefix}{digest[:2]}/{digest}"
+
+    def _is_missing(self, error) -> bool:
+        # head_object: code "404" (no body to carry a name); get_object: "NoSuchKey"
+        return (error.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound")
+                or error.response.get("ResponseMetadata", {}).get("HTTPStatusCode") == 404)
+
+    def exists(self, digest: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(digest))
+            return True
+        except self._client_error as e:
+            if self._is_missing(e):
+                return False
+            raise
+
+    def _write(self, digest: str, path: pathlib.Path, size: int):
+        # upload_file streams from disk (multipart for large files); same key, same bytes: a concurrent upload is harmless
+        self.client.upload_file(str(path), self.bucket, self._key(digest), ExtraArgs={"Metadata": {"sha256": digest}})
+
+    def open_stream(self, digest: str, chunk_size: int = ARTIFACT_CHUNK_BYTES) -> Iterator[bytes]:
+        try:
+            body = self.client.get_object(Bucket=self.bucket, Key=self._key(digest))["Body"]
+        except self._client_error as e:
+            if self._is_missing(e):
+                raise ArtifactNotFound(digest)
+            raise
+        return self._iter_body(body, chunk_size)
+
+    @staticmethod
+    def _iter_body(body, chunk_size: int) -> Iterator[bytes]:
+        try:
+            yield from body.iter_chunks(chunk_size)
+        finally:
+            body.close()
+
+BACKENDS = {"local": LocalArtifactStore, "db": DatabaseArtifactStore, "s3": S3ArtifactStore}
+
+@lru_cache(maxsize=1)
+def get_artifact_store() -> ArtifactStore:
+    """ The configured store (ARTIFACT_STORE_BACKEND), one per process. """
+    if ARTIFACT_STORE_BACKEND not in BACKENDS:
+        raise ValueError(f"Unknown ARTIFACT_STORE_BACKEND {ARTIFACT_STORE_BACKEND!r}. Use one of: {', '.join(BACKENDS)}.")
+    return BACKENDS[ARTIFACT_STORE_BACKEND]()
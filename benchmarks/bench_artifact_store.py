@@ -0,0 +1,119 @@
+# benchmarks/bench_artifact_store.py
+"""
+Artifact store backends (artifact_store.py): stores --files distinct outputs of --size-kb KB plus
+the same files again (deduplicated: hashed, not stored), then streams every artifact back, and
+reads one --large-mb MB artifact as a stream while tracking the peak Python memory of the read.
+Reports MB/s for new puts, duplicate puts and streamed reads per backend.
+
+The db backend uses DATABASE_URL; without it a temporary SQLite file, deleted afterwards. On
+another database the artifacts written by the run are removed again. The s3 backend runs only
+with ARTIFACT_S3_ENDPOINT_URL set (e.g. a local MinIO) and boto3 installed; its objects stay in
+ARTIFACT_S3_BUCKET under the prefix "bench-artifacts/".
+
+Usage: [DATABASE_URL=...] [ARTIFACT_S3_ENDPOINT_URL=...] python benchmarks/bench_artifact_store.py [--files N] [--size-kb N] [--large-mb N]
+"""
+import argparse
+import logging
+import os
+import pathlib
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+TEMP_DB = None
+if not os.getenv("DATABASE_URL"):
+    TEMP_DB = pathlib.Path(tempfile.gettempdir()) / f"bench_artifact_store_{os.getpid()}.db"
+    os.environ["DATABASE_URL"] = f"sqlite:///{TEMP_DB}"
+
+from sqlalchemy import delete
+
+import artifact_store
+import database
+import models
+from config import ARTIFACT_S3_ENDPOINT_URL
+
+def make_files(directory: pathlib.Path, count: int, size: int, name: str = "output") -> list:
+    paths = []
+    for number in range(count):
+        path = directory / f"{name}_{number}.bin"
+        path.write_bytes(os.urandom(size))
+        paths.append(path)
+    return paths
+
+def run(store: artifact_store.ArtifactStore, paths: list, large: pathlib.Path) -> dict:
+    total_mb = sum(path.stat().st_size for path in paths) / 2**20
+    start = time.perf_counter()
+    digests = [store.put_file(path)[0] for path in paths]
+    new_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    duplicates = sum(not store.put_file(path)[2] for path in paths)
+    dup_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    for digest in digests:
+        for _ in store.open_stream(digest):
+            pass
+    read_seconds = time.perf_counter() - start
+
+    large_digest = store.put_file(large)[0]
+    tracemalloc.start()
+    read_bytes = sum(len(chunk) for chunk in store.open_stream(large_digest))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    assert read_bytes == large.stat().st_size
+    return {"put MB/s": total_mb / new_seconds, "dedup MB/s": total_mb / dup_seconds, "deduplicated": duplicates,
+            "read MB/s": total_mb / read_seconds, "large peak MB": peak / 2**20, "digests": digests + [large_digest]}
+
+def backends(root: pathlib.Path) -> dict:
+    stores = {"local": lambda: artifact_store.LocalArtifactStore(root / "artifacts"),
+              "db": lambda: artifact_store.DatabaseArtifactStore(database.engine)}
+    if ARTIFACT_S3_ENDPOINT_URL:
+        stores["s3"] = lambda: artifact_store.S3ArtifactStore(prefix="bench-artifacts/")
+    return stores
+
+def cleanup_db(digests: list):
+    with database.engine.begin() as conn:
+        conn.execute(delete(models.ArtifactChunk).where(models.ArtifactChunk.sha256.in_(digests)))
+        conn.execute(delete(models.ArtifactBlob).where(models.ArtifactBlob.sha256.in_(digests)))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--size-kb", type=int, default=256, help="Size of each output")
+    parser.add_argument("--large-mb", type=int, default=64, help="Size of the artifact read as one stream")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    models.Base.metadata.create_all(bind=database.engine)
+    db_digests = []
+    try:
+        with tempfile.TemporaryDirectory(prefix="bench_artifacts_") as scratch:
+            root = pathlib.Path(scratch)
+            (root / "inputs").mkdir()
+            paths = make_files(root / "inputs", args.files, args.size_kb * 1024)
+            large = make_files(root / "inputs", 1, args.large_mb * 2**20, name="large")[0]
+            print(f"{args.files} files of {args.size_kb} KB, one of {args.large_mb} MB; db: {database.engine.dialect.name}"
+                  + ("" if ARTIFACT_S3_ENDPOINT_URL else "; s3 skipped (ARTIFACT_S3_ENDPOINT_URL not set)"))
+            print(f"{'backend':<8} {'put MB/s':>9} {'dedup MB/s':>11} {'deduplicated':>13} {'read MB/s':>10} {'large read peak MB':>19}")
+            for name, make_store in backends(root).items():
+                try:
+                    store = make_store()
+                except RuntimeError as e:
+                    print(f"{name:<8} skipped: {e}")
+                    continue
+                result = run(store, paths, large)
+                if name == "db":
+                    db_digests = result["digests"]
+                print(f"{name:<8} {result['put MB/s']:>9.1f} {result['dedup MB/s']:>11.1f} {result['deduplicated']:>13} "
+                      f"{result['read MB/s']:>10.1f} {result['large peak MB']:>19.2f}")
+    finally:
+        if TEMP_DB is not None:
+            database.engine.dispose()
+            for suffix in ("", "-wal", "-shm"):
+                pathlib.Path(f"{TEMP_DB}{suffix}").unlink(missing_ok=True)
+        elif db_digests:
+            cleanup_db(db_digests)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+# benchmarks/bench_db_pool.py
+"""
+Load test of the database connection pools (database.py). Two bursts run while the pools are watched:
+  1. HTTP: concurrent uploads and /job_status/ polls against api_mainB (in-process ASGI client, async engine)
+  2. Queue: many threads doing short session_scope() transactions, like queue workers (sync engine)
+Reports peak checked-out connections, connections opened, pool timeouts and latency. The run fails
+if the connection count ever exceeds DB_POOL_SIZE + DB_MAX_OVERFLOW. On Postgres the server-side
+connection count of the database (pg_stat_activity) is sampled as well.
+
+Uses DATABASE_URL; without it a temporary SQLite file (the local stand-in). Rows and input files
+created by the test are removed afterwards.
+
+Usage: [DATABASE_URL=...] [DB_POOL_SIZE=N DB_MAX_OVERFLOW=N] python benchmarks/bench_db_pool.py
+           [--requests N] [--concurrency N] [--threads N] [--iterations N] [--hold-ms N] [--leaky]
+  --leaky  the queue burst opens sessions without closing them (the old background-task pattern)
+"""
+import argparse
+import asyncio
+import logging
+import os
+import pathlib
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+if not os.getenv("DATABASE_URL"):
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.gettempdir()}/bench_db_pool_{os.getpid()}.db"
+
+import httpx
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import NullPool
+
+import database
+import models
+from config import BASE_DIR
+
+SAMPLE_PDF = sorted(BASE_DIR.glob("D & M KG-*.pdf"))[0]
+
+class PoolSampler(threading.Thread):
+    """ Samples the server's connection count on Postgres until stopped (the pools count their own peaks). """
+    def __init__(self, interval: float = 0.002):
+        super().__init__(daemon=True)
+        self.interval, self.stopped = interval, threading.Event()
+        self.peak_server = None
+        self._server = None
+        if database.engine.dialect.name == "postgresql":
+            self._server = create_engine(database.DATABASE_URL, poolclass=NullPool).connect() # Outside the measured pool
+            self.peak_server = 0
+
+    def run(self):
+        while not self.stopped.is_set():
+            if self._server is not None:
+                count = self._server.execute(text("SELECT count(*) FROM pg_stat_activity WHERE datname = current_database()")).scalar()
+                self.peak_server = max(self.peak_server, count - 1) # Without the sampler's own connection
+            time.sleep(self.interval)
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+        if self._server is not None:
+            self._server.close()
+
+async def http_burst(requests: int, concurrency: int):
+    """ One upload per ten status polls; returns (latencies, status codes, created job ids). """
+    import api_mainB
+    pdf_bytes = SAMPLE_PDF.read_bytes()
+    latencies, statuses, job_ids = [], {}, []
+    limit = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=api_mainB.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one(index: int):
+            async with limit:
+                start = time.perf_counter()
+                if index % 10 == 0 or not job_ids:
+                    response = await client.post("/process_pdf/", files={"file": ("bench.pdf", pdf_bytes, "application/pdf")})
+                    if response.status_code == 202:
+                        job_ids.append(response.json()["job_id"])
+                else:
+                    response = await client.get(f"/job_status/{job_ids[index % len(job_ids)]}")
+                latencies.append(time.perf_counter() - start)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        await one(0) # Job to poll
+        await asyncio.gather(*(one(index) for index in range(1, requests)))
+    return latencies, statuses, job_ids
+
+def queue_burst(threads: int, iterations: int, hold_ms: float, leaky: bool):
+    """ Short transactions from many threads; returns (latencies, pool timeouts). """
+    latencies, timeouts, lock = [], [0], threading.Lock()
+    def worker():
+        for _ in range(iterations):
+            start = time.perf_counter()
+            try:
+                if leaky:
+                    db = database.SessionLocal() # Never closed: the connection stays checked out
+                    db.execute(text("SELECT count(*) FROM upload_jobs")).scalar()
+                else:
+                    with database.session_scope() as db:
+                        db.execute(text("SELECT count(*) FROM upload_jobs")).scalar()
+                        time.sleep(hold_ms / 1000)
+            except PoolTimeoutError:
+                with lock:
+                    timeouts[0] += 1
+            with lock:
+                latencies.append(time.perf_counter() - start)
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return latencies, timeouts[0]
+
+def percentile(values, share: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))] * 1000 if values else 0.0
+
+def cleanup(job_ids):
+    with database.session_scope() as db:
+        for job in db.query(models.UploadJob).filter(models.UploadJob.job_id.in_(job_ids)).all():
+            if job.input_file_path:
+                (BASE_DIR / job.input_file_path).unlink(missing_ok=True)
+            db.delete(job)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--threads", type=int, default=50)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--hold-ms", type=float, default=5.0, help="Time each queue transaction keeps its connection")
+    parser.add_argument("--leaky", action="store_true")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    models.Base.metadata.create_all(bind=database.engine)
+    limit = database.DB_POOL_SIZE + database.DB_MAX_OVERFLOW
+    print(f"{database.engine.dialect.name}, pool_size {database.DB_POOL_SIZE} + max_overflow {database.DB_MAX_OVERFLOW} = limit {limit}, "
+          f"timeout {database.DB_POOL_TIMEOUT}s, pre_ping {database.DB_POOL_PRE_PING}, recycle {database.DB_POOL_RECYCLE}s")
+    print(f"{'burst':<8} {'ops':>6} {'p50 ms':>8} {'p99 ms':>8} {'peak conns':>10} {'server':>7} {'opened':>7} {'timeouts':>9}  status codes")
+
+    failed, job_ids = False, []
+    try:
+        for name, pool_name in (("http", "async"), ("queue", "sync")):
+            opened_before = (database.pool_stats()[pool_name] or {}).get("connections_opened", 0)
+            sampler = PoolSampler()
+            sampler.start()
+            if name == "http":
+                latencies, statuses, job_ids = asyncio.run(http_burst(args.requests, args.concurrency))
+                timeouts = statuses.get(503, 0)
+            else:
+                latencies, timeouts = queue_burst(args.threads, args.iterations, args.hold_ms, args.leaky)
+                statuses = {}
+            sampler.stop()
+            stats = database.pool_stats()[pool_name]
+            peak = stats["peak_checked_out"]
+            failed |= peak > limit or (sampler.peak_server or 0) > limit
+            print(f"{name:<8} {len(latencies):>6} {percentile(latencies, 0.5):>8.1f} {percentile(latencies, 0.99):>8.1f} {peak:>10} "
+                  f"{sampler.peak_server if sampler.peak_server is not None else '-':>7} {stats['connections_opened'] - opened_before:>7} "
+                  f"{timeouts:>9}  {statuses or ''}")
+    finally:
+        if job_ids:
+            cleanup(job_ids)
+    print("connection count stayed within the pool limit" if not failed else f"FAIL: more than {limit} connections")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
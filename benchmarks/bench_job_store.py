@@ -0,0 +1,208 @@
+# benchmarks/bench_job_store.py
+"""
+Job store queries (job_store.py) at production volume: fills upload_jobs with --jobs jobs (default
+1M; 90% completed with 3 output records each, the rest failed / pending / processing) and times
+the hot queries on the schema without and with the composite indexes of models.py:
+  status    job + outputs by job_id (before: two queries, job then outputs; after: one joined query)
+  claim     the queue's candidate query (job_queue.lease_jobs)
+  expired   abandoned-lease scan (job_queue.fail_abandoned_jobs)
+  list      newest 50 jobs of a status
+  complete  marking a job completed with its 3 output records (ORM objects vs. one bulk insert)
+Round-trips are counted per call. Then the /jobs listing (job_store.list_jobs_query): first page,
+a page half-way down by keyset cursor vs. by OFFSET, and an order number search.
+
+Uses DATABASE_URL; without it a temporary SQLite file, deleted afterwards. On another database the
+rows written by the run (job_id prefix "bench-") are removed again and the indexes restored.
+
+Usage: [DATABASE_URL=...] python benchmarks/bench_job_store.py [--jobs N] [--repeat N]
+"""
+import argparse
+import os
+import pathlib
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import timedelta
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+TEMP_DB = None
+if not os.getenv("DATABASE_URL"):
+    TEMP_DB = pathlib.Path(tempfile.gettempdir()) / f"bench_job_store_{os.getpid()}.db"
+    os.environ["DATABASE_URL"] = f"sqlite:///{TEMP_DB}"
+
+from sqlalchemy import delete, event, func, insert, select, text, update
+
+import database
+import job_queue
+import job_store
+import models
+from config import JOB_MAX_ATTEMPTS
+
+UploadJob, OutputFile, JobStatus = models.UploadJob, models.OutputFile, models.JobStatus
+NEW_INDEXES = ("ix_upload_jobs_status_upload_time", "ix_upload_jobs_status_lease_expires_at",
+               "ix_upload_jobs_upload_time_id", "ix_output_files_job_id")
+CHUNK = 20000
+
+round_trips = [0]
+event.listen(database.engine, "before_cursor_execute", lambda *args: round_trips.__setitem__(0, round_trips[0] + 1))
+
+def populate(jobs: int) -> float:
+    """ Inserts the jobs and their outputs in chunks; returns the seconds it took. """
+    start, now = time.perf_counter(), job_queue.utcnow()
+    rng = random.Random(42)
+    with database.engine.begin() as conn:
+        next_id = (conn.execute(select(func.max(UploadJob.id))).scalar() or 0) + 1
+    for first in range(0, jobs, CHUNK):
+        job_rows, output_rows = [], []
+        for number in range(first, min(jobs, first + CHUNK)):
+            row_id, share = next_id + number, rng.random()
+            status = (JobStatus.COMPLETED if share < 0.90 else JobStatus.FAILED if share < 0.95
+                      else JobStatus.PENDING if share < 0.98 else JobStatus.PROCESSING)
+            upload_time = now - timedelta(seconds=(jobs - number) * 30) # One upload every 30 s, oldest first
+            job_rows.append({
+                "id": row_id, "job_id": f"bench-{row_id}", "original_filename": f"D & M KG-{rng.randrange(10**9)}.pdf",
+                "upload_time": upload_time, "status": status, "input_file_path": f"input_storage/bench-{row_id}.pdf",
+                "attempts": 1 if status != JobStatus.PENDING else 0,
+                "error_message": "Failed to extract data from PDF." if status == JobStatus.FAILED else None,
+                "lease_owner": "bench" if status == JobStatus.PROCESSING else None,
+                "lease_expires_at": now + timedelta(seconds=rng.choice((-600, 300))) if status == JobStatus.PROCESSING else None,
+                "auftragsname": str(rng.randrange(10000, 100000)) if status == JobStatus.COMPLETED else None,
+                "kunden_auftrags_nr": f"45{row_id:08d}" if status == JobStatus.COMPLETED else None,
+            })
+            if status == JobStatus.COMPLETED:
+                for file_type, extension in ((models.OutputFileType.EXCEL, "xlsx"), (models.OutputFileType.PDF, "pdf"), (models.OutputFileType.TXT, "txt")):
+                    output_rows.append({"job_id": row_id, "file_type": file_type,
+                                        "filename": f"bench-{row_id}.{extension}", "file_path": f"api_output/bench-{row_id}.{extension}"})
+        with database.engine.begin() as conn:
+            conn.execute(insert(UploadJob), job_rows)
+            conn.execute(insert(OutputFile), output_rows)
+    if database.engine.dialect.name == "postgresql": # Explicit ids: move the sequence past them
+        with database.engine.begin() as conn:
+            conn.execute(text("SELECT setval(pg_get_serial_sequence('upload_jobs', 'id'), (SELECT max(id) FROM upload_jobs))"))
+    return time.perf_counter() - start
+
+def drop_new_indexes():
+    with database.engine.begin() as conn:
+        for name in NEW_INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+def analyze():
+    with database.engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+
+def timed(function, repeat: int):
+    """ Median milliseconds and round-trips per call. """
+    times, trips = [], []
+    for index in range(repeat):
+        before, start = round_trips[0], time.perf_counter()
+        function(index)
+        times.append((time.perf_counter() - start) * 1000)
+        trips.append(round_trips[0] - before)
+    return statistics.median(times), max(trips)
+
+def status_two_queries(db, job_id):
+    job = db.execute(select(UploadJob).where(UploadJob.job_id == job_id)).scalars().first()
+    outputs = db.execute(select(OutputFile).where(OutputFile.job_id == job.id)).scalars().all()
+    return job, outputs
+
+def claim_candidates(db):
+    return db.execute(select(UploadJob.id, UploadJob.job_id).where(job_queue._claimable(job_queue.utcnow()))
+                      .order_by(UploadJob.upload_time, UploadJob.id).limit(10)).all()
+
+def expired_leases(db):
+    now = job_queue.utcnow()
+    return db.execute(select(func.count()).select_from(UploadJob).where(
+        UploadJob.status == JobStatus.PROCESSING, UploadJob.lease_expires_at < now, UploadJob.attempts >= JOB_MAX_ATTEMPTS)).scalar()
+
+def newest_of_status(db, status):
+    return db.execute(select(UploadJob).where(UploadJob.status == status)
+                      .order_by(UploadJob.upload_time.desc(), UploadJob.id.desc()).limit(50)).scalars().all()
+
+def complete(db, job_row_id: int, bulk: bool):
+    """ Status change and 3 output records in one transaction, the old (ORM objects) or the new (bulk insert) way. """
+    db.execute(update(UploadJob).where(UploadJob.id == job_row_id).values(status=JobStatus.COMPLETED)
+               .execution_options(synchronize_session=False))
+    records = [{"job_id": job_row_id, "file_type": file_type, "filename": f"bench-{job_row_id}.{file_type.value}",
+                "file_path": f"api_output/bench-{job_row_id}.{file_type.value}"} for file_type in models.OutputFileType]
+    if bulk:
+        job_store.add_outputs(db, records)
+    else:
+        db.add_all([OutputFile(**record) for record in records])
+    db.commit()
+
+def measure(label: str, jobs: int, repeat: int, pending_ids: list, new: bool):
+    rng = random.Random(7)
+    with database.session_scope() as db:
+        lookups = [f"bench-{rng.randrange(1, jobs + 1)}" for _ in range(repeat)]
+        results = {
+            "status": timed(lambda i: job_store.get_job(db, lookups[i]) if new else status_two_queries(db, lookups[i]), repeat),
+            "claim": timed(lambda i: claim_candidates(db), repeat),
+            "expired": timed(lambda i: expired_leases(db), repeat),
+            "list": timed(lambda i: newest_of_status(db, JobStatus.FAILED), repeat),
+        }
+        db.expunge_all()
+    with database.session_scope() as db:
+        completions = pending_ids[:repeat] if not new else pending_ids[repeat:2 * repeat]
+        results["complete"] = timed(lambda i: complete(db, completions[i], bulk=new), len(completions))
+    for name, (milliseconds, trips) in results.items():
+        print(f"{label:<18} {name:<9} {milliseconds:>10.3f} {trips:>12}")
+    return results
+
+def measure_listing(jobs: int, repeat: int, page_size: int = 50):
+    depth = jobs // 2
+    with database.session_scope() as db:
+        fetch = lambda query: db.execute(query).unique().scalars().all()
+        position = tuple(db.execute(select(UploadJob.upload_time, UploadJob.id)
+                                    .order_by(UploadJob.upload_time.desc(), UploadJob.id.desc()).offset(depth).limit(1)).one())
+        order_number = db.execute(select(UploadJob.kunden_auftrags_nr).where(UploadJob.kunden_auftrags_nr.is_not(None)).limit(1)).scalar()
+        results = {
+            "first page": timed(lambda i: fetch(job_store.list_jobs_query(page_size + 1)), repeat),
+            f"keyset, row {depth}": timed(lambda i: fetch(job_store.list_jobs_query(page_size + 1, after=position)), repeat),
+            f"OFFSET {depth}": timed(lambda i: fetch(job_store.list_jobs_query(page_size + 1).offset(depth)), min(repeat, 5)),
+            "order number": timed(lambda i: fetch(job_store.list_jobs_query(page_size + 1, order_number=order_number)), repeat),
+        }
+    print(f"{'listing page':<28} {'median ms':>10}")
+    for name, (milliseconds, trips) in results.items():
+        print(f"{name:<28} {milliseconds:>10.3f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    models.Base.metadata.create_all(bind=database.engine)
+    try:
+        drop_new_indexes() # Schema as it was before the composite indexes
+        seconds = populate(args.jobs)
+        print(f"{database.engine.dialect.name}: {args.jobs} jobs inserted in {seconds:.1f}s")
+        analyze()
+        with database.session_scope() as db:
+            pending_ids = db.execute(select(UploadJob.id).where(UploadJob.status == JobStatus.PENDING,
+                                                                UploadJob.job_id.like("bench-%")).limit(2 * args.repeat)).scalars().all()
+
+        print(f"{'schema':<18} {'query':<9} {'median ms':>10} {'round-trips':>12}")
+        before = measure("single-col indexes", args.jobs, args.repeat, pending_ids, new=False)
+        start = time.perf_counter()
+        created = job_store.ensure_indexes(database.engine)
+        analyze()
+        print(f"ensure_indexes: {len(created)} created in {time.perf_counter() - start:.1f}s ({', '.join(created)})")
+        after = measure("composite indexes", args.jobs, args.repeat, pending_ids, new=True)
+        print("speed-up: " + ", ".join(f"{name} {before[name][0] / max(after[name][0], 1e-6):.0f}x" for name in before))
+        measure_listing(args.jobs, args.repeat)
+    finally:
+        if TEMP_DB is not None:
+            database.engine.dispose()
+            for suffix in ("", "-wal", "-shm"):
+                pathlib.Path(f"{TEMP_DB}{suffix}").unlink(missing_ok=True)
+        else:
+            with database.engine.begin() as conn:
+                bench_ids = select(UploadJob.id).where(UploadJob.job_id.like("bench-%"))
+                conn.execute(delete(OutputFile).where(OutputFile.job_id.in_(bench_ids)))
+                conn.execute(delete(UploadJob).where(UploadJob.job_id.like("bench-%")))
+            job_store.ensure_indexes(database.engine) # Dropped for the "before" run
+
+if __name__ == "__main__":
+    main()
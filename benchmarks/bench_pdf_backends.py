@@ -0,0 +1,109 @@
+# benchmarks/bench_pdf_backends.py
+"""
+Render time, size and visual difference of the combined PDF per render backend (config.PDF_RENDER_BACKENDS).
+Runs on the sample order PDFs in the repo root; the mapped data is built once per order,
+so only write_combined_pdf is timed. The fpdf output is the reference for the visual diff:
+every page of both documents is rasterized with PyMuPDF and the share of differing pixels is reported
+(worst page), together with page count and extracted-text equality.
+
+Usage: python benchmarks/bench_pdf_backends.py [--repeat N] [--scale N] [--profile NAME] [--dpi N] [--save DIR] [pdf ...]
+  --scale N   repeats the positions of each order N times (long documents)
+  --save DIR  also writes both renderings per order to DIR for manual inspection
+"""
+import argparse
+import io
+import logging
+import pathlib
+import sys
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+import fitz # PyMuPDF
+
+import pdf_parser
+import data_mapper
+import pdf_writer
+from config import BASE_DIR, PDF_OUTPUT_PROFILES, PDF_RENDER_BACKENDS, DEFAULT_PDF_PROFILE
+
+SAMPLE_ORDERS = sorted(BASE_DIR.glob("D & M KG-*.pdf"))
+REFERENCE_BACKEND = "fpdf"
+
+
+def load_order(pdf_path: pathlib.Path, scale: int):
+    mapped_data = data_mapper.map_data_to_template(pdf_parser.extract_data_from_pdf(pdf_path))
+    if scale > 1:
+        positions = mapped_data["positionen"]
+        # Keep the trailing summary item last so it is still skipped
+        mapped_data["positionen"] = positions[:-1] * scale + positions[-1:]
+    return mapped_data
+
+
+def render(mapped_data, profile: str, backend: str) -> bytes:
+    buffer = io.BytesIO()
+    if not pdf_writer.write_combined_pdf(mapped_data, sink=buffer, profile=profile, backend=backend):
+        raise RuntimeError(f"write_combined_pdf failed for backend {backend} ({profile} profile)")
+    return buffer.getvalue()
+
+
+def visual_diff(pdf_bytes: bytes, reference_bytes: bytes, dpi: int):
+    """ (page counts equal, text equal, worst per-page share of differing pixels in %) """
+    doc, reference = fitz.open(stream=pdf_bytes, filetype="pdf"), fitz.open(stream=reference_bytes, filetype="pdf")
+    try:
+        # Same words per page; the drawing order (and so the extraction order) differs between the backends
+        same_text = all(sorted(page.get_text().split()) == sorted(ref_page.get_text().split()) for page, ref_page in zip(doc, reference))
+        worst = 0.0
+        for page, ref_page in zip(doc, reference):
+            pixels = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY).samples
+            ref_pixels = ref_page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY).samples
+            # Anti-aliasing differences of a few grey levels are not layout differences
+            differing = sum(1 for a, b in zip(pixels, ref_pixels) if abs(a - b) > 64)
+            worst = max(worst, differing / max(1, len(ref_pixels)) * 100)
+        return len(doc) == len(reference), same_text, worst
+    finally:
+        doc.close()
+        reference.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdfs", nargs="*", type=pathlib.Path, default=SAMPLE_ORDERS)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--scale", type=int, default=1)
+    parser.add_argument("--profile", choices=sorted(PDF_OUTPUT_PROFILES), default=DEFAULT_PDF_PROFILE)
+    parser.add_argument("--dpi", type=int, default=72, help="Resolution of the visual diff")
+    parser.add_argument("--save", type=pathlib.Path)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    print(f"{'order':<32} {'rows':>6} {'backend':<8} {'pages':>5} {'size KB':>9} {'best ms':>9} {'avg ms':>9} {'speedup':>8} {'text':>5} {'diff %':>7}")
+    for pdf_path in args.pdfs:
+        mapped_data = load_order(pdf_path, args.scale)
+        reference_bytes, reference_ms = None, None
+        for backend in sorted(PDF_RENDER_BACKENDS, key=lambda name: name != REFERENCE_BACKEND):
+            render(mapped_data, args.profile, backend) # Warm-up (font parsing, caches)
+            timings = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                pdf_bytes = render(mapped_data, args.profile, backend)
+                timings.append(time.perf_counter() - start)
+            best_ms = min(timings) * 1000
+            if args.save:
+                args.save.mkdir(parents=True, exist_ok=True)
+                (args.save / f"{pdf_path.stem}.{backend}.pdf").write_bytes(pdf_bytes)
+
+            with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+                page_count = len(doc)
+            if backend == REFERENCE_BACKEND:
+                reference_bytes, reference_ms = pdf_bytes, best_ms
+                same_text, diff = "-", "-"
+            else:
+                same_pages, same_text, worst = visual_diff(pdf_bytes, reference_bytes, args.dpi)
+                same_text = "yes" if same_text and same_pages else "NO"
+                diff = f"{worst:.2f}"
+            print(f"{pdf_path.name:<32} {len(mapped_data['positionen']):>6} {backend:<8} {page_count:>5} {len(pdf_bytes) / 1024:>9.1f} "
+                  f"{best_ms:>9.1f} {sum(timings) / len(timings) * 1000:>9.1f} {reference_ms / best_ms:>7.1f}x {same_text:>5} {diff:>7}")
+
+
+if __name__ == "__main__":
+    main()
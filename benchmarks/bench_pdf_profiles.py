@@ -0,0 +1,71 @@
+# benchmarks/bench_pdf_profiles.py
+"""
+Size / render time of the combined PDF per output profile (config.PDF_OUTPUT_PROFILES).
+Runs on the sample order PDFs in the repo root; the mapped data is built once per order,
+so only write_combined_pdf is timed.
+
+Usage: python benchmarks/bench_pdf_profiles.py [--repeat N] [--scale N] [--parallel] [pdf ...]
+  --scale N   repeats the positions of each order N times (long documents)
+  --parallel  also times write_combined_pdf(parallel=True) (chunked rendering in a process pool)
+  The archive profile needs a TTF font (PDF_FONT_TTF env var or fonts/DejaVuSans.ttf).
+"""
+import argparse
+import io
+import logging
+import pathlib
+import sys
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+import pdf_parser
+import data_mapper
+import pdf_writer
+from config import BASE_DIR, PDF_OUTPUT_PROFILES
+
+SAMPLE_ORDERS = sorted(BASE_DIR.glob("D & M KG-*.pdf"))
+
+
+def load_order(pdf_path: pathlib.Path, scale: int):
+    mapped_data = data_mapper.map_data_to_template(pdf_parser.extract_data_from_pdf(pdf_path))
+    if scale > 1:
+        positions = mapped_data["positionen"]
+        # Keep the trailing summary item last so it is still skipped
+        mapped_data["positionen"] = positions[:-1] * scale + positions[-1:]
+    return mapped_data
+
+
+def render(mapped_data, profile: str, parallel: bool = False) -> int:
+    buffer = io.BytesIO()
+    if not pdf_writer.write_combined_pdf(mapped_data, sink=buffer, profile=profile, parallel=parallel):
+        raise RuntimeError(f"write_combined_pdf failed for profile {profile}")
+    return len(buffer.getvalue())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdfs", nargs="*", type=pathlib.Path, default=SAMPLE_ORDERS)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--scale", type=int, default=1)
+    parser.add_argument("--parallel", action="store_true")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    modes = [False, True] if args.parallel else [False]
+    print(f"{'order':<32} {'rows':>6} {'profile':<9} {'mode':<8} {'size KB':>9} {'best ms':>9} {'avg ms':>9}")
+    for pdf_path in args.pdfs:
+        mapped_data = load_order(pdf_path, args.scale)
+        for profile in PDF_OUTPUT_PROFILES:
+            for parallel in modes:
+                render(mapped_data, profile, parallel) # Warm-up (font parsing, caches, process pool start)
+                timings = []
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    size = render(mapped_data, profile, parallel)
+                    timings.append(time.perf_counter() - start)
+                print(f"{pdf_path.name:<32} {len(mapped_data['positionen']):>6} {profile:<9} {'parallel' if parallel else 'serial':<8} "
+                      f"{size / 1024:>9.1f} {min(timings) * 1000:>9.1f} {sum(timings) / len(timings) * 1000:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+# benchmarks/bench_status_cache.py
+"""
+Database read load of /job_status/ polling (api_mainB) without and with the status cache
+(status_cache.py). --pollers clients poll --jobs jobs every --interval seconds until they see the
+job completed or failed, while a worker thread processes the jobs one after another through
+job_queue (sync engine, like job_worker.py) over --seconds seconds. Reports the API's database
+queries per poll, the cache hit ratio, and how long after its commit a completion became visible
+to the pollers (bounded by the poll interval plus the watcher interval, JOB_EVENTS_POLL_SECONDS).
+
+Uses DATABASE_URL; without it a temporary SQLite file, deleted afterwards. On another database the
+rows written by the run (job_id prefix "bench-cache-") are removed again.
+
+Usage: [DATABASE_URL=...] python benchmarks/bench_status_cache.py [--pollers N] [--jobs N] [--seconds N] [--interval S]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import pathlib
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+TEMP_DB = None
+if not os.getenv("DATABASE_URL"):
+    TEMP_DB = pathlib.Path(tempfile.gettempdir()) / f"bench_status_cache_{os.getpid()}.db"
+    os.environ["DATABASE_URL"] = f"sqlite:///{TEMP_DB}"
+
+import httpx
+from sqlalchemy import delete, event, insert, select
+
+import database
+import job_queue
+import models
+import status_cache
+
+FINAL = ("completed", "failed")
+
+def create_jobs(prefix: str, count: int) -> list:
+    job_ids = [f"{prefix}{number}" for number in range(count)]
+    with database.engine.begin() as conn:
+        conn.execute(insert(models.UploadJob), [{"job_id": job_id, "original_filename": "bench.pdf", "status": models.JobStatus.PENDING,
+                                                  "upload_time": job_queue.utcnow()} for job_id in job_ids])
+    return job_ids
+
+def process_jobs(count: int, seconds: float, completed_at: dict):
+    """ Leases, advances and completes the jobs one by one (another process in production); records commit times. """
+    for _ in range(count):
+        time.sleep(seconds / count)
+        with database.session_scope() as db:
+            for job_id in job_queue.lease_jobs(db, "bench-worker", 1):
+                job_queue.set_progress(db, job_id, "bench-worker", stage="parsing")
+                job_queue.complete_job(db, job_id, "bench-worker", [])
+                completed_at[job_id] = time.monotonic()
+
+async def run(mode: str, pollers: int, jobs: int, seconds: float, interval: float):
+    import api_mainB
+    api_mainB.STATUS_CACHE = status_cache.StatusCache(ttl=0 if mode == "no cache" else status_cache.STATUS_CACHE_TTL_SECONDS)
+    job_ids = create_jobs(f"bench-cache-{mode.replace(' ', '')}-", jobs)
+    queries = [0]
+    def count_query(*args):
+        queries[0] += 1
+    async_engine = database.get_async_engine().sync_engine
+    event.listen(async_engine, "before_cursor_execute", count_query)
+
+    completed_at, seen_final, polls = {}, {}, [0]
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=api_mainB.app), base_url="http://bench", timeout=60) as client:
+        async def poller(index: int):
+            job_id = job_ids[index % len(job_ids)]
+            await asyncio.sleep(random.uniform(0, interval))
+            while True:
+                response = await client.get(f"/job_status/{job_id}")
+                polls[0] += 1
+                if response.json()["status"] in FINAL:
+                    seen_final.setdefault(job_id, []).append(time.monotonic())
+                    return
+                await asyncio.sleep(interval)
+        watcher = asyncio.create_task(api_mainB.watch_job_progress()) # No lifespan events through ASGITransport
+        worker = asyncio.get_running_loop().run_in_executor(None, process_jobs, jobs, seconds, completed_at)
+        await asyncio.gather(*(poller(index) for index in range(pollers)))
+        await worker
+        watcher.cancel()
+    await database.get_async_engine().dispose() # Pooled connections belong to this event loop
+    event.remove(async_engine, "before_cursor_execute", count_query)
+    delays = [(seen - completed_at[job_id]) * 1000 for job_id, times in seen_final.items() for seen in times]
+    return {"polls": polls[0], "queries": queries[0], "stats": api_mainB.STATUS_CACHE.stats(), "delays": delays}
+
+def cleanup():
+    with database.engine.begin() as conn:
+        bench_ids = select(models.UploadJob.id).where(models.UploadJob.job_id.like("bench-cache-%"))
+        conn.execute(delete(models.OutputFile).where(models.OutputFile.job_id.in_(bench_ids)))
+        conn.execute(delete(models.UploadJob).where(models.UploadJob.job_id.like("bench-cache-%")))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pollers", type=int, default=200)
+    parser.add_argument("--jobs", type=int, default=50)
+    parser.add_argument("--seconds", type=float, default=15, help="Time the worker takes for all jobs")
+    parser.add_argument("--interval", type=float, default=1.0, help="Seconds between two polls of a client")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    models.Base.metadata.create_all(bind=database.engine)
+    try:
+        print(f"{database.engine.dialect.name}, {args.pollers} pollers every {args.interval}s on {args.jobs} jobs for {args.seconds}s, "
+              f"cache TTL {status_cache.STATUS_CACHE_TTL_SECONDS}s")
+        print(f"{'mode':<10} {'polls':>7} {'db queries':>11} {'per poll':>9} {'hit ratio':>10} {'visible after (ms) p50':>23} {'max':>7}")
+        results = {}
+        for mode in ("no cache", "cache"):
+            result = results[mode] = asyncio.run(run(mode, args.pollers, args.jobs, args.seconds, args.interval))
+            print(f"{mode:<10} {result['polls']:>7} {result['queries']:>11} {result['queries'] / result['polls']:>9.3f} "
+                  f"{result['stats']['hit_ratio'] or 0:>10.3f} {statistics.median(result['delays']):>23.0f} {max(result['delays']):>7.0f}")
+        print(f"database reads per poll reduced {results['no cache']['queries'] / results['no cache']['polls'] / max(results['cache']['queries'] / results['cache']['polls'], 1e-9):.1f}x")
+    finally:
+        if TEMP_DB is not None:
+            database.engine.dispose()
+            for suffix in ("", "-wal", "-shm"):
+                pathlib.Path(f"{TEMP_DB}{suffix}").unlink(missing_ok=True)
+        else:
+            cleanup()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# benchmarks/bench_status_polls.py
+"""
+Upload latency of api_mainB with and without a storm of /job_status/ polls on the same event loop.
+Status polls go through the async engine, so they wait for the database without blocking the loop;
+the uploads should only pay for the CPU the polls use, never for their database round-trips.
+
+Uses DATABASE_URL; without it a temporary SQLite file (aiosqlite). Rows and input files created by
+the run are removed afterwards.
+
+Usage: [DATABASE_URL=...] python benchmarks/bench_status_polls.py [--uploads N] [--pollers N]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import pathlib
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+if not os.getenv("DATABASE_URL"):
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.gettempdir()}/bench_status_polls_{os.getpid()}.db"
+
+import httpx
+
+import database
+import models
+from config import BASE_DIR
+
+SAMPLE_PDF = sorted(BASE_DIR.glob("D & M KG-*.pdf"))[0]
+
+def percentile(values, share: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))] * 1000 if values else 0.0
+
+async def run(uploads: int, pollers: int):
+    import api_mainB
+    pdf_bytes = SAMPLE_PDF.read_bytes()
+    job_ids = []
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=api_mainB.app), base_url="http://bench", timeout=60) as client:
+        async def upload_series():
+            latencies = []
+            for _ in range(uploads):
+                start = time.perf_counter()
+                response = await client.post("/process_pdf/", files={"file": ("bench.pdf", pdf_bytes, "application/pdf")})
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != 202:
+                    raise RuntimeError(f"Upload failed: {response.status_code} {response.text}")
+                job_ids.append(response.json()["job_id"])
+            return latencies
+
+        await upload_series() # Warm-up (imports, pool, first statements)
+        idle = await upload_series()
+
+        polls, stop = [0], asyncio.Event()
+        async def poller(index: int):
+            while not stop.is_set():
+                await client.get(f"/job_status/{job_ids[index % len(job_ids)]}")
+                polls[0] += 1
+        tasks = [asyncio.create_task(poller(index)) for index in range(pollers)]
+        await asyncio.sleep(0.2) # Pollers running
+        start = time.perf_counter()
+        try:
+            loaded = await upload_series()
+        finally:
+            elapsed = time.perf_counter() - start
+            stop.set()
+            await asyncio.gather(*tasks)
+    await database.get_async_engine().dispose()
+    return idle, loaded, polls[0] / elapsed, job_ids
+
+def cleanup(job_ids):
+    with database.session_scope() as db:
+        for job in db.query(models.UploadJob).filter(models.UploadJob.job_id.in_(job_ids)).all():
+            if job.input_file_path:
+                (BASE_DIR / job.input_file_path).unlink(missing_ok=True)
+            db.delete(job)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uploads", type=int, default=30)
+    parser.add_argument("--pollers", type=int, default=50)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    models.Base.metadata.create_all(bind=database.engine)
+    idle, loaded, polls_per_second, job_ids = asyncio.run(run(args.uploads, args.pollers))
+    try:
+        print(f"{database.engine.dialect.name}, {args.uploads} uploads, {args.pollers} concurrent pollers")
+        print(f"{'uploads':<22} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}")
+        print(f"{'idle':<22} {percentile(idle, 0.5):>8.1f} {percentile(idle, 0.95):>8.1f} {max(idle) * 1000:>8.1f}")
+        print(f"{'during status polls':<22} {percentile(loaded, 0.5):>8.1f} {percentile(loaded, 0.95):>8.1f} {max(loaded) * 1000:>8.1f}")
+        print(f"status polls served meanwhile: {polls_per_second:.0f}/s")
+    finally:
+        cleanup(job_ids)
+
+if __name__ == "__main__":
+    main()
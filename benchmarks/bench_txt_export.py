@@ -0,0 +1,137 @@
+# benchmarks/bench_txt_export.py
+"""
+Regression check and throughput of the AUFTRAGEXPORT TXT writer (text_writer.TXT_HEADER_COLUMNS /
+TXT_POSITION_COLUMNS, compiled by compile_txt_row_builder).
+
+Regression: every sample order PDF in the repo root is exported and compared, column by column,
+with the checked-in TXT exports of the same Kunden-Auftrags-Nr (*.txt in the repo root).
+Exports made before later fixes differ in known columns (KNOWN_DIFFERENCES); any other
+difference fails the check (exit code 1).
+
+Benchmark: the positions of a sample order are repeated up to --rows rows and written to an
+in-memory sink (largest sample order). --baseline REV also times text_writer.py as of git revision REV.
+
+Usage: python benchmarks/bench_txt_export.py [--rows N] [--repeat N] [--baseline REV] [--no-check]
+"""
+import argparse
+import io
+import logging
+import pathlib
+import subprocess
+import sys
+import time
+import types
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+import pdf_parser
+import data_mapper
+import text_writer
+from config import BASE_DIR
+
+SAMPLE_ORDERS = sorted(BASE_DIR.glob("D & M KG-*.pdf"))
+# The 20250421 exports predate two fixes: Anschlag came from the default ('grau') instead of
+# Farben_Anschlagstopfen, Positionsnummerierung was 0-based. The 45822 export also has hwf9006 for
+# Fuehrungsschiene/Reviblende where the order PDF says hwf9016.
+KNOWN_DIFFERENCES = {
+    "20250421_45342_4501436938_AUFTRAGEXPORT.txt": {"Anschlag", "Positionsnummerierung"},
+    "20250421_45822_4501459685_AUFTRAGEXPORT.txt": {"Anschlag", "Positionsnummerierung", "FehroFS", "Revision"},
+}
+
+
+def export_txt(module, mapped_data) -> str:
+    sink = io.StringIO()
+    if module.write_auftrag_export_txt(mapped_data, sink=sink) is None:
+        raise RuntimeError("write_auftrag_export_txt failed")
+    return sink.getvalue()
+
+
+def column_diffs(lines, reference_lines):
+    """{column name: number of differing rows}; a different row count is reported as 'rows'."""
+    diffs = {}
+    if len(lines) != len(reference_lines):
+        diffs["rows"] = abs(len(lines) - len(reference_lines))
+    for row, (line, reference_line) in enumerate(zip(lines, reference_lines)):
+        columns = text_writer.TXT_HEADER_COLUMNS if row == 0 else text_writer.TXT_POSITION_COLUMNS
+        fields, reference_fields = line.split(text_writer.DELIMITER), reference_line.split(text_writer.DELIMITER)
+        if len(fields) != len(reference_fields):
+            diffs["columns"] = diffs.get("columns", 0) + 1
+            continue
+        for (name, _), value, reference in zip(columns, fields, reference_fields):
+            if value != reference:
+                diffs[name] = diffs.get(name, 0) + 1
+    return diffs
+
+
+def check_exports() -> bool:
+    ok = True
+    for pdf_path in SAMPLE_ORDERS:
+        mapped_data = data_mapper.map_data_to_template(pdf_parser.extract_data_from_pdf(pdf_path))
+        lines = export_txt(text_writer, mapped_data).splitlines()
+        order_nr = str(mapped_data["kopf"].get("Kunden-Auftrags-Nr", ""))
+        for reference_path in sorted(BASE_DIR.glob(f"*_{order_nr}*.txt")):
+            diffs = column_diffs(lines, reference_path.read_text(encoding="utf-8").splitlines())
+            unexpected = set(diffs) - KNOWN_DIFFERENCES.get(reference_path.name, set())
+            status = "identical" if not diffs else ("FAIL" if unexpected else "known differences")
+            details = ", ".join(f"{name} ({count} rows)" for name, count in sorted(diffs.items()))
+            print(f"{reference_path.name:<48} {status}{': ' + details if details else ''}")
+            ok = ok and not unexpected
+    return ok
+
+
+def load_baseline(revision: str):
+    """text_writer.py as of a git revision, loaded as a separate module."""
+    source = subprocess.run(["git", "show", f"{revision}:text_writer.py"], cwd=BASE_DIR,
+                            check=True, capture_output=True, text=True).stdout
+    module = types.ModuleType(f"text_writer_{revision}")
+    exec(compile(source, f"text_writer.py@{revision}", "exec"), module.__dict__)
+    return module
+
+
+def benchmark(modules, rows: int, repeat: int):
+    orders = [data_mapper.map_data_to_template(pdf_parser.extract_data_from_pdf(pdf_path)) for pdf_path in SAMPLE_ORDERS]
+    mapped_data = max(orders, key=lambda order: len(order["positionen"]))
+    positions = mapped_data["positionen"]
+    # Keep the trailing summary item last so it is still skipped
+    items = positions[:-1]
+    mapped_data["positionen"] = (items * (rows // len(items) + 1))[:rows] + positions[-1:]
+
+    reference_output, reference_ms = None, None
+    print(f"{'writer':<24} {'rows':>8} {'best ms':>9} {'avg ms':>9} {'rows/s':>10} {'speedup':>8}")
+    for label, module in modules:
+        output = export_txt(module, mapped_data) # Warm-up
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            export_txt(module, mapped_data)
+            timings.append(time.perf_counter() - start)
+        best_ms = min(timings) * 1000
+        if reference_output is None:
+            reference_output, reference_ms = output, best_ms
+        elif output != reference_output:
+            print(f"{label}: output differs from {modules[0][0]}")
+        print(f"{label:<24} {rows:>8} {best_ms:>9.1f} {sum(timings) / len(timings) * 1000:>9.1f} "
+              f"{rows / (best_ms / 1000):>10.0f} {reference_ms / best_ms:>7.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--baseline", help="git revision of text_writer.py to compare against")
+    parser.add_argument("--no-check", action="store_true", help="skip the regression check")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    ok = True
+    if not args.no_check:
+        ok = check_exports()
+        print()
+    modules = [(f"text_writer@{args.baseline}", load_baseline(args.baseline))] if args.baseline else []
+    modules.append(("text_writer", text_writer))
+    benchmark(modules, args.rows, args.repeat)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# benchmarks/check_s3_artifact_store.py
+"""
+Checks the s3 artifact store (artifact_store.S3ArtifactStore) against a real S3 API:
+ARTIFACT_S3_ENDPOINT_URL (e.g. a local MinIO, credentials from the AWS_* variables) or, without
+it, a moto server started on localhost (pip install boto3 "moto[server]"). Runs exists / open_stream
+on a missing artifact (the 404 of head_object and the NoSuchKey of get_object), put_file of new and
+duplicate content, streamed reads and a multipart upload, then removes its objects (prefix
+"check-artifacts/"). Exits 1 on the first failed check.
+
+Usage: [ARTIFACT_S3_ENDPOINT_URL=... ARTIFACT_S3_BUCKET=...] python benchmarks/check_s3_artifact_store.py
+"""
+import hashlib
+import os
+import pathlib
+import sys
+import tempfile
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+# artifact_store imports models; the s3 store never connects to the database
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{pathlib.Path(tempfile.gettempdir()) / 'check_s3_artifact_store.db'}")
+
+import artifact_store
+from config import ARTIFACT_S3_BUCKET, ARTIFACT_S3_ENDPOINT_URL, ARTIFACT_S3_REGION, ARTIFACT_CHUNK_BYTES
+
+PREFIX = "check-artifacts/"
+
+def check(condition: bool, label: str):
+    print(f"{'ok  ' if condition else 'FAIL'} {label}")
+    if not condition:
+        raise SystemExit(1)
+
+def start_moto() -> str:
+    """ Endpoint of a moto server in this process (local stand-in for S3). """
+    try:
+        from moto.server import ThreadedMotoServer
+    except ImportError:
+        raise SystemExit('ARTIFACT_S3_ENDPOINT_URL is not set and moto is missing: pip install "moto[server]", or point it at MinIO.')
+    for name, value in (("AWS_ACCESS_KEY_ID", "check"), ("AWS_SECRET_ACCESS_KEY", "check"), ("AWS_DEFAULT_REGION", "us-east-1")):
+        os.environ.setdefault(name, value)
+    server = ThreadedMotoServer(ip_address="127.0.0.1", port=0)
+    server.start()
+    host, port = server.get_host_and_port()
+    return f"http://{host}:{port}"
+
+def main():
+    endpoint = ARTIFACT_S3_ENDPOINT_URL or start_moto()
+    print(f"S3 endpoint {endpoint}, bucket {ARTIFACT_S3_BUCKET}")
+    store = artifact_store.S3ArtifactStore(prefix=PREFIX, endpoint_url=endpoint, region=ARTIFACT_S3_REGION or "us-east-1")
+    client = store.client
+    try:
+        client.head_bucket(Bucket=ARTIFACT_S3_BUCKET)
+    except store._client_error:
+        client.create_bucket(Bucket=ARTIFACT_S3_BUCKET)
+
+    try:
+        with tempfile.TemporaryDirectory(prefix="check_s3_") as scratch:
+            small, large = pathlib.Path(scratch) / "small.txt", pathlib.Path(scratch) / "large.bin"
+            small.write_bytes(b"Auftrag;4501459759;\n" * 1000)
+            large.write_bytes(os.urandom(20 * 2**20)) # Above boto3's multipart threshold (8 MB)
+            missing = hashlib.sha256(b"not stored").hexdigest()
+
+            # --- Missing artifact: the errors the real API returns ---
+            try:
+                client.head_object(Bucket=ARTIFACT_S3_BUCKET, Key=store._key(missing))
+                check(False, "head_object of a missing key raises")
+            except store._client_error as e:
+                check(store._is_missing(e), f"head_object 404 is recognized as missing (code {e.response['Error'].get('Code')})")
+            check(store.exists(missing) is False, "exists() is False for a missing artifact")
+            try:
+                store.open_stream(missing)
+                check(False, "open_stream() of a missing artifact raises")
+            except artifact_store.ArtifactNotFound:
+                check(True, "open_stream() raises ArtifactNotFound for a missing artifact, before iterating")
+
+            # --- Put, deduplicate, read back ---
+            digest, size, stored = store.put_file(small)
+            check(stored and digest == hashlib.sha256(small.read_bytes()).hexdigest() and size == small.stat().st_size,
+                  "put_file() stores new content under its SHA-256")
+            check(store.put_file(small)[2] is False, "put_file() of the same content does not store it again")
+            check(store.exists(digest), "exists() is True after put_file()")
+            chunks = list(store.open_stream(digest, chunk_size=4096))
+            check(b"".join(chunks) == small.read_bytes() and max(map(len, chunks)) <= 4096, "open_stream() returns the bytes in chunks")
+            head = client.head_object(Bucket=ARTIFACT_S3_BUCKET, Key=store._key(digest))
+            check(head["Metadata"].get("sha256") == digest, "object carries its sha256 as metadata")
+
+            large_digest = store.put_file(large)[0]
+            read, largest_chunk = hashlib.sha256(), 0
+            for chunk in store.open_stream(large_digest):
+                read.update(chunk); largest_chunk = max(largest_chunk, len(chunk))
+            check(read.hexdigest() == large_digest and largest_chunk <= ARTIFACT_CHUNK_BYTES,
+                  "20 MB artifact (multipart upload) streams back intact in ARTIFACT_CHUNK_BYTES pieces")
+    finally:
+        listed = client.list_objects_v2(Bucket=ARTIFACT_S3_BUCKET, Prefix=PREFIX).get("Contents", [])
+        if listed:
+            client.delete_objects(Bucket=ARTIFACT_S3_BUCKET, Delete={"Objects": [{"Key": item["Key"]} for item in listed]})
+    print("all checks passed")
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 
 # config.py
+import os
 import pathlib
 import re
 
@@ -331,3 +332,116 @@ PDF_COL_CONFIG = {
 }
 
 
+
+# --- PDF Output Profiles ---
+# TTF files for the embedded Unicode font (style -> path); bold/italic fall back to the regular file if missing
+PDF_EMBED_FONT_FILES = {
+    "": os.getenv("PDF_FONT_TTF", str(BASE_DIR / "fonts" / "DejaVuSans.ttf")),
+    "B": os.getenv("PDF_FONT_TTF_BOLD", str(BASE_DIR / "fonts" / "DejaVuSans-Bold.ttf")),
+    "I": os.getenv("PDF_FONT_TTF_ITALIC", str(BASE_DIR / "fonts" / "DejaVuSans-Oblique.ttf")),
+}
+# The standard profile uses the Unicode font whenever it is installed, the Helvetica core font (latin-1) otherwise
+PDF_UNICODE_FONT_AVAILABLE = pathlib.Path(PDF_EMBED_FONT_FILES[""]).is_file()
+
+# standard: current layout; draft: uncompressed, core font, no decorative cell/underline borders (fast screen preview);
+# archive: compressed streams with an embedded, subsetted TTF font (small files for long-term storage)
+PDF_OUTPUT_PROFILES = {
+    "standard": {"compress": True, "borders": True, "embed_font": PDF_UNICODE_FONT_AVAILABLE},
+    "draft": {"compress": False, "borders": False, "embed_font": False},
+    "archive": {"compress": True, "borders": True, "embed_font": True},
+}
+DEFAULT_PDF_PROFILE = "standard"
+# Profiles that need the TTF font while it is not installed (archive without fonts/DejaVuSans.ttf or PDF_FONT_TTF):
+# profile -> reason; the API answers 400 and the CLI refuses them instead of writing a core-font PDF
+PDF_UNAVAILABLE_PROFILES = {
+    name: f"it needs the embedded font {PDF_EMBED_FONT_FILES['']}, which is not installed (set PDF_FONT_TTF)"
+    for name, settings in PDF_OUTPUT_PROFILES.items() if settings["embed_font"] and not PDF_UNICODE_FONT_AVAILABLE
+}
+
+# --- Parallel PDF Rendering (write_combined_pdf(parallel=True)) ---
+PDF_PARALLEL_WORKERS = int(os.getenv("PDF_PARALLEL_WORKERS", "0")) or os.cpu_count() or 1
+PDF_PARALLEL_CHUNK_PAGES = int(os.getenv("PDF_PARALLEL_CHUNK_PAGES", "8")) # Positionen pages per worker task
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "16")) # Shorter tables are rendered serially
+
+# --- PDF Render Backends (write_combined_pdf(backend=...)) ---
+# fpdf: pdf_writer.PDFWithHeaderFooter (reference layout); pymupdf: pymupdf_writer, same layout drawn with PyMuPDF
+PDF_RENDER_BACKENDS = ("fpdf", "pymupdf")
+DEFAULT_PDF_BACKEND = os.getenv("PDF_RENDER_BACKEND", "fpdf").lower()
+
+# --- TXT Export Streaming (text_writer.iter_auftrag_export_txt) ---
+TXT_STREAM_BATCH_ROWS = int(os.getenv("TXT_STREAM_BATCH_ROWS", "500")) # Rows per yielded chunk
+# One-shot position iterators are exported into a spool first (the header needs all positions);
+# it stays in memory up to this size and moves to a temporary file beyond it
+TXT_STREAM_SPOOL_MAX_BYTES = int(os.getenv("TXT_STREAM_SPOOL_MAX_BYTES", str(4 * 1024 * 1024)))
+
+# --- Daily Consolidated ERP Import (text_writer.append_order_to_daily_import) ---
+# One TXT per day (and batch) collects many orders; it is written as *.part and renamed when rotated
+ERP_IMPORT_DIR = pathlib.Path(os.getenv("ERP_IMPORT_DIR", str(BASE_DIR / "erp_import")))
+
+# --- Upload Ingest (upload_ingest.py) ---
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(20 * 1024 * 1024)))
+UPLOAD_MAX_PAGES = int(os.getenv("UPLOAD_MAX_PAGES", "200"))
+UPLOAD_CHUNK_BYTES = 64 * 1024
+UPLOAD_PAGE1_MARKERS = ("KD_AUFTRAG", "BESTNR") # PDF_MARKERS that page 1 of a D&M KG order must contain
+
+# --- Artifact Deduplication (artifact_index.py) ---
+# Outputs are reused for an upload with the same content hash, options and config version.
+# Empty: the version is derived from the parser/mapper/writer sources, config and template.xlsx
+OUTPUT_CONFIG_VERSION = os.getenv("OUTPUT_CONFIG_VERSION", "")
+OUTPUT_VERSION_SOURCES = ("config.py", "pdf_parser.py", "data_mapper.py", "excel_writer.py", "pdf_writer.py",
+                          "pymupdf_writer.py", "text_writer.py", "template.xlsx")
+
+# --- API Processing Pool (api_main) ---
+# Uploads are parsed/rendered in a process pool; beyond workers + queue depth requests get 429 + Retry-After
+API_PROCESS_WORKERS = int(os.getenv("API_PROCESS_WORKERS", "0")) or os.cpu_count() or 1
+API_QUEUE_DEPTH = int(os.getenv("API_QUEUE_DEPTH", "8")) # Accepted requests waiting for a free worker
+API_RETRY_AFTER_SECONDS = int(os.getenv("API_RETRY_AFTER_SECONDS", "5")) # Initial estimate of one task's duration
+
+# --- Batch Uploads (api_main /process_batch/) ---
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "200")) # PDFs per batch (multipart parts or zip members)
+BATCH_MAX_BYTES = int(os.getenv("BATCH_MAX_BYTES", str(500 * 1024 * 1024))) # Whole request; each PDF is still limited to UPLOAD_MAX_BYTES
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "0")) or API_PROCESS_WORKERS # Batch files in the process pool at once (all batches together)
+BATCH_HISTORY = int(os.getenv("BATCH_HISTORY", "100")) # Finished batches kept for /batch_status/
+
+# --- Downloads (file_responses.py) ---
+DOWNLOAD_CACHE_MAX_AGE = int(os.getenv("DOWNLOAD_CACHE_MAX_AGE", "3600")) # Seconds; clients revalidate with ETag/Last-Modified after that
+ZIP_DEFLATED_TYPES = ("txt",) # Bundle entries that are compressed; xlsx and pdf are compressed already and are stored
+ZIP_STREAM_CHUNK_BYTES = 64 * 1024 # Read size per member while streaming a bundle
+
+# --- Job Progress Events (job_events.py, api_mainB /job_events/) ---
+JOB_EVENTS_MAX_JOBS = int(os.getenv("JOB_EVENTS_MAX_JOBS", "1000")) # Jobs whose events are kept for late subscribers
+JOB_EVENTS_HEARTBEAT_SECONDS = 15 # Keep-alive comment on idle event streams (proxies drop silent connections)
+JOB_EVENTS_POLL_SECONDS = float(os.getenv("JOB_EVENTS_POLL_SECONDS", "0.5")) # One query for all streamed jobs per interval (workers run elsewhere)
+
+# --- Job Queue (job_queue.py; api_mainB enqueues, job_worker.py processes) ---
+JOB_VISIBILITY_TIMEOUT = int(os.getenv("JOB_VISIBILITY_TIMEOUT", "300")) # Seconds a lease lasts; renewed every third of it while the job runs
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_BASE_SECONDS = int(os.getenv("JOB_RETRY_BASE_SECONDS", "10")) # Backoff: base * 2^(attempt-1), jittered, capped
+JOB_RETRY_MAX_SECONDS = int(os.getenv("JOB_RETRY_MAX_SECONDS", "600"))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "1")) # Idle worker's wait between queue checks
+JOB_WORKER_CONCURRENCY = int(os.getenv("JOB_WORKER_CONCURRENCY", "0")) or os.cpu_count() or 1 # Jobs one worker process runs at once
+
+# --- Job Status Cache (status_cache.py, api_mainB /job_status/) ---
+STATUS_CACHE_TTL_SECONDS = float(os.getenv("STATUS_CACHE_TTL_SECONDS", "3")) # Max gap between polls of a job (and age of its last confirmation) for cache hits; 0 disables the cache
+STATUS_CACHE_MAX_JOBS = int(os.getenv("STATUS_CACHE_MAX_JOBS", "10000"))
+
+# --- Job Listing (api_mainB /jobs, job_store.list_jobs) ---
+JOBS_PAGE_SIZE = 50 # Default page size
+JOBS_PAGE_MAX = 200 # Largest page a client may request
+
+# --- Artifact Storage (artifact_store.py; outputs of queued jobs, content-addressed) ---
+ARTIFACT_STORE_BACKEND = os.getenv("ARTIFACT_STORE_BACKEND", "local") # local, db or s3
+ARTIFACT_LOCAL_DIR = pathlib.Path(os.getenv("ARTIFACT_LOCAL_DIR", str(BASE_DIR / "artifacts"))) # local: shared volume for several nodes
+ARTIFACT_S3_BUCKET = os.getenv("ARTIFACT_S3_BUCKET", "pdf-artifacts")
+ARTIFACT_S3_PREFIX = os.getenv("ARTIFACT_S3_PREFIX", "artifacts/")
+ARTIFACT_S3_ENDPOINT_URL = os.getenv("ARTIFACT_S3_ENDPOINT_URL") # S3-compatible server, e.g. http://localhost:9000 (MinIO); credentials from the AWS_* variables
+ARTIFACT_S3_REGION = os.getenv("ARTIFACT_S3_REGION")
+ARTIFACT_CHUNK_BYTES = 256 * 1024 # Read/stream piece size; also the row size of the db backend's chunks
+
+# --- Output Formats ---
+# File extension -> media type, shared by the writers' in-memory mode and the API responses
+OUTPUT_MEDIA_TYPES = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "pdf": "application/pdf",
+    "txt": "text/plain; charset=utf-8",
+}
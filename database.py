@@ -1,5 +1,6 @@
 # database.py
-from sqlalchemy import create_engine
+from contextlib import asynccontextmanager, contextmanager
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
@@ -14,16 +15,130 @@ DB_PASSWORD = os.getenv("DB_PASSWORD", "password")
 DB_HOST = os.getenv("DB_HOST", "localhost")
 DB_PORT = os.getenv("DB_PORT", "5432")
 DB_NAME = os.getenv("DB_NAME", "pdf_processor_db")
-DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-engine = create_engine(DATABASE_URL)
+# DATABASE_URL overrides the Postgres settings, e.g. sqlite:///./pdf_jobs.db as local stand-in
+DATABASE_URL = os.getenv("DATABASE_URL") or f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+
+# Connection pool, per process (each API worker, queue worker and queue pool process has its own):
+# at most DB_POOL_SIZE + DB_MAX_OVERFLOW connections; beyond that a checkout waits up to DB_POOL_TIMEOUT seconds
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "5"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800")) # Seconds; replaces connections before server/proxy idle timeouts
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") != "0" # Test connections on checkout (drops dead ones after DB restarts)
+
+pool_options = {"pool_size": DB_POOL_SIZE, "max_overflow": DB_MAX_OVERFLOW, "pool_timeout": DB_POOL_TIMEOUT,
+                "pool_recycle": DB_POOL_RECYCLE, "pool_pre_ping": DB_POOL_PRE_PING}
+if DATABASE_URL.startswith("sqlite"):
+    # API threads and queue workers share the file; wait for the write lock instead of failing at once
+    engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False, "timeout": 30}, **pool_options)
+else:
+    engine = create_engine(DATABASE_URL, **pool_options)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# Async engine for the API's endpoints (queries do not block the event loop), created on first use so the
+# sync-only queue workers need no async driver: asyncpg for Postgres, aiosqlite for the SQLite stand-in
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+_scheme, _address = DATABASE_URL.split("://", 1)
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or f"{ASYNC_DRIVERS.get(_scheme, _scheme)}://{_address}"
+_async_engine = None
+_async_session_factory = None
+
+def get_async_engine():
+    global _async_engine, _async_session_factory
+    if _async_engine is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine # Needs greenlet (sqlalchemy[asyncio])
+        connect_args = {"timeout": 30} if ASYNC_DATABASE_URL.startswith("sqlite") else {}
+        _async_engine = create_async_engine(ASYNC_DATABASE_URL, connect_args=connect_args, **pool_options)
+        _async_session_factory = async_sessionmaker(_async_engine, autoflush=False, expire_on_commit=False)
+        _add_pool_counters(_async_engine.sync_engine, _async_pool_counters)
+        if _async_engine.dialect.name == "sqlite":
+            _use_sqlite_wal(_async_engine.sync_engine)
+    return _async_engine
+
+@asynccontextmanager
+async def async_session_scope():
+    """ AsyncSession: commit on success, rollback on error, always closed (connection back to the pool). """
+    get_async_engine()
+    db = _async_session_factory()
+    try:
+        yield db
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+    finally:
+        await db.close()
+
 # Dependency to get DB session in API routes
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+@contextmanager
+def session_scope():
+    """ Session for work outside a request (queue workers, watchers): commit on success, rollback on error, always closed. """
+    db = SessionLocal()
+    try:
+        yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+# --- Pool statistics ---
+def _new_pool_counters() -> dict:
+    return {"connections_opened": 0, "checkouts": 0, "invalidated": 0, "peak_checked_out": 0}
+
+_pool_counters, _async_pool_counters = _new_pool_counters(), _new_pool_counters()
+
+def _add_pool_counters(sync_engine, counters: dict):
+    @event.listens_for(sync_engine, "connect")
+    def _count_connect(dbapi_connection, connection_record):
+        counters["connections_opened"] += 1
+
+    @event.listens_for(sync_engine, "checkout")
+    def _count_checkout(dbapi_connection, connection_record, connection_proxy):
+        counters["checkouts"] += 1
+        counters["peak_checked_out"] = max(counters["peak_checked_out"], sync_engine.pool.checkedout())
+
+    @event.listens_for(sync_engine, "invalidate")
+    def _count_invalidate(dbapi_connection, connection_record, exception):
+        counters["invalidated"] += 1 # Includes connections found dead by the pre-ping
+
+_add_pool_counters(engine, _pool_counters)
+
+def _use_sqlite_wal(sync_engine):
+    """ SQLite stand-in: WAL lets status reads run next to the queue's writes instead of locking each other out. """
+    @event.listens_for(sync_engine, "connect")
+    def _set_wal(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.close()
+
+if engine.dialect.name == "sqlite":
+    _use_sqlite_wal(engine)
+
+def _engine_pool_stats(pool, counters: dict) -> dict:
+    return {
+        "pool_size": pool.size(),
+        "max_overflow": DB_MAX_OVERFLOW,
+        "limit": pool.size() + DB_MAX_OVERFLOW,
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(0, pool.overflow()),
+        **counters,
+    }
+
+def pool_stats() -> dict:
+    """ Current usage of this process's pools (sync engine, async engine once used) plus counters since start. """
+    return {
+        "sync": _engine_pool_stats(engine.pool, _pool_counters),
+        "async": _engine_pool_stats(_async_engine.pool, _async_pool_counters) if _async_engine is not None else None,
+    }
@@ -2,6 +2,8 @@
 import openpyxl
 from openpyxl import Workbook
 from openpyxl.styles import Font, Alignment, Border, Side, PatternFill
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.utils import get_column_letter
 import logging
 from datetime import datetime # <--- IMPORT ADDED
 import pathlib # <--- Import pathlib if using Path objects
@@ -32,12 +34,39 @@ KOPF_STATIC_LABELS = {
     "A24": "Bestellblatt_Kopf",
 }
 
-def write_to_excel(mapped_data, output_directory, base_filename):
+# Positionen keys written as numbers (Excel number format '0') instead of text
+NUMERIC_POS_KEYS = {
+    "Anzahl_Links_13", "Anzahl_Rechts_14", "FeBreite_11", "FeHoehe_12",
+    "ISS_Behindertengerecht_40", "ISS_Anzahl_Links_41", "ISS_Anzahl_Rechts_42",
+    "EinzelteilAnzahl_25",
+}
+
+# Order key columns prepended to the consolidated (multi-order) Positionen sheet
+BATCH_ORDER_KEY_COLS = ["Auftragsname", "Kunden-Auftrags-Nr"]
+
+def _pos_cell_value(key, value):
+    """ Converts a Positionen value for Excel. Returns (value, is_numeric). """
+    if key in NUMERIC_POS_KEYS:
+        try:
+            num_value = float(str(value).replace(',', '.'))
+            return (int(num_value) if num_value.is_integer() else num_value), True
+        except (ValueError, TypeError):
+            pass
+    return str(value), False
+
+def _is_skipped_last_row(positions, i):
+    """ The last position is a trailing summary item when it has neither width nor height. """
+    pos_data = positions[i]
+    return i == len(positions) - 1 and not pos_data.get("FeBreite_11") and not pos_data.get("FeHoehe_12")
+
+def write_to_excel(mapped_data, output_directory=None, base_filename=None, sink=None):
     """
     Writes the mapped data to a new Excel file generated programmatically.
+    If `sink` (a binary file-like object, e.g. io.BytesIO) is given, the workbook is
+    written there instead of to output_directory and the sink is returned.
     """
     # Ensure output_directory is a Path object
-    if not isinstance(output_directory, pathlib.Path):
+    if sink is None and not isinstance(output_directory, pathlib.Path):
         output_directory = pathlib.Path(output_directory)
 
     try:
@@ -88,7 +117,7 @@ def write_to_excel(mapped_data, output_directory, base_filename):
 
         for i, pos_data in enumerate(positions):
             # Skip the last row if "FeBreite_11" and "FeHoehe_12" are empty
-            if i == len(positions) - 1 and not pos_data.get("FeBreite_11") and not pos_data.get("FeHoehe_12"):
+            if _is_skipped_last_row(positions, i):
                 logging.info(f"Skipping last row in Excel due to empty 'FeBreite_11' and 'FeHoehe_12'.")
                 continue
 
@@ -98,20 +127,11 @@ def write_to_excel(mapped_data, output_directory, base_filename):
                 if value is not None:
                     cell = pos_sheet.cell(row=row_num, column=col_idx)
                     try:
-                        numeric_keys = ["Anzahl_Links_13", "Anzahl_Rechts_14", "FeBreite_11", "FeHoehe_12",
-                                        "ISS_Behindertengerecht_40", "ISS_Anzahl_Links_41", "ISS_Anzahl_Rechts_42",
-                                        "EinzelteilAnzahl_25"]
-                        if key in numeric_keys:
-                            try:
-                                num_value = float(str(value).replace(',', '.'))
-                                cell.value = int(num_value) if num_value.is_integer() else num_value
-                                cell.alignment = right_align
-                                cell.number_format = '0'
-                            except (ValueError, TypeError):
-                                cell.value = str(value)
-                                cell.alignment = left_align
+                        cell.value, is_numeric = _pos_cell_value(key, value)
+                        if is_numeric:
+                            cell.alignment = right_align
+                            cell.number_format = '0'
                         else:
-                            cell.value = str(value)
                             cell.alignment = left_align
                         cell.border = thin_border
                     except Exception as cell_e:
@@ -129,6 +149,11 @@ def write_to_excel(mapped_data, output_directory, base_filename):
                  adjusted_width = max(width, 8); adjusted_width = min(adjusted_width, 50)
                  sheet.column_dimensions[col_letter].width = adjusted_width
 
+        if sink is not None:
+            wb.save(sink)
+            logging.info("Successfully wrote Excel workbook to in-memory sink.")
+            return sink
+
         output_filename = f"{base_filename}.xlsx"
         output_path = output_directory / output_filename # Correct path definition
         logging.info(f"Saving workbook to {output_path}...")
@@ -138,4 +163,84 @@ def write_to_excel(mapped_data, output_directory, base_filename):
 
     except Exception as e:
         logging.error(f"Error generating or writing to Excel: {e}", exc_info=True)
-        return None
\ No newline at end of file
+        return None
+
+
+def write_orders_to_excel(mapped_orders, output_directory=None, base_filename=None, sink=None, include_kopf=True):
+    """
+    Writes many mapped orders into ONE consolidated workbook (streaming / write-only mode).
+    - Bestellblatt_Positionen: all positions of all orders, keyed by Auftragsname / Kunden-Auftrags-Nr,
+      followed by the POS_COLS_DEFS columns (same order and headers as write_to_excel).
+    - Bestellblatt_Kopf (optional): one row per order with the KOPF_MAP_DATA_CELLS fields.
+    `mapped_orders` may be any iterable (e.g. a generator mapping PDFs one by one); rows are flushed
+    to disk as they are written, so memory stays bounded regardless of the number of orders.
+    Returns the output path (or the sink), or None on error.
+    """
+    if sink is None and not isinstance(output_directory, pathlib.Path):
+        output_directory = pathlib.Path(output_directory)
+
+    try:
+        wb = Workbook(write_only=True)
+        kopf_sheet = wb.create_sheet("Bestellblatt_Kopf") if include_kopf else None
+        pos_sheet = wb.create_sheet("Bestellblatt_Positionen")
+
+        bold_font = Font(bold=True)
+        grey_fill = PatternFill(start_color="D3D3D3", end_color="D3D3D3", fill_type="solid")
+        right_align = Alignment(horizontal="right", vertical="center", wrap_text=True)
+
+        def pos_cell(key, value):
+            # Numbers formatted as in write_to_excel ('0', right-aligned); text as plain values
+            value, is_numeric = _pos_cell_value(key, value)
+            if not is_numeric: return value
+            cell = WriteOnlyCell(pos_sheet, value=value)
+            cell.number_format = '0'; cell.alignment = right_align
+            return cell
+
+        def header_row(sheet, headers):
+            # Column widths must be set before the first row in write-only mode
+            for col_idx, header_text in enumerate(headers, start=1):
+                sheet.column_dimensions[get_column_letter(col_idx)].width = min(max(len(header_text) + 4, 8), 50)
+            cells = []
+            for header_text in headers:
+                cell = WriteOnlyCell(sheet, value=header_text)
+                cell.font = bold_font; cell.fill = grey_fill
+                cells.append(cell)
+            sheet.append(cells)
+
+        sorted_pos_keys = [key for key, (header_text, col_idx) in sorted(POS_COLS_DEFS.items(), key=lambda item: item[1][1])]
+        header_row(pos_sheet, BATCH_ORDER_KEY_COLS + [POS_COLS_DEFS[key][0] for key in sorted_pos_keys])
+        if kopf_sheet is not None:
+            header_row(kopf_sheet, list(KOPF_MAP_DATA_CELLS))
+
+        order_count = 0; row_count = 0
+        for mapped_data in mapped_orders:
+            if not mapped_data: continue
+            kopf_values = mapped_data.get("kopf", {})
+            order_key = [kopf_values.get(key) for key in BATCH_ORDER_KEY_COLS]
+            if kopf_sheet is not None:
+                kopf_sheet.append([kopf_values.get(key) for key in KOPF_MAP_DATA_CELLS])
+
+            positions = mapped_data.get("positionen", [])
+            for i, pos_data in enumerate(positions):
+                if _is_skipped_last_row(positions, i): continue
+                row = list(order_key)
+                for key in sorted_pos_keys:
+                    value = pos_data.get(key)
+                    row.append(pos_cell(key, value) if value is not None else None)
+                pos_sheet.append(row)
+                row_count += 1
+            order_count += 1
+
+        if sink is not None:
+            wb.save(sink)
+            logging.info(f"Wrote consolidated workbook ({order_count} orders, {row_count} positions) to in-memory sink.")
+            return sink
+
+        output_path = output_directory / f"{base_filename}.xlsx"
+        wb.save(output_path)
+        logging.info(f"Successfully generated consolidated Excel file ({order_count} orders, {row_count} positions): {output_path}")
+        return str(output_path)
+
+    except Exception as e:
+        logging.error(f"Error generating consolidated Excel workbook: {e}", exc_info=True)
+        return None
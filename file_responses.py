@@ -0,0 +1,171 @@
+# file_responses.py
+"""
+Download responses for generated output files, shared by api_main and api_mainB:
+media type from config.OUTPUT_MEDIA_TYPES, strong ETag, Last-Modified and Cache-Control,
+304 for If-None-Match / If-Modified-Since, Range and If-Range (206/416, handled by
+Starlette's FileResponse), and zero-copy sending when the ASGI server offers it (uvicorn does
+not: under this repo's server every download takes Starlette's normal send path).
+Artifacts of a non-local store (artifact_store.py) are streamed through, with their content
+digest as ETag. Also streams ZIP bundles of a job's outputs without building the archive on disk.
+"""
+import os
+import pathlib
+import time
+import zipfile
+from email.utils import formatdate, parsedate_to_datetime
+
+from fastapi.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response, StreamingResponse
+
+import artifact_index
+from config import OUTPUT_MEDIA_TYPES, DOWNLOAD_CACHE_MAX_AGE, ZIP_DEFLATED_TYPES, ZIP_STREAM_CHUNK_BYTES
+
+ZERO_COPY_EXTENSION = "http.response.zerocopysend" # ASGI extension; the server calls os.sendfile
+
+def media_type_for(filename: str) -> str:
+    return OUTPUT_MEDIA_TYPES.get(pathlib.Path(filename).suffix.lower().lstrip("."), "application/octet-stream")
+
+def _single_range(range_header: str, size: int):
+    """
+    (start, end) of a single satisfiable "bytes=" range, else None. Parsed here rather than with
+    FileResponse's private helpers, which change between Starlette releases.
+    """
+    unit, _, spec = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, sep, last = spec.strip().partition("-")
+    try:
+        if not sep:
+            return None
+        if not first: # Suffix range: the last N bytes
+            length = int(last)
+            return (max(size - length, 0), size) if 0 < length and size else None
+        start = int(first)
+        end = min(int(last) + 1, size) if last else size
+    except ValueError:
+        return None
+    return (start, end) if 0 <= start < end else None
+
+class OutputFileResponse(FileResponse):
+    """
+    FileResponse that hands the open file to the server for sendfile() if the server offers
+    http.response.zerocopysend. uvicorn does not, so there this is a plain FileResponse (normal send path).
+    """
+    async def __call__(self, scope, receive, send) -> None:
+        if ZERO_COPY_EXTENSION not in scope.get("extensions", {}) or scope["method"].upper() == "HEAD" or self.stat_result is None:
+            return await super().__call__(scope, receive, send)
+
+        size = self.stat_result.st_size
+        offset, count, status_code = 0, size, self.status_code
+        headers = Headers(scope=scope)
+        http_range, http_if_range = headers.get("range"), headers.get("if-range")
+        validators = (self.headers.get("etag"), self.headers.get("last-modified"))
+        if http_range is not None and (http_if_range is None or http_if_range.strip() in validators): # Stale If-Range: whole file
+            byte_range = _single_range(http_range, size)
+            if byte_range is None: # Errors (400/416) and multipart ranges: Starlette's own path
+                return await super().__call__(scope, receive, send)
+            start, end = byte_range
+            offset, count, status_code = start, end - start, 206
+            self.headers["content-range"] = f"bytes {start}-{end - 1}/{size}"
+            self.headers["content-length"] = str(count)
+
+        await send({"type": "http.response.start", "status": status_code, "headers": self.raw_headers})
+        with open(self.path, "rb") as file:
+            await send({"type": ZERO_COPY_EXTENSION, "file": file, "offset": offset, "count": count, "more_body": False})
+        if self.background is not None:
+            await self.background()
+
+def _not_modified(request_headers, etag: str, mtime: float) -> bool:
+    """ If-None-Match wins over If-Modified-Since (RFC 9110, 13.2.2). """
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match is not None:
+        return artifact_index.etag_matches(if_none_match, etag)
+    if_modified_since = request_headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+async def download_response(request, file_path: pathlib.Path, filename: str) -> Response:
+    """ Conditional, range-capable response for a generated file (caller has checked it exists). """
+    stat_result = await run_in_threadpool(os.stat, file_path)
+    etag = await run_in_threadpool(artifact_index.file_etag, file_path)
+    cache_headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(stat_result.st_mtime, usegmt=True),
+        "Cache-Control": f"private, max-age={DOWNLOAD_CACHE_MAX_AGE}",
+    }
+    if _not_modified(request.headers, etag, stat_result.st_mtime):
+        return Response(status_code=304, headers=cache_headers)
+    return OutputFileResponse(path=str(file_path), media_type=media_type_for(filename), filename=filename,
+                              headers=cache_headers, stat_result=stat_result)
+
+async def artifact_response(request, open_stream, filename: str, sha256: str, size=None) -> Response:
+    """
+    Response for an artifact read as a stream (artifact_store open_stream, called in the threadpool):
+    the content digest is the strong ETag, so If-None-Match is answered without touching the store. No ranges.
+    """
+    etag = f'"{sha256}"'
+    cache_headers = {"ETag": etag, "Cache-Control": f"private, max-age={DOWNLOAD_CACHE_MAX_AGE}"}
+    if artifact_index.etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=cache_headers)
+    chunks = await run_in_threadpool(open_stream)
+    headers = {**cache_headers, "Content-Disposition": f'attachment; filename="{filename}"', "Accept-Ranges": "none"}
+    if size is not None:
+        headers["Content-Length"] = str(size)
+    return StreamingResponse(chunks, media_type=media_type_for(filename), headers=headers)
+
+
+# --- ZIP Bundles ---
+class _ZipChunkSink:
+    """ Write-only, unseekable target for ZipFile (entries get data descriptors); drain() hands out what was written. """
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+def _iter_path(path):
+    with open(path, "rb") as source:
+        while chunk := source.read(ZIP_STREAM_CHUNK_BYTES):
+            yield chunk
+
+def iter_zip_stream(files: list):
+    """
+    Yields a ZIP archive of `files` ([(arcname, source), ...]) piece by piece while it is built. A source is a
+    path, or a callable returning an iterator of bytes (artifact_store open_stream), called when its entry is due.
+    Text entries are deflated, already compressed formats (xlsx, pdf) are stored.
+    """
+    sink = _ZipChunkSink()
+    with zipfile.ZipFile(sink, "w") as archive:
+        for arcname, source in files:
+            if callable(source):
+                info, chunks = zipfile.ZipInfo(arcname, time.localtime()[:6]), source()
+            else:
+                info, chunks = zipfile.ZipInfo.from_file(source, arcname), _iter_path(source)
+            info.compress_type = zipfile.ZIP_DEFLATED if pathlib.Path(arcname).suffix.lower().lstrip(".") in ZIP_DEFLATED_TYPES else zipfile.ZIP_STORED
+            with archive.open(info, "w") as entry:
+                for chunk in chunks:
+                    entry.write(chunk)
+                    if data := sink.drain():
+                        yield data
+            if data := sink.drain(): # Local header of stored entries, data descriptor
+                yield data
+    if data := sink.drain(): # Central directory
+        yield data
+
+def zip_bundle_response(files: list, archive_name: str) -> StreamingResponse:
+    """ Streams the given files (see iter_zip_stream) as one ZIP download; compression runs in the threadpool (sync iterator). """
+    return StreamingResponse(iter_zip_stream(files), media_type="application/zip",
+                             headers={"Content-Disposition": f'attachment; filename="{archive_name}"'})
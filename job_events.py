@@ -0,0 +1,108 @@
+# job_events.py
+"""
+Progress events of processing jobs (api_mainB), pushed to clients as server-sent events instead
+of /job_status/ polls. Publishers may run in any thread (api_mainB's queue watcher turns the
+job rows written by the workers into events); every subscriber gets its own asyncio.Queue on the
+event loop. The events of recent jobs are kept in memory, so a client that connects late (or
+reconnects with Last-Event-ID) replays what it missed first. Event ids are derived from the job
+row (attempt and position in the attempt, see event_id), not counted per process, so a
+Last-Event-ID stays meaningful after an API restart or on another API process.
+"""
+import asyncio
+import json
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from config import JOB_EVENTS_MAX_JOBS, JOB_EVENTS_HEARTBEAT_SECONDS
+
+TERMINAL_EVENTS = ("completed", "failed")
+
+# --- Event ids: attempt * 100 + rank, the rank following the order of an attempt's events ---
+_EVENT_RANKS = {"queued": 1, "processing": 2, "parsed": 11, "completed": 30, "failed": 30, "retrying": 40}
+_STAGE_RANKS = {"parsing": 10, "mapping": 12, "excel": 13, "pdf": 14, "txt": 15} # parsed: position count known after parsing
+_OUTPUT_TYPES = ("excel", "pdf", "txt") # output events: 20 + index
+
+def event_id(event_type: str, attempt: int, stage: str = None, file_type: str = None) -> int:
+    """ Id of a job event, the same in every process: increasing over the job's life (attempts counted by the worker's lease). """
+    if event_type == "stage":
+        rank = _STAGE_RANKS.get(stage, 19)
+    elif event_type == "output":
+        rank = 20 + _OUTPUT_TYPES.index(file_type) if file_type in _OUTPUT_TYPES else 29
+    else:
+        rank = _EVENT_RANKS[event_type]
+    return attempt * 100 + rank
+
+class JobEventHub:
+    """ Thread-safe in-process publish/subscribe of job events, with a per-job replay history. """
+    def __init__(self, max_jobs: int = JOB_EVENTS_MAX_JOBS):
+        self._lock = threading.Lock()
+        self._history = OrderedDict() # job_id -> [event, ...], least recently updated job first
+        self._subscribers = {} # job_id -> {(loop, queue), ...}
+        self._max_jobs = max_jobs
+
+    def publish(self, job_id: str, event_type: str, attempt: int, **data) -> dict:
+        """ Records an event of the job's attempt (upload_jobs.attempts) and hands it to the current subscribers; callable from any thread. """
+        with self._lock:
+            history = self._history.setdefault(job_id, [])
+            self._history.move_to_end(job_id)
+            event = {"id": event_id(event_type, attempt, data.get("stage"), data.get("file_type")), "event": event_type,
+                     "job_id": job_id, "attempt": attempt, "time": datetime.now(timezone.utc).isoformat(timespec="milliseconds"), **data}
+            history.append(event)
+            while len(self._history) > self._max_jobs:
+                self._history.popitem(last=False)
+            subscribers = list(self._subscribers.get(job_id, ()))
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(queue.put_nowait, event)
+        return event
+
+    def known(self, job_id: str) -> bool:
+        with self._lock:
+            return job_id in self._history
+
+    def subscribed_jobs(self) -> list:
+        """ Jobs with at least one open stream. """
+        with self._lock:
+            return list(self._subscribers)
+
+    async def subscribe(self, job_id: str, after_id: int = 0, heartbeat_seconds: float = JOB_EVENTS_HEARTBEAT_SECONDS):
+        """
+        Yields the job's events with an id above after_id: the recorded ones, then live ones, until a terminal event.
+        A client that already got the terminal event (EventSource reconnects after the stream ends) gets it
+        again, so its stream ends too. Yields None after heartbeat_seconds without an event (keeps idle connections open).
+        """
+        subscriber = (asyncio.get_running_loop(), asyncio.Queue())
+        with self._lock:
+            history = self._history.get(job_id, [])
+            replay = [event for event in history if event["id"] > after_id]
+            if not replay and history and history[-1]["event"] in TERMINAL_EVENTS:
+                replay = history[-1:]
+            self._subscribers.setdefault(job_id, set()).add(subscriber)
+        try:
+            for event in replay:
+                yield event
+                if event["event"] in TERMINAL_EVENTS:
+                    return
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscriber[1].get(), heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                if event["id"] > after_id:
+                    yield event
+                    if event["event"] in TERMINAL_EVENTS:
+                        return
+        finally:
+            with self._lock:
+                subscribers = self._subscribers.get(job_id)
+                if subscribers is not None:
+                    subscribers.discard(subscriber)
+                    if not subscribers:
+                        del self._subscribers[job_id]
+
+def format_sse(event: dict) -> str:
+    """ One server-sent event; None is a comment line that only keeps the connection alive. """
+    if event is None:
+        return ": keep-alive\n\n"
+    return f"id: {event['id']}\nevent: {event['event']}\ndata: {json.dumps(event, default=str)}\n\n"
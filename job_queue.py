@@ -0,0 +1,128 @@
+# job_queue.py
+"""
+Persistent job queue on the upload_jobs table: api_mainB enqueues (a PENDING row), job_worker.py
+processes. A worker leases a job for JOB_VISIBILITY_TIMEOUT seconds and renews the lease while it
+runs; if the worker dies, the lease expires and another worker picks the job up again. Failed
+attempts are retried with exponential backoff up to JOB_MAX_ATTEMPTS. Every claim and every state
+change is a conditional UPDATE (status / lease owner in the WHERE clause), so two workers never
+own the same job, on Postgres as on the SQLite stand-in.
+"""
+import logging
+import random
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.orm import Session
+
+import job_store
+import models
+from config import JOB_VISIBILITY_TIMEOUT, JOB_MAX_ATTEMPTS, JOB_RETRY_BASE_SECONDS, JOB_RETRY_MAX_SECONDS
+
+UploadJob = models.UploadJob
+JobStatus = models.JobStatus
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+def retry_delay(attempts: int) -> float:
+    """ Seconds before the next attempt after `attempts` failed ones: exponential, capped, jittered (50-100%). """
+    delay = min(JOB_RETRY_MAX_SECONDS, JOB_RETRY_BASE_SECONDS * 2 ** max(0, attempts - 1))
+    return delay * random.uniform(0.5, 1.0)
+
+def _claimable(now: datetime):
+    """ Due PENDING jobs, and PROCESSING jobs whose worker stopped renewing the lease. """
+    return or_(
+        and_(UploadJob.status == JobStatus.PENDING,
+             or_(UploadJob.next_attempt_at.is_(None), UploadJob.next_attempt_at <= now)),
+        and_(UploadJob.status == JobStatus.PROCESSING, UploadJob.lease_expires_at < now,
+             UploadJob.attempts < JOB_MAX_ATTEMPTS),
+    )
+
+def _update(db: Session, *conditions, **values) -> int:
+    result = db.execute(update(UploadJob).where(*conditions).values(**values).execution_options(synchronize_session=False))
+    return result.rowcount
+
+def fail_abandoned_jobs(db: Session) -> int:
+    """ Jobs whose last allowed attempt lost its lease (e.g. the PDF crashes the worker) are failed, not retried forever. """
+    now = utcnow()
+    count = _update(db, UploadJob.status == JobStatus.PROCESSING, UploadJob.lease_expires_at < now,
+                    UploadJob.attempts >= JOB_MAX_ATTEMPTS,
+                    status=JobStatus.FAILED, lease_owner=None, lease_expires_at=None,
+                    error_message=f"Worker lost the job on each of {JOB_MAX_ATTEMPTS} attempts.")
+    db.commit()
+    if count:
+        logging.warning(f"Job Queue: Failed {count} job(s) abandoned on their last attempt.")
+    return count
+
+def lease_jobs(db: Session, worker_id: str, limit: int, visibility_timeout: int = JOB_VISIBILITY_TIMEOUT) -> List[str]:
+    """ Claims up to `limit` jobs (oldest upload first) for worker_id; returns their job_ids. """
+    if limit <= 0:
+        return []
+    now = utcnow()
+    # SKIP LOCKED lets concurrent Postgres workers pass each other's candidates (SQLite ignores it)
+    candidates = db.execute(
+        select(UploadJob.id, UploadJob.job_id).where(_claimable(now))
+        .order_by(UploadJob.upload_time, UploadJob.id).limit(limit).with_for_update(skip_locked=True)
+    ).all()
+    leased = []
+    for row_id, job_id in candidates:
+        claimed = _update(db, UploadJob.id == row_id, _claimable(now),
+                          status=JobStatus.PROCESSING, lease_owner=worker_id,
+                          lease_expires_at=now + timedelta(seconds=visibility_timeout),
+                          attempts=UploadJob.attempts + 1, next_attempt_at=None, stage=None)
+        if claimed:
+            leased.append(job_id)
+    db.commit()
+    return leased
+
+def renew_leases(db: Session, worker_id: str, job_ids, visibility_timeout: int = JOB_VISIBILITY_TIMEOUT) -> int:
+    """ Extends the leases worker_id still holds; returns how many were renewed. """
+    if not job_ids:
+        return 0
+    count = _update(db, UploadJob.job_id.in_(list(job_ids)), UploadJob.lease_owner == worker_id,
+                    UploadJob.status == JobStatus.PROCESSING,
+                    lease_expires_at=utcnow() + timedelta(seconds=visibility_timeout))
+    db.commit()
+    return count
+
+def _owned(job_id: str, worker_id: str):
+    return (UploadJob.job_id == job_id, UploadJob.lease_owner == worker_id, UploadJob.status == JobStatus.PROCESSING)
+
+def set_progress(db: Session, job_id: str, worker_id: str, **values) -> bool:
+    """ Records stage / position_count of a running job; False if the lease was lost meanwhile. """
+    count = _update(db, *_owned(job_id, worker_id), **values)
+    db.commit()
+    return count == 1
+
+def complete_job(db: Session, job_id: str, worker_id: str, output_records: list) -> bool:
+    """
+    Marks the job completed and bulk-inserts its output records (dicts, see job_store.add_outputs) in one
+    transaction, if worker_id still holds it.
+    """
+    if not _update(db, *_owned(job_id, worker_id), status=JobStatus.COMPLETED, stage=None,
+                   lease_owner=None, lease_expires_at=None, error_message=None):
+        db.rollback()
+        logging.warning(f"Job Queue: {worker_id} lost the lease of job {job_id}, outputs not recorded.")
+        return False
+    job_store.add_outputs(db, output_records)
+    db.commit()
+    return True
+
+def fail_job(db: Session, job_id: str, worker_id: str, error: str, retry: bool = True) -> Optional[JobStatus]:
+    """
+    Records a failed attempt: back to PENDING after the backoff delay while attempts remain (and retry is set),
+    otherwise FAILED. Returns the new status, or None if worker_id no longer holds the job.
+    """
+    attempts = db.execute(select(UploadJob.attempts).where(*_owned(job_id, worker_id))).scalar()
+    if attempts is None:
+        db.rollback()
+        return None
+    if retry and attempts < JOB_MAX_ATTEMPTS:
+        status, next_attempt_at = JobStatus.PENDING, utcnow() + timedelta(seconds=retry_delay(attempts))
+    else:
+        status, next_attempt_at = JobStatus.FAILED, None
+    _update(db, *_owned(job_id, worker_id), status=status, next_attempt_at=next_attempt_at,
+            lease_owner=None, lease_expires_at=None, error_message=error[:255])
+    db.commit()
+    return status
@@ -0,0 +1,193 @@
+# job_store.py
+"""
+Repository of the job tables (upload_jobs, output_files) for api_mainB and job_worker.py. A job is
+always loaded together with its outputs in one round-trip (joined eager load, never a second query
+or a lazy load per job); output records are inserted in bulk (one executemany) inside the
+transaction that marks the job completed (job_queue.complete_job). The queries rely on the
+composite indexes declared in models.py; ensure_schema() adds them and the columns added since the
+tables were created to an existing database (there are no migrations in the repo).
+Listings page by keyset (upload_time, id) instead of OFFSET, so a deep page costs what the first does.
+Async functions take the API's AsyncSession, the others a sync Session (queue workers).
+"""
+import base64
+import binascii
+import logging
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import insert, inspect, or_, select, text, tuple_
+from sqlalchemy.orm import Session, joinedload
+
+import models
+import schemas
+
+UploadJob = models.UploadJob
+OutputFile = models.OutputFile
+
+def jobs_with_outputs(job_ids):
+    """ SELECT of jobs by public job_id with their outputs joined in (LEFT OUTER JOIN on the indexed output_files.job_id). """
+    return select(UploadJob).where(UploadJob.job_id.in_(list(job_ids))).options(joinedload(UploadJob.output_files))
+
+def get_job(db: Session, job_id: str) -> Optional[UploadJob]:
+    return db.execute(jobs_with_outputs([job_id])).unique().scalars().first()
+
+async def load_jobs(db, job_ids) -> Dict[str, UploadJob]:
+    """ job_id -> job (outputs loaded) for the given job_ids that exist. """
+    result = await db.execute(jobs_with_outputs(job_ids))
+    return {job.job_id: job for job in result.unique().scalars()}
+
+async def load_job(db, job_id: str) -> Optional[UploadJob]:
+    return (await load_jobs(db, [job_id])).get(job_id)
+
+async def create_job(db, job_id: str, original_filename: str, input_file_path: str, pdf_profile: Optional[str]) -> UploadJob:
+    """ Inserts a new PENDING job (the queue entry) and commits it. """
+    # upload_time set here rather than by the server default: SQLite's CURRENT_TIMESTAMP drops the fraction
+    # of a second and would compare unequal to the same time in a listing cursor
+    job = UploadJob(job_id=job_id, original_filename=original_filename, input_file_path=input_file_path,
+                    pdf_profile=pdf_profile, status=models.JobStatus.PENDING, upload_time=datetime.now(timezone.utc),
+                    output_files=[])
+    db.add(job)
+    await db.commit()
+    await db.refresh(job, ["id"]) # Generated by the database; the (empty) outputs stay loaded
+    return job
+
+async def find_output(db, filename: str) -> Optional[OutputFile]:
+    """ The (newest) output record with this filename (indexed). """
+    result = await db.execute(select(OutputFile).where(OutputFile.filename == filename).order_by(OutputFile.id.desc()).limit(1))
+    return result.scalars().first()
+
+def add_outputs(db: Session, output_records: List[dict]) -> int:
+    """
+    Inserts output records (dicts of OutputFile columns) as one executemany, without a unit-of-work flush
+    per object; part of the caller's transaction, nothing is committed here.
+    """
+    if output_records:
+        db.execute(insert(OutputFile), output_records)
+    return len(output_records)
+
+def _utc(value: Optional[datetime]) -> Optional[datetime]:
+    """ Stored times are UTC; SQLite returns them naive, a freshly created job holds them aware. """
+    if value is None:
+        return None
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+def _job_fields(job: UploadJob) -> dict:
+    output_files_dict = {}
+    if job.status == models.JobStatus.COMPLETED:
+        for output in job.output_files:
+            output_files_dict[output.file_type.value] = output.filename # e.g., {"excel": "...", "pdf": ...}
+    return dict(
+        job_id=job.job_id,
+        status=job.status,
+        original_filename=job.original_filename,
+        upload_time=_utc(job.upload_time),
+        error_message=job.error_message,
+        output_files=output_files_dict
+    )
+
+def job_status_response(job: UploadJob) -> schemas.JobStatusResponse:
+    return schemas.JobStatusResponse(**_job_fields(job))
+
+def job_list_item(job: UploadJob) -> schemas.JobListItem:
+    return schemas.JobListItem(**_job_fields(job), auftragsname=job.auftragsname, kunden_auftrags_nr=job.kunden_auftrags_nr)
+
+# --- Listing (newest first, keyset pagination) ---
+def encode_cursor(job: UploadJob) -> str:
+    """ Opaque position after `job` in the listing: its (upload_time, id). """
+    raw = f"{job.upload_time.isoformat()}|{job.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """ (upload_time, id) of a cursor made by encode_cursor; ValueError if it is malformed. """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        upload_time, row_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(upload_time), int(row_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+def list_jobs_query(limit: int, status: Optional[models.JobStatus] = None, uploaded_after: Optional[datetime] = None,
+                    uploaded_before: Optional[datetime] = None, filename: Optional[str] = None,
+                    order_number: Optional[str] = None, after: Optional[Tuple[datetime, int]] = None):
+    """
+    SELECT of up to `limit` jobs (outputs joined in), newest first, optionally after a cursor position.
+    Served by the (status, upload_time, id) / (upload_time, id) indexes, or by the order number indexes.
+    """
+    query = select(UploadJob).options(joinedload(UploadJob.output_files))
+    if status is not None:
+        query = query.where(UploadJob.status == status)
+    if uploaded_after is not None:
+        query = query.where(UploadJob.upload_time >= uploaded_after)
+    if uploaded_before is not None:
+        query = query.where(UploadJob.upload_time < uploaded_before)
+    if filename:
+        pattern = filename.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        query = query.where(UploadJob.original_filename.ilike(f"%{pattern}%", escape="\\"))
+    if order_number:
+        query = query.where(or_(UploadJob.auftragsname == order_number, UploadJob.kunden_auftrags_nr == order_number))
+    if after is not None:
+        query = query.where(tuple_(UploadJob.upload_time, UploadJob.id) < after) # Row comparison: one index range
+    return query.order_by(UploadJob.upload_time.desc(), UploadJob.id.desc()).limit(limit)
+
+async def list_jobs(db, limit: int, cursor: Optional[str] = None, **filters) -> Tuple[List[UploadJob], Optional[str]]:
+    """ One page of jobs and the cursor of the next page (None on the last page); filters as in list_jobs_query. """
+    after = decode_cursor(cursor) if cursor else None
+    result = await db.execute(list_jobs_query(limit + 1, after=after, **filters)) # One extra row tells if a next page exists
+    jobs = result.unique().scalars().all()
+    return jobs[:limit], encode_cursor(jobs[limit - 1]) if len(jobs) > limit else None
+
+def ensure_indexes(bind) -> List[str]:
+    """ Creates the indexes of models.py missing in an existing database (create_all only indexes new tables); returns their names. """
+    inspector = inspect(bind)
+    created = []
+    for table in (UploadJob.__table__, OutputFile.__table__):
+        if not inspector.has_table(table.name):
+            continue
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        columns = {column["name"] for column in inspector.get_columns(table.name)}
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            if index.name in existing:
+                continue
+            missing = [column.name for column in index.columns if column.name not in columns]
+            if missing:
+                logging.warning(f"Job Store: Index {index.name} skipped, {table.name} lacks {', '.join(missing)} (run ensure_schema).")
+                continue
+            index.create(bind)
+            created.append(index.name)
+    if created:
+        logging.info(f"Job Store: Created indexes {', '.join(created)}")
+    return created
+
+def _add_column_sql(bind, table, column) -> str:
+    preparer = bind.dialect.identifier_preparer
+    sql = f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {preparer.format_column(column)} {column.type.compile(dialect=bind.dialect)}"
+    if column.server_default is not None:
+        sql += f" DEFAULT {column.server_default.arg}"
+    if not column.nullable:
+        sql += " NOT NULL" # Only with a server_default: the existing rows need a value
+    return sql
+
+def ensure_columns(bind) -> List[str]:
+    """ Adds the columns of models.py missing in existing job tables (ALTER TABLE ... ADD COLUMN); returns "table.column" names. """
+    inspector = inspect(bind)
+    added = []
+    for table in (UploadJob.__table__, OutputFile.__table__):
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            if not column.nullable and column.server_default is None:
+                raise RuntimeError(f"Cannot add {table.name}.{column.name} to existing rows: NOT NULL without a server_default.")
+            with bind.begin() as conn:
+                conn.execute(text(_add_column_sql(bind, table, column)))
+            added.append(f"{table.name}.{column.name}")
+    if added:
+        logging.info(f"Job Store: Added columns {', '.join(added)}")
+    return added
+
+def ensure_schema(bind):
+    """ Brings an existing database up to models.py: missing columns first, then the indexes on them. Safe to run at every start. """
+    ensure_columns(bind)
+    ensure_indexes(bind)
@@ -0,0 +1,199 @@
+# job_worker.py
+"""
+Queue worker for api_mainB: leases jobs from upload_jobs (job_queue.py) and processes them in a
+process pool of --concurrency processes, independent of the web tier. Start as many workers, on as
+many machines, as the load needs; they share the queue through the database.
+
+Usage: python job_worker.py [--concurrency N] [--worker-id NAME] [--once] [--create-tables]
+  --once           exit when no job is due (cron / tests)
+  --create-tables  create missing tables and indexes first (local SQLite stand-in, DATABASE_URL=sqlite:///./pdf_jobs.db)
+SIGTERM / Ctrl+C stops leasing; jobs already running are finished (their leases are kept renewed).
+"""
+import argparse
+import datetime
+import logging
+import os
+import pathlib
+import signal
+import socket
+import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from sqlalchemy.exc import SQLAlchemyError
+
+import pdf_parser
+import data_mapper
+import excel_writer
+import pdf_writer
+import text_writer
+import artifact_store
+import job_queue
+import job_store
+import models
+from database import session_scope, engine
+from config import BASE_DIR, JOB_VISIBILITY_TIMEOUT, JOB_POLL_SECONDS, JOB_WORKER_CONCURRENCY
+
+TEMP_DIR = BASE_DIR / "temp_files"; TEMP_DIR.mkdir(exist_ok=True) # Scratch directories of running jobs; outputs end up in the artifact store
+
+class LeaseLost(Exception):
+    """ Another worker took the job over (our lease expired); stop without touching it. """
+
+# =============================================================================
+# One job (runs in a pool process)
+# =============================================================================
+def _init_pool_process():
+    # Pooled connections inherited from the parent must not be shared by the child
+    engine.dispose(close=False)
+
+def _order_number(value):
+    """ Kopf value as stored for the /jobs search: stripped text, None if missing or empty. """
+    text = str(value).strip() if value is not None else ""
+    return text or None
+
+def run_job(job_id: str, worker_id: str):
+    """ Processes a leased job and records the outcome; returns the final status value (None if the lease was lost). """
+    with session_scope() as db:
+        try:
+            job = db.query(models.UploadJob).filter(models.UploadJob.job_id == job_id).first()
+            if not job:
+                logging.error(f"Worker {worker_id}: Job {job_id} not found in DB.")
+                return None
+            base_filename = f"{datetime.datetime.now():%Y%m%d_%H%M%S}_{job_id}"
+            input_pdf_path = BASE_DIR / job.input_file_path
+            # Plain values: touching the expired ORM object after a commit would hold a connection during rendering
+            job_row_id, pdf_profile = job.id, job.pdf_profile
+            logging.info(f"Worker {worker_id}: Processing job {job_id} ({job.original_filename}), attempt {job.attempts}")
+
+            def progress(**values):
+                if not job_queue.set_progress(db, job_id, worker_id, **values):
+                    raise LeaseLost(job_id)
+
+            # 1. Parse PDF
+            progress(stage="parsing")
+            extracted_data = pdf_parser.extract_data_from_pdf(input_pdf_path)
+            if not extracted_data: raise ValueError("Failed to extract data from PDF.")
+
+            # 2. Map Data
+            progress(stage="mapping", position_count=len(extracted_data.get("positions", [])))
+            mapped_data = data_mapper.map_data_to_template(extracted_data)
+            if not mapped_data: raise ValueError("Failed to map extracted data.")
+            kopf = mapped_data.get("kopf", {})
+            progress(auftragsname=_order_number(kopf.get("Auftragsname")), kunden_auftrags_nr=_order_number(kopf.get("Kunden-Auftrags-Nr")))
+
+            # 3.-5. Write outputs into a scratch directory, store them as content-addressed artifacts & collect their records
+            artifacts = artifact_store.get_artifact_store()
+            output_file_records = []
+            with tempfile.TemporaryDirectory(prefix=f"{job_id}_", dir=TEMP_DIR) as scratch:
+                work_dir = pathlib.Path(scratch)
+                writers = (
+                    ("excel", models.OutputFileType.EXCEL, lambda: excel_writer.write_to_excel(mapped_data, work_dir, base_filename)),
+                    ("pdf", models.OutputFileType.PDF, lambda: pdf_writer.write_combined_pdf(mapped_data, work_dir, base_filename, profile=pdf_profile)),
+                    ("txt", models.OutputFileType.TXT, lambda: text_writer.write_auftrag_export_txt(mapped_data, work_dir, base_filename)),
+                )
+                for stage, file_type, write in writers:
+                    progress(stage=stage)
+                    path_str = write()
+                    if path_str:
+                        path = pathlib.Path(path_str)
+                        digest, size, stored = artifacts.put_file(path)
+                        output_file_records.append(dict(
+                            job_id=job_row_id, file_type=file_type,
+                            filename=path.name, content_sha256=digest, file_size=size
+                        ))
+                        logging.info(f"Generated {file_type.value}: {path.name} ({'stored' if stored else 'deduplicated'} as {digest[:12]})")
+                    else: logging.warning(f"Failed to generate {file_type.value} file for job {job_id}.")
+
+            # --- Completed: status and output records (one bulk insert) in one transaction ---
+            if not job_queue.complete_job(db, job_id, worker_id, output_file_records):
+                return None
+            logging.info(f"Worker {worker_id}: Successfully completed job {job_id}")
+            return models.JobStatus.COMPLETED.value
+
+        except LeaseLost:
+            db.rollback()
+            logging.warning(f"Worker {worker_id}: Lost the lease of job {job_id}, leaving it to its new owner.")
+            return None
+        except Exception as e:
+            db.rollback()
+            # The parser/mapper reject a PDF with ValueError; the same file fails again, so only other errors are retried
+            retry = not isinstance(e, ValueError)
+            logging.error(f"Worker {worker_id}: Error processing job {job_id}: {e}", exc_info=True)
+            status = job_queue.fail_job(db, job_id, worker_id, str(e), retry=retry)
+            return status.value if status else None
+
+# =============================================================================
+# Worker loop
+# =============================================================================
+def run_worker(worker_id: str, concurrency: int, once: bool = False):
+    """ Leases up to `concurrency` jobs at a time and renews their leases until they finish. """
+    stop = threading.Event()
+    def request_stop(signum, frame):
+        logging.info(f"Worker {worker_id}: Stopping, finishing {len(running)} running job(s)...")
+        stop.set()
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    renew_every = JOB_VISIBILITY_TIMEOUT / 3
+    running = {} # job_id -> Future
+    last_renewal = 0.0
+    pool = ProcessPoolExecutor(max_workers=concurrency, initializer=_init_pool_process)
+    logging.info(f"Worker {worker_id}: Started with concurrency {concurrency}.")
+    try:
+        while True:
+            for job_id, future in list(running.items()):
+                if not future.done():
+                    continue
+                del running[job_id]
+                try:
+                    logging.info(f"Worker {worker_id}: Job {job_id} finished: {future.result()}")
+                except BrokenProcessPool:
+                    # The job's lease expires and the job is retried (or failed after JOB_MAX_ATTEMPTS)
+                    logging.error(f"Worker {worker_id}: Pool process died while running job {job_id}.")
+                except Exception as e:
+                    logging.error(f"Worker {worker_id}: Job {job_id} raised {e!r}")
+            if getattr(pool, "_broken", False): # A dead pool process fails all of the pool's futures
+                pool.shutdown(wait=False, cancel_futures=True)
+                pool = ProcessPoolExecutor(max_workers=concurrency, initializer=_init_pool_process)
+
+            leased = []
+            try:
+                with session_scope() as db:
+                    if time.monotonic() - last_renewal >= renew_every:
+                        renewed = job_queue.renew_leases(db, worker_id, running)
+                        if renewed < len(running):
+                            logging.warning(f"Worker {worker_id}: {len(running) - renewed} lease(s) could not be renewed.")
+                        job_queue.fail_abandoned_jobs(db)
+                        last_renewal = time.monotonic()
+                    if not stop.is_set():
+                        leased = job_queue.lease_jobs(db, worker_id, concurrency - len(running))
+            except SQLAlchemyError as e:
+                logging.error(f"Worker {worker_id}: Queue access failed: {e}")
+            for job_id in leased:
+                running[job_id] = pool.submit(run_job, job_id, worker_id)
+
+            if (stop.is_set() or once) and not running and not leased:
+                break
+            if not leased: # Wake up when a job finishes (free slot) or after the poll interval
+                if running:
+                    wait(running.values(), timeout=JOB_POLL_SECONDS, return_when=FIRST_COMPLETED)
+                else:
+                    stop.wait(JOB_POLL_SECONDS)
+    finally:
+        pool.shutdown(wait=True)
+        logging.info(f"Worker {worker_id}: Stopped.")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - [%(processName)s] - %(message)s')
+    parser = argparse.ArgumentParser(description="Process queued api_mainB jobs (upload_jobs table).")
+    parser.add_argument("--concurrency", type=int, default=JOB_WORKER_CONCURRENCY, help="Jobs processed at once by this worker.")
+    parser.add_argument("--worker-id", default=f"{socket.gethostname()}:{os.getpid()}", help="Lease owner name (unique per worker).")
+    parser.add_argument("--once", action="store_true", help="Exit when no job is due.")
+    parser.add_argument("--create-tables", action="store_true", help="Create missing tables, columns and indexes first (local SQLite stand-in).")
+    args = parser.parse_args()
+    if args.create_tables:
+        models.Base.metadata.create_all(bind=engine)
+        job_store.ensure_schema(engine)
+    run_worker(args.worker_id, max(1, args.concurrency), once=args.once)
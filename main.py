@@ -5,6 +5,7 @@ import pathlib
 import logging
 from datetime import datetime
 import os # Import os needed for OS-specific date formatting in text_writer
+import argparse
 
 # Use direct imports from your project structure
 import pdf_parser
@@ -15,11 +16,13 @@ import text_writer   # Contains the specific TXT writing function
 
 # Import base directory configuration
 try:
-    from config import BASE_DIR
+    from config import BASE_DIR, PDF_OUTPUT_PROFILES, PDF_UNAVAILABLE_PROFILES, DEFAULT_PDF_PROFILE, PDF_RENDER_BACKENDS, DEFAULT_PDF_BACKEND
 except ImportError:
     logging.error("Failed to import BASE_DIR from config.py. Ensure it exists.")
     # Fallback to current directory if config import fails, but this is not ideal
     BASE_DIR = pathlib.Path(__file__).parent
+    PDF_OUTPUT_PROFILES = {"standard": {}}; PDF_UNAVAILABLE_PROFILES = {}; DEFAULT_PDF_PROFILE = "standard"
+    PDF_RENDER_BACKENDS = ("fpdf",); DEFAULT_PDF_BACKEND = "fpdf"
 
 # Configure logging
 logging.basicConfig(
@@ -35,7 +38,7 @@ logging.basicConfig(
 INPUT_PDF_FILENAME = "D & M KG-451304501459759.pdf" # Example PDF from Translation.xlsx
 # -----------------------------------------------------------
 
-def process_order(pdf_file_path: pathlib.Path) -> bool:
+def process_order(pdf_file_path: pathlib.Path, pdf_profile: str = None, parallel_pdf: bool = False, pdf_backend: str = None, erp_daily: bool = False) -> bool:
     """
     Orchestrates the processing pipeline:
     1. Parse PDF to extract raw data.
@@ -46,6 +49,10 @@ def process_order(pdf_file_path: pathlib.Path) -> bool:
 
     Args:
         pdf_file_path (pathlib.Path): The absolute path to the input PDF file.
+        pdf_profile (str): Output profile for the combined PDF (standard, draft, archive).
+        parallel_pdf (bool): Render the Positionen pages of the combined PDF in a process pool.
+        pdf_backend (str): Renderer for the combined PDF (fpdf, pymupdf).
+        erp_daily (bool): Also append the order to the day's consolidated ERP import file.
 
     Returns:
         bool: True if processing completed (even with warnings), False if a critical error occurred.
@@ -99,7 +106,7 @@ def process_order(pdf_file_path: pathlib.Path) -> bool:
 
     # 5. Write Combined PDF (Optional - Comment out if not needed)
     logging.info("Step 5: Writing data to Combined PDF (Optional)...")
-    pdf_output_file = pdf_writer.write_combined_pdf(mapped_data, output_dir, base_filename)
+    pdf_output_file = pdf_writer.write_combined_pdf(mapped_data, output_dir, base_filename, profile=pdf_profile, parallel=parallel_pdf, backend=pdf_backend)
     if not pdf_output_file:
         logging.warning("Failed to generate Combined PDF file.") # Treat as warning
     else:
@@ -117,11 +124,70 @@ def process_order(pdf_file_path: pathlib.Path) -> bool:
     else:
          logging.info(f"Successfully generated Auftrag Export TXT file -> {txt_output_file}")
 
+    # 7. Append to the daily consolidated ERP import file (Optional)
+    if erp_daily:
+        logging.info("Step 7: Appending order to the daily ERP import file...")
+        daily_file = text_writer.append_order_to_daily_import(mapped_data)
+        if not daily_file:
+            logging.error("Failed to append order to the daily ERP import file.")
+        else:
+            logging.info(f"Order appended to daily ERP import file -> {daily_file}")
+
     logging.info(f"Processing finished for: {pdf_file_path.name}")
     return True # Return True indicating completion (even if optional steps failed)
 
+def _mapped_orders(pdf_paths):
+    """ Parses and maps the PDFs one by one (a generator: one order in memory at a time); failures are logged and skipped. """
+    for pdf_path in pdf_paths:
+        logging.info(f"Parsing and mapping {pdf_path.name}...")
+        extracted_data = pdf_parser.extract_data_from_pdf(pdf_path)
+        mapped_data = data_mapper.map_data_to_template(extracted_data) if extracted_data else None
+        if not mapped_data:
+            logging.error(f"Failed to parse or map {pdf_path.name}. Skipped in the combined workbook.")
+            continue
+        yield mapped_data
+
+def write_combined_excel(pdf_dir: pathlib.Path) -> bool:
+    """ Writes one consolidated workbook (all orders' Positionen and Kopf rows) for the PDFs in pdf_dir. """
+    pdf_paths = sorted(path for path in pdf_dir.iterdir() if path.suffix.lower() == ".pdf")
+    if not pdf_paths:
+        logging.error(f"No PDF files found in {pdf_dir}.")
+        return False
+    base_filename = f"{datetime.now().strftime('%Y%m%d')}_Bestellungen"
+    logging.info(f"Writing combined Excel workbook for {len(pdf_paths)} PDFs in {pdf_dir}...")
+    output_file = excel_writer.write_orders_to_excel(_mapped_orders(pdf_paths), BASE_DIR, base_filename)
+    if not output_file:
+        logging.error("Failed to write the combined Excel workbook.")
+        return False
+    logging.info(f"Successfully generated combined Excel file -> {output_file}")
+    return True
+
 # --- Main execution block ---
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Process a D&M KG order PDF into Excel, PDF and TXT outputs.")
+    parser.add_argument("input_pdf", nargs="?", default=INPUT_PDF_FILENAME,
+                        help=f"Input PDF (relative to {BASE_DIR} or absolute). Default: {INPUT_PDF_FILENAME}")
+    parser.add_argument("--pdf-profile", choices=sorted(PDF_OUTPUT_PROFILES), default=DEFAULT_PDF_PROFILE,
+                        help="Combined PDF output profile: draft (fast preview), standard, archive (compressed, embedded font).")
+    parser.add_argument("--parallel-pdf", action="store_true",
+                        help="Render the Positionen pages of the combined PDF in parallel (orders with many pages).")
+    parser.add_argument("--pdf-backend", choices=PDF_RENDER_BACKENDS, default=DEFAULT_PDF_BACKEND,
+                        help="Renderer for the combined PDF: fpdf (reference) or pymupdf (faster on long tables).")
+    parser.add_argument("--erp-daily", action="store_true",
+                        help="Also append the order to the day's consolidated ERP import file (see config.ERP_IMPORT_DIR).")
+    parser.add_argument("--combined-excel", metavar="DIR", type=pathlib.Path,
+                        help="Instead of one PDF: write one consolidated Excel workbook of all PDFs in DIR (relative to BASE_DIR or absolute).")
+    args = parser.parse_args()
+    if args.pdf_profile in PDF_UNAVAILABLE_PROFILES:
+        parser.error(f"--pdf-profile {args.pdf_profile} is not available: {PDF_UNAVAILABLE_PROFILES[args.pdf_profile]}.")
+    if args.combined_excel:
+        pdf_dir = (BASE_DIR / args.combined_excel).resolve()
+        if not pdf_dir.is_dir():
+            logging.error(f"--combined-excel: {pdf_dir} is not a directory.")
+            raise SystemExit(1)
+        raise SystemExit(0 if write_combined_excel(pdf_dir) else 1)
+    INPUT_PDF_FILENAME = args.input_pdf
+
     # Construct the full path to the input PDF
     input_pdf_path = BASE_DIR / INPUT_PDF_FILENAME
     # Get the absolute path for clearer error messages
@@ -140,7 +206,7 @@ if __name__ == "__main__":
         logging.error("--- Aborting ---")
     else:
         # If the file exists, proceed with processing
-        processing_successful = process_order(input_pdf_path)
+        processing_successful = process_order(input_pdf_path, args.pdf_profile, args.parallel_pdf, args.pdf_backend, args.erp_daily)
         if processing_successful:
             logging.info("Script finished successfully.")
         else:
@@ -1,5 +1,5 @@
 # models.py
-from sqlalchemy import Column, Integer, String, DateTime, Enum as SQLEnum, ForeignKey, LargeBinary
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Enum as SQLEnum, ForeignKey, Index, LargeBinary
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
@@ -24,9 +24,28 @@ class UploadJob(Base):
     input_file_path = Column(String, nullable=True)
     # Option 2: Store file content directly (use LargeBinary/BLOB type appropriate for your DB)
     # input_file_content = Column(LargeBinary, nullable=True)
+    pdf_profile = Column(String, nullable=True) # Processing option chosen at upload
+    # Order numbers extracted from the PDF (Kopf data), set by the worker after mapping; searchable via /jobs
+    auftragsname = Column(String, nullable=True, index=True)
+    kunden_auftrags_nr = Column(String, nullable=True, index=True)
+
+    # --- Job queue (job_queue.py): progress written by the worker, lease of the worker processing it ---
+    stage = Column(String, nullable=True) # parsing, mapping, excel, pdf, txt
+    position_count = Column(Integer, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    next_attempt_at = Column(DateTime(timezone=True), nullable=True, index=True) # Retry backoff; NULL = due now
+    lease_owner = Column(String, nullable=True) # Worker id holding the job
+    lease_expires_at = Column(DateTime(timezone=True), nullable=True) # Job becomes visible again after this
 
     output_files = relationship("OutputFile", back_populates="job")
 
+    # --- Composite indexes of the access patterns (job_store.py) ---
+    __table_args__ = (
+        Index("ix_upload_jobs_status_upload_time", "status", "upload_time", "id"), # Queue claim order, listings per status
+        Index("ix_upload_jobs_status_lease_expires_at", "status", "lease_expires_at"), # Expired leases (retry / abandoned)
+        Index("ix_upload_jobs_upload_time_id", "upload_time", "id"), # Newest-first listings
+    )
+
 class OutputFileType(str, enum.Enum):
     EXCEL = "excel"
     PDF = "pdf"
@@ -36,13 +55,29 @@ class OutputFile(Base):
     __tablename__ = "output_files"
 
     id = Column(Integer, primary_key=True, index=True)
-    job_id = Column(Integer, ForeignKey("upload_jobs.id")) # Link to the job
+    job_id = Column(Integer, ForeignKey("upload_jobs.id"), index=True) # Link to the job (indexed: outputs are loaded per job)
     file_type = Column(SQLEnum(OutputFileType))
     filename = Column(String, index=True)
     generated_time = Column(DateTime(timezone=True), server_default=func.now())
     # Option 1: Store file path
     file_path = Column(String, nullable=True)
-    # Option 2: Store file content directly
-    # file_content = Column(LargeBinary, nullable=True)
+    # Option 2: Content-addressed artifact (artifact_store.py: local directory, artifact_blobs table or S3), stored once per content
+    content_sha256 = Column(String(64), nullable=True, index=True)
+    file_size = Column(BigInteger, nullable=True)
+
+    job = relationship("UploadJob", back_populates="output_files")
+
+# --- Artifact store, "db" backend (artifact_store.py): content once per SHA-256, in ARTIFACT_CHUNK_BYTES rows ---
+class ArtifactBlob(Base):
+    __tablename__ = "artifact_blobs"
+
+    sha256 = Column(String(64), primary_key=True)
+    size = Column(BigInteger, nullable=False)
+    created_time = Column(DateTime(timezone=True), server_default=func.now())
+
+class ArtifactChunk(Base):
+    __tablename__ = "artifact_chunks"
 
-    job = relationship("UploadJob", back_populates="output_files")
\ No newline at end of file
+    sha256 = Column(String(64), ForeignKey("artifact_blobs.sha256"), primary_key=True)
+    seq = Column(Integer, primary_key=True, autoincrement=False)
+    data = Column(LargeBinary, nullable=False)
\ No newline at end of file
@@ -8,9 +8,14 @@ from config import PDF_MARKERS
 logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
 
 def extract_data_from_pdf(pdf_path):
+    """ Parses a D&M KG PDF. `pdf_path` may be a path or the raw PDF bytes (in-memory uploads). """
     doc = None
     try:
-        doc = fitz.open(pdf_path)
+        if isinstance(pdf_path, (bytes, bytearray, memoryview)):
+            doc = fitz.open(stream=bytes(pdf_path), filetype="pdf")
+            pdf_path = "<in-memory upload>" # Used in log/error messages below
+        else:
+            doc = fitz.open(pdf_path)
         logging.info(f"Opened PDF: {pdf_path} with {len(doc)} pages using PyMuPDF.")
 
         header_data = {}
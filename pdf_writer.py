@@ -1,20 +1,34 @@
 
 import logging
+import fpdf
 from fpdf import FPDF
+from fpdf.fonts import SubsetMap
+from fontTools import ttLib
 from datetime import datetime
 from typing import Dict, List
 import math
+import re
+import pathlib
+import io
+import copy
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+import fitz # PyMuPDF, merges chunks rendered in parallel
 # Make sure these are imported and available
-from config import KOPF_DEFAULTS, POS_COLS_DEFS, KOPF_MAP_DATA_CELLS # KOPF_MAP_DATA_CELLS might not be directly needed here, but KOPF_DEFAULTS is
+from config import KOPF_DEFAULTS, POS_COLS_DEFS, KOPF_MAP_DATA_CELLS, PDF_OUTPUT_PROFILES, DEFAULT_PDF_PROFILE, PDF_EMBED_FONT_FILES, PDF_PARALLEL_WORKERS, PDF_PARALLEL_CHUNK_PAGES, PDF_PARALLEL_MIN_PAGES, PDF_RENDER_BACKENDS, DEFAULT_PDF_BACKEND # KOPF_MAP_DATA_CELLS might not be directly needed here, but KOPF_DEFAULTS is
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s') # Added line number
+logging.getLogger("fontTools").setLevel(logging.WARNING) # The subsetter logs ~100 INFO lines per embedded font
 
 # --- PDF Configuration ---
 PDF_FONT = "Helvetica"
+PDF_EMBED_FONT = "EmbedSans" # Family name for the TTF font of profiles with embed_font
 PDF_MARGIN = 10
 PDF_LINE_HEIGHT = 5
 PDF_TABLE_HEADER_HEIGHT = 65  # Increased to allow wrapped rotated text
 PDF_TABLE_ROW_HEIGHT = 6 # This will be used as the *line height* within multi_cell
+PDF_PAGE_HEADER_HEIGHT = 5 # Running header line (title/date) above the page body
+PDF_POSITIONEN_TOP_GAP = 5 # Extra space above the table on the first Positionen page
 PAGE_WIDTH_L = 297
 PAGE_HEIGHT_L = 210
 PRINTABLE_WIDTH_L = PAGE_WIDTH_L - 2 * PDF_MARGIN
@@ -46,6 +60,39 @@ KOPF_PDF_LABELS = {
     
 }
 
+KOPF_COLOR_HINTS = [
+    "- Farbauswahl Behang nur bei ALU-Rollladen möglich.",
+    "- Farbauswahl Reviblende nur bei ALU möglich.",
+    "- Farbauswahl Führungsschiene nur bei ALU möglich.",
+]
+
+# --- Recorded static content (see PDFWithHeaderFooter.stamp): key -> (content bytes, recorded Y, {fontkey: font id}) ---
+_STAMP_CACHE = {}
+# Recording reads fpdf2 internals (page content buffer, _out, fonts_used_per_page_number); other
+# versions draw stamps directly instead of risking broken pages
+_STAMP_FPDF_VERSIONS = ("2.8.",)
+_STAMPS_SUPPORTED = fpdf.FPDF_VERSION.startswith(_STAMP_FPDF_VERSIONS)
+if not _STAMPS_SUPPORTED:
+    logging.warning(f"fpdf2 {fpdf.FPDF_VERSION} is not a tested version ({', '.join(_STAMP_FPDF_VERSIONS)}x); static PDF content is drawn without stamps.")
+
+# --- Text measurement cache for the Positionen table (see PDFWithHeaderFooter.measure_lines) ---
+_LINE_COUNT_CACHE = {}
+_LINE_COUNT_CACHE_MAX = 20000
+
+@lru_cache(maxsize=4096)
+def _latin1_text(value: str) -> str:
+    """ Core fonts only support latin-1; unsupported characters are replaced with '?'. """
+    try:
+        value.encode('latin-1')
+        return value
+    except UnicodeEncodeError:
+        return value.encode('latin-1', 'replace').decode('latin-1')
+
+# --- Parsed TTF fonts, shared by all documents of the process: (font file, style) -> (TTFFont template, font file bytes) ---
+# Parsing (cmap, glyph widths, metrics) happens once; each document gets a copy with its own subset
+# and its own fontTools object, because fpdf2 subsets that object in place on output.
+_TTF_FONT_CACHE = {}
+
 # --- UNCOMMENTED: Define approximate grid/column starts for Kopf page ---
 # These help align items visually, mimicking Excel columns
 COL1_X = PDF_MARGIN
@@ -54,21 +101,163 @@ COL3_X = PDF_MARGIN + 85
 COL4_X = PDF_MARGIN + 135
 COL5_X = PDF_MARGIN + 180
 COL6_X = PDF_MARGIN + 210
+COL7_X = COL6_X + 35 # Extra column for Führungsschiene in the Farben row
+KOPF_HINWEIS_WIDTH = PRINTABLE_WIDTH_L - COL4_X
 # --- END UNCOMMENTED ---
 
 
+def positionen_columns():
+    """ Returns (headers, data_keys, col_widths) of the Positionen table, scaled to the printable width. """
+    # Sort definitions based on column index specified in config
+    sorted_pos_defs = sorted(POS_COLS_DEFS.items(), key=lambda item: item[1][1])
+    headers = [header for key, (header, idx) in sorted_pos_defs]
+    data_keys = [key for key, (header, idx) in sorted_pos_defs]
+
+    # Define column widths - THESE MUST MATCH THE ORDER AND NUMBER OF headers/data_keys
+    # Based on the POS_COLS_DEFS structure provided (31 columns defined)
+    col_widths = [
+        6, 6, 7, 8, 10, 10, 8, 12, 12, # lfdNr_1 to Fensterart (9 cols)
+        6,                          # Fensteröffnung_32 (1 col)
+        10, 10,                     # Fenstergeometrie, Konstruktion (2 cols)
+        20,                         # BehangTyp (1 col)
+        8, 18,                      # Schallschutz_48, Antrieb (2 cols)
+        10,                         # Fuehrungsschiene (1 col)
+        10,                         # ReviblendeArt (1 col)
+        7, 15,                      # Standardausführung_15, Fensterbankart (2 cols)
+        5, 5, 8, 8, 16,             # Anzahl_Links_13 to Maßbezug (5 cols)
+        10,                         # ISS_Ausführung (1 col)
+        8, 8, 8,                    # ISS_Behindertengerecht_40 to ISS_Anzahl_Rechts_42 (3 cols)
+        10,                         # EinzelteilTyp (1 col)
+        10,                         # EinzelteilArt (1 col)
+        8                           # EinzelteilAnzahl_25 (1 col)
+    ] # Total = 31 widths
+
+    # --- Sanity Checks ---
+    if len(headers) != len(col_widths):
+        logging.error(f"Header count ({len(headers)}) does not match column width count ({len(col_widths)}). PDF table layout will be incorrect.")
+        # Option: Truncate or pad to prevent index errors, but layout will be wrong.
+        # For now, let it proceed but log the error. User needs to fix config/widths.
+        min_len = min(len(headers), len(col_widths))
+        headers = headers[:min_len]
+        data_keys = data_keys[:min_len]
+        col_widths = col_widths[:min_len]
+        logging.warning(f"Proceeding with {min_len} columns.")
+
+
+    total_w = sum(col_widths)
+    logging.info(f"Using Positionen table width: {total_w}mm (Printable: {PRINTABLE_WIDTH_L}mm)")
+    scale_factor = 1.0
+    if total_w > PRINTABLE_WIDTH_L:
+        logging.warning("Table width exceeds printable area. Scaling columns.")
+        scale_factor = PRINTABLE_WIDTH_L / total_w
+        col_widths = [w * scale_factor for w in col_widths]
+        total_w = sum(col_widths) # Recalculate total width after scaling
+        logging.info(f"Scaled Positionen table width to: {total_w}mm")
+    return headers, data_keys, col_widths
+
+def paginate_rows(row_plan: List[tuple], page_top: float, page_bottom: float, first_page: bool = True) -> List[List[tuple]]:
+    """
+    Splits a Positionen row plan [(cell_texts, row_height), ...] into pages, with the same break rule
+    the table drawing used inline: a row goes to the next page when it would cross `page_bottom`.
+    `page_top` is the Y below the running page header. Always returns at least one page
+    (the table header is drawn even without rows). `first_page` accounts for the extra gap above
+    the table on the first Positionen page.
+    """
+    first_row_y = page_top + PDF_TABLE_HEADER_HEIGHT + 1
+    row_y = (page_top + PDF_POSITIONEN_TOP_GAP if first_page else page_top) + PDF_TABLE_HEADER_HEIGHT + 1
+    pages = [[]]
+    for row in row_plan:
+        if row_y + row[1] > page_bottom:
+            pages.append([])
+            row_y = first_row_y
+        pages[-1].append(row)
+        row_y = row_y + row[1]
+    return pages
+
+
 class PDFWithHeaderFooter(FPDF):
+    def __init__(self, *args, profile: str = DEFAULT_PDF_PROFILE, **kwargs):
+        super().__init__(*args, **kwargs)
+        if profile not in PDF_OUTPUT_PROFILES:
+            raise ValueError(f"Unknown PDF profile '{profile}'. Use one of: {', '.join(PDF_OUTPUT_PROFILES)}")
+        self.profile_name = profile
+        settings = PDF_OUTPUT_PROFILES[profile]
+        self.set_compression(settings["compress"])
+        # Decorative borders: underlines of Kopf values and the vertical cell borders of the Positionen table
+        self.value_border = 'B' if settings["borders"] else 0
+        self.cell_border = 'LR' if settings["borders"] else 0
+        self.font_name = PDF_FONT
+        self._doc_stamps = {} # Stamps referencing embedded (subsetted) fonts are only valid within this document
+        # Footer numbering for documents rendered in chunks (see write_combined_pdf(parallel=True)):
+        # pages preceding this chunk, and the page count of the merged document (None: fpdf's {nb} alias)
+        self.page_offset = 0
+        self.total_pages = None
+        if settings["embed_font"]:
+            self._add_embedded_font()
+
+    def _add_embedded_font(self):
+        """ Registers the TTF font for all styles in use; fpdf2 embeds only the glyph subset actually used. """
+        regular = PDF_EMBED_FONT_FILES.get("")
+        if not regular or not pathlib.Path(regular).is_file():
+            # No silent core-font fallback: the profile promises embedded fonts (see config.PDF_UNAVAILABLE_PROFILES)
+            raise ValueError(f"PDF profile '{self.profile_name}' needs the embedded font file {regular}, which is not installed.")
+        for style in ('', 'B', 'I'):
+            font_file = PDF_EMBED_FONT_FILES.get(style)
+            if not font_file or not pathlib.Path(font_file).is_file():
+                font_file = regular
+            self.add_cached_font(PDF_EMBED_FONT, style, font_file)
+        self.font_name = PDF_EMBED_FONT
+
+    def add_cached_font(self, family: str, style: str, font_file: str):
+        """
+        Like add_font() for a TTF file, but the parsed font (character widths, glyph ids, metrics)
+        is taken from the process-wide _TTF_FONT_CACHE; only the first document parses the file.
+        """
+        fontkey = f"{family.lower()}{style}"
+        if fontkey in self.fonts:
+            return
+        cache_key = (str(font_file), style)
+        cached = _TTF_FONT_CACHE.get(cache_key)
+        if cached is None:
+            self.add_font(family, style, font_file)
+            template = copy.copy(self.fonts[fontkey])
+            template.ttfont = None; template.subset = None; template.hbfont = None # Per-document state
+            _TTF_FONT_CACHE[cache_key] = (template, pathlib.Path(font_file).read_bytes())
+            return
+
+        template, font_bytes = cached
+        font = copy.copy(template)
+        font.i = len(self.fonts) + 1
+        font.fontkey = fontkey
+        font.desc = copy.copy(template.desc) # PDF object, gets a per-document object id
+        font.missing_glyphs = []
+        # lazy=True: tables are only read when the subset is built on output
+        font.ttfont = ttLib.TTFont(io.BytesIO(font_bytes), recalcTimestamp=False, fontNumber=0, lazy=True)
+        # Same reserved characters as fpdf2's TTFFont: control chars, space and, with {nb}, the digits
+        reserved = "\x00 \r\n"
+        if self.str_alias_nb_pages:
+            reserved += "0123456789" + self.str_alias_nb_pages
+        font.subset = SubsetMap(font, [ord(char) for char in reserved])
+        self.fonts[fontkey] = font
+
+    def pdf_text(self, value) -> str:
+        """ Text for a cell: as is for the embedded Unicode font, converted to latin-1 for core fonts. """
+        if self.font_name == PDF_FONT:
+            return _latin1_text(str(value))
+        return str(value)
+
     def header(self):
-        self.set_font(PDF_FONT, 'I', 8)
+        self.set_font(self.font_name, 'I', 8)
         page_w = self.w - 2 * self.l_margin
         self.cell(page_w / 2, 5, "Bestellblatt Fehro.AR AV-Import", 0, 0, 'L')
         self.cell(page_w / 2, 5, datetime.now().strftime('%d.%m.%Y'), 0, 1, 'R')
-        self.set_y(self.t_margin + 5)
+        self.set_y(self.t_margin + PDF_PAGE_HEADER_HEIGHT)
 
     def footer(self):
         self.set_y(-15)
-        self.set_font(PDF_FONT, 'I', 8)
-        self.cell(0, 10, f'Seite {self.page_no()}/{{nb}}', 0, 0, 'C')
+        self.set_font(self.font_name, 'I', 8)
+        total_pages = self.total_pages if self.total_pages is not None else '{nb}'
+        self.cell(0, 10, f'Seite {self.page_offset + self.page_no()}/{total_pages}', 0, 0, 'C')
 
     def word_wrap(self, text, width):
         # Ensure text is a string before processing
@@ -96,19 +285,92 @@ class PDFWithHeaderFooter(FPDF):
         return wrapped_text
 
 
+    # --- Static content stamps (rendered once per process, replayed on every further use) ---
+    def stamp(self, key, draw_fn):
+        """
+        Draws static content at the current Y position.
+        The first call records the PDF operators produced by `draw_fn`; later calls (any page,
+        any document using the same font registration) replay the recorded operators, shifted
+        vertically to the current Y, instead of laying the content out again.
+        fpdf's cursor/font state is left unchanged by a replay, so callers set what they need afterwards.
+        """
+        if not self._can_stamp():
+            draw_fn()
+            return
+        origin_y = self.get_y()
+        key = (self.font_name,) + tuple(key)
+        stamp_cache = _STAMP_CACHE if self.font_name == PDF_FONT else self._doc_stamps
+        cached = stamp_cache.get(key)
+        if cached is not None:
+            content, recorded_y, stamp_fonts = cached
+            if all(fontkey in self.fonts and self.fonts[fontkey].i == font_id for fontkey, font_id in stamp_fonts.items()):
+                self._out(f"q 1 0 0 1 0 {(recorded_y - origin_y) * self.k:.2f} cm")
+                self._out(content)
+                self._out("Q")
+                self.fonts_used_per_page_number[self.page].update(stamp_fonts.values())
+                return
+
+        page_contents = self.pages[self.page].contents
+        start = len(page_contents)
+        # Emit the current line width and font explicitly so the recording does not rely on
+        # whatever state happened to be active before it
+        self._out(f"{self.line_width * self.k:.2f} w")
+        if self.current_font is not None:
+            self._out(f"BT /F{self.current_font.i} {self.font_size_pt:.2f} Tf ET")
+        draw_fn()
+        content = bytes(page_contents[start:]).rstrip(b"\n")
+        font_ids = {int(font_id) for font_id in re.findall(rb"/F(\d+) ", content)}
+        stamp_fonts = {fontkey: font.i for fontkey, font in self.fonts.items() if font.i in font_ids}
+        stamp_cache[key] = (content, origin_y, stamp_fonts)
+
+    def _can_stamp(self) -> bool:
+        """ Whether the fpdf2 internals stamp() records and replays are there (else it just draws). """
+        global _STAMPS_SUPPORTED
+        if _STAMPS_SUPPORTED and not (isinstance(getattr(self.pages.get(self.page), "contents", None), bytearray)
+                                      and isinstance(getattr(self, "fonts_used_per_page_number", None), dict)
+                                      and callable(getattr(self, "_out", None))):
+            logging.warning(f"fpdf2 {fpdf.FPDF_VERSION} lacks the page internals stamps rely on; static PDF content is drawn without stamps.")
+            _STAMPS_SUPPORTED = False
+        return _STAMPS_SUPPORTED
+
+    def register_fonts(self):
+        """
+        Registers every font style used by this writer in a fixed order, before the first page,
+        so font resource ids are identical across documents and stamps can be reused.
+        """
+        for style in ('I', 'B', ''):
+            self.set_font(self.font_name, style, 8)
+
     # --- UNCOMMENTED AND MOVED INSIDE CLASS: Page 1: Kopf Data (Revised Layout) ---
     def draw_kopf_page(self, kopf_data: Dict):
         """Draws the first page resembling Bestellblatt_Kopf in Landscape"""
         self.add_page(orientation='L')
-        self.set_font(PDF_FONT, '', 10)
+        y_top = self.get_y() + 5  # Starting Y
 
-        y_pos = self.get_y() + 5  # Starting Y
+        # Hinweistext can be long (multi_cell); everything below it moves down with its height
+        hinweis_text = self.pdf_text(kopf_data.get("Hinweistext", ""))
+        self.set_font(self.font_name, '', 9)
+        hinweis_lines = max(1, self.measure_lines(hinweis_text, KOPF_HINWEIS_WIDTH))
+        y_bottom = y_top + 72.5 + (hinweis_lines - 1) * PDF_LINE_HEIGHT
+
+        # --- Static labels (stamped) ---
+        self.set_y(y_top)
+        self.stamp(("kopf_static_top",), self._draw_kopf_static_top)
+        self.set_y(y_bottom)
+        self.stamp(("kopf_static_bottom",), self._draw_kopf_static_bottom)
+
+        # --- Order data ---
+        self._draw_kopf_values(kopf_data, hinweis_text, y_top, y_bottom)
+
+    def _draw_kopf_static_top(self):
+        """ Static labels from the company info down to the Sonderausführung/Hinweistext labels, plus the page footer text. """
+        y_pos = self.get_y()
 
         # --- Row 1: Company Info ---
-        self.set_font(PDF_FONT, 'B', 10)
+        self.set_font(self.font_name, 'B', 10)
         self.set_xy(COL1_X, y_pos);
         self.cell(40, PDF_LINE_HEIGHT, "D&M KG")
-        self.set_font(PDF_FONT, '', 9)
+        self.set_font(self.font_name, '', 9)
         self.set_xy(COL4_X, y_pos);
         self.cell(40, PDF_LINE_HEIGHT, "Bestellblatt Fehro.AR")
         y_pos += PDF_LINE_HEIGHT
@@ -122,7 +384,7 @@ class PDFWithHeaderFooter(FPDF):
         y_pos += PDF_LINE_HEIGHT * 2  # Add space
 
         # --- Row 2: Address Headers (Simplified - Labels only) ---
-        self.set_font(PDF_FONT, '', 8)
+        self.set_font(self.font_name, '', 8)
         self.set_xy(COL1_X, y_pos);
         self.cell(45, PDF_LINE_HEIGHT, "Eingabe Kundennummern")
         self.set_xy(COL2_X, y_pos);
@@ -134,24 +396,14 @@ class PDFWithHeaderFooter(FPDF):
         self.set_xy(COL5_X, y_pos);
         self.cell(30, PDF_LINE_HEIGHT, "AufBestAdr.")
         y_pos += PDF_LINE_HEIGHT * 1.5  # Space + line height
-        
-        self.set_xy(COL2_X, y_pos);
-        self.cell(30, PDF_LINE_HEIGHT, str(kopf_data.get("Kundenadr.", "2144")), border='B')
-        self.set_xy(COL3_X, y_pos);
-        self.cell(35, PDF_LINE_HEIGHT, str(kopf_data.get("Rechnungsadr.", "58")), border='B')
-        self.set_xy(COL4_X, y_pos);
-        self.cell(30, PDF_LINE_HEIGHT, str(kopf_data.get("Lieferadr.", "58")), border='B')
-        self.set_xy(COL5_X, y_pos);
-        self.cell(30, PDF_LINE_HEIGHT, str(kopf_data.get("AufBestAdr.", "58")), border='B')
-        y_pos += PDF_LINE_HEIGHT * 2  # Space + line height
+        y_pos += PDF_LINE_HEIGHT * 2  # Address values row (data layer) + space
 
         # --- Row 3: Bestellinformationen ---
-        self.set_font(PDF_FONT, 'B', 10)
+        self.set_font(self.font_name, 'B', 10)
         self.set_xy(COL1_X, y_pos);
         self.cell(40, PDF_LINE_HEIGHT, "Bestellinformationen")
         y_pos += PDF_LINE_HEIGHT
-        self.set_font(PDF_FONT, '', 9)
-        # Labels first
+        self.set_font(self.font_name, '', 9)
         self.set_xy(COL2_X, y_pos);
         self.cell(30, PDF_LINE_HEIGHT, KOPF_PDF_LABELS["Bestelldatum"])
         self.set_xy(COL3_X, y_pos);
@@ -163,68 +415,48 @@ class PDFWithHeaderFooter(FPDF):
         self.set_xy(COL6_X, y_pos);
         self.cell(30, PDF_LINE_HEIGHT, KOPF_PDF_LABELS.get("Besteller", "Besteller:"))  # Use .get in case key missing
         y_pos += PDF_LINE_HEIGHT
-        # Data below labels
-        self.set_xy(COL2_X, y_pos);
-        self.cell(30, PDF_LINE_HEIGHT, str(kopf_data.get("Bestelldatum", "")), border='B')
-        self.set_xy(COL3_X, y_pos);
-        self.cell(35, PDF_LINE_HEIGHT, str(kopf_data.get("Auftragsname", "")), border='B')
-        self.set_xy(COL4_X, y_pos);
-        self.cell(40, PDF_LINE_HEIGHT, str(kopf_data.get("Kunden-Auftrags-Nr", "")), border='B')
-        self.set_xy(COL5_X, y_pos);
-        self.cell(40, PDF_LINE_HEIGHT, str(kopf_data.get("Wunsch-Liefertermin", "")), border='B')
-        self.set_xy(COL6_X, y_pos);
-        self.cell(30, PDF_LINE_HEIGHT, str(kopf_data.get("Besteller", "")), border='B')
-        y_pos += PDF_LINE_HEIGHT * 1.5
+        y_pos += PDF_LINE_HEIGHT * 1.5  # Order values row (data layer) + space
 
         # --- Row 4: Sonderausführung ---
-        self.set_font(PDF_FONT, 'B', 10)
+        self.set_font(self.font_name, 'B', 10)
         self.set_xy(COL1_X, y_pos);
         self.cell(40, PDF_LINE_HEIGHT, "Sonderausführung")
         y_pos += PDF_LINE_HEIGHT
-        self.set_font(PDF_FONT, '', 9)
+        self.set_font(self.font_name, '', 9)
         self.set_xy(COL2_X, y_pos);
         self.cell(30, PDF_LINE_HEIGHT, "J/N") # Label for Sonderausführung value
         self.set_xy(COL4_X, y_pos);
         self.cell(40, PDF_LINE_HEIGHT, KOPF_PDF_LABELS["Hinweistext"])
-        y_pos += PDF_LINE_HEIGHT
-        self.set_xy(COL2_X, y_pos);
-        self.cell(30, PDF_LINE_HEIGHT, str(kopf_data.get("Sonderausführung", "")), border='B')
-        # Hinweistext can be long, use multi_cell
-        hinweis_start_y = y_pos
-        self.set_xy(COL4_X, y_pos);
-        # Ensure Hinweistext is treated as string
-        hinweis_text = str(kopf_data.get("Hinweistext", ""))
-        self.multi_cell(PRINTABLE_WIDTH_L - COL4_X, PDF_LINE_HEIGHT, hinweis_text, border='B', align='L')
-        # Update y_pos based on potential multi_cell height
-        # self.get_y() returns the position *after* the multi_cell
-        y_pos = max(y_pos + PDF_LINE_HEIGHT, self.get_y())
-        self.set_y(y_pos) # Ensure cursor is below the longest cell
-        y_pos += PDF_LINE_HEIGHT * 0.5 # Add small gap
+
+        # --- Footer Text ---
+        # Position near bottom - check page height if needed
+        self.set_xy(COL1_X, PAGE_HEIGHT_L - PDF_MARGIN - 10)  # Position near bottom
+        self.set_font(self.font_name, '', 8)
+        self.cell(40, PDF_LINE_HEIGHT, "Bestellblatt_Kopf")
+
+    def _draw_kopf_static_bottom(self):
+        """ Static labels below the Hinweistext: Verschattungselemente, Farben, Insektenschutz and the colour hints. """
+        y_pos = self.get_y()
 
         # --- Row 5: Angaben Verschattungselemente ---
-        self.set_font(PDF_FONT, 'B', 10)
+        self.set_font(self.font_name, 'B', 10)
         self.set_xy(COL1_X, y_pos);
         self.cell(40, PDF_LINE_HEIGHT, "Angaben Verschattungselemente")
         y_pos += PDF_LINE_HEIGHT
-        self.set_font(PDF_FONT, '', 9)
+        self.set_font(self.font_name, '', 9)
         self.set_xy(COL2_X, y_pos);
         self.cell(30, PDF_LINE_HEIGHT, KOPF_PDF_LABELS["BehangArt"])
         self.set_xy(COL3_X, y_pos);
         self.cell(35, PDF_LINE_HEIGHT, KOPF_PDF_LABELS["Kurbelstange"])
         y_pos += PDF_LINE_HEIGHT
-        self.set_xy(COL2_X, y_pos);
-        self.cell(30, PDF_LINE_HEIGHT, str(kopf_data.get("BehangArt", "")), border='B')
-        self.set_xy(COL3_X, y_pos);
-        self.cell(35, PDF_LINE_HEIGHT, str(kopf_data.get("Kurbelstange", "")), border='B')
-        y_pos += PDF_LINE_HEIGHT * 1.5
+        y_pos += PDF_LINE_HEIGHT * 1.5  # Values row (data layer) + space
 
         # --- Row 6: Farben Verschattungselemente ---
-        self.set_font(PDF_FONT, 'B', 10)
+        self.set_font(self.font_name, 'B', 10)
         self.set_xy(COL1_X, y_pos);
         self.cell(40, PDF_LINE_HEIGHT, "Farben Verschattungselemente")
         y_pos += PDF_LINE_HEIGHT
-        self.set_font(PDF_FONT, '', 9)
-        # Labels
+        self.set_font(self.font_name, '', 9)
         self.set_xy(COL2_X, y_pos);
         self.cell(30, PDF_LINE_HEIGHT, KOPF_PDF_LABELS["Farben_Behang"])
         self.set_xy(COL3_X, y_pos);
@@ -235,33 +467,17 @@ class PDFWithHeaderFooter(FPDF):
         self.cell(30, PDF_LINE_HEIGHT, KOPF_PDF_LABELS["Farben_Aussenkasten"])
         self.set_xy(COL6_X, y_pos);
         self.cell(30, PDF_LINE_HEIGHT, KOPF_PDF_LABELS["Farben_Reviblende"])
-        # Need another column for Führungsschiene
-        COL7_X = COL6_X + 35
         self.set_xy(COL7_X, y_pos);
         self.cell(0, PDF_LINE_HEIGHT, KOPF_PDF_LABELS["Farben_Fuehrungsschiene"]) # Use 0 width to extend to margin
         y_pos += PDF_LINE_HEIGHT
-        # Data
-        self.set_xy(COL2_X, y_pos);
-        self.cell(30, PDF_LINE_HEIGHT, str(kopf_data.get("Farben_Behang", "")), border='B')
-        self.set_xy(COL3_X, y_pos);
-        self.cell(35, PDF_LINE_HEIGHT, str(kopf_data.get("Farben_Anschlagstopfen", "")), border='B')
-        self.set_xy(COL4_X, y_pos);
-        self.cell(40, PDF_LINE_HEIGHT, str(kopf_data.get("Farben_Endleiste", "")), border='B')
-        self.set_xy(COL5_X, y_pos);
-        self.cell(30, PDF_LINE_HEIGHT, str(kopf_data.get("Farben_Aussenkasten", "")), border='B')
-        self.set_xy(COL6_X, y_pos);
-        self.cell(30, PDF_LINE_HEIGHT, str(kopf_data.get("Farben_Reviblende", "")), border='B')
-        self.set_xy(COL7_X, y_pos);
-        self.cell(0, PDF_LINE_HEIGHT, str(kopf_data.get("Farben_Fuehrungsschiene", "")), border='B') # Use 0 width
-        y_pos += PDF_LINE_HEIGHT * 1.5
+        y_pos += PDF_LINE_HEIGHT * 1.5  # Values row (data layer) + space
 
         # --- Row 7: Farben Insektenschutz ---
-        self.set_font(PDF_FONT, 'B', 10)
+        self.set_font(self.font_name, 'B', 10)
         self.set_xy(COL1_X, y_pos);
         self.cell(40, PDF_LINE_HEIGHT, "Farben Insektenschutzelemente")
         y_pos += PDF_LINE_HEIGHT
-        self.set_font(PDF_FONT, '', 9)
-        # Labels
+        self.set_font(self.font_name, '', 9)
         self.set_xy(COL2_X, y_pos);
         self.cell(30, PDF_LINE_HEIGHT, KOPF_PDF_LABELS["Farben_Insekt_Element"])
         self.set_xy(COL3_X, y_pos);
@@ -269,34 +485,84 @@ class PDFWithHeaderFooter(FPDF):
         self.set_xy(COL4_X, y_pos);
         self.cell(40, PDF_LINE_HEIGHT, KOPF_PDF_LABELS["Farben_Insekt_Fuehrungsschiene"])
         y_pos += PDF_LINE_HEIGHT
-        # Data
-        self.set_xy(COL2_X, y_pos);
-        self.cell(30, PDF_LINE_HEIGHT, str(kopf_data.get("Farben_Insekt_Element", "")), border='B')
-        self.set_xy(COL3_X, y_pos);
-        self.cell(35, PDF_LINE_HEIGHT, str(kopf_data.get("Farben_Insekt_Endleiste", "")), border='B')
-        self.set_xy(COL4_X, y_pos);
-        self.cell(40, PDF_LINE_HEIGHT, str(kopf_data.get("Farben_Insekt_Fuehrungsschiene", "")), border='B')
-        y_pos += PDF_LINE_HEIGHT * 2
+        y_pos += PDF_LINE_HEIGHT * 2  # Values row (data layer) + space
 
         # --- Hinweise Section ---
-        self.set_font(PDF_FONT, 'B', 9)  # Bold label
+        self.set_font(self.font_name, 'B', 9)  # Bold label
         self.set_xy(COL1_X, y_pos);
-        self.cell(0, PDF_LINE_HEIGHT, "Hinweise zur getroffenen Farbauswahl:", ln=1)
+        self.cell(0, PDF_LINE_HEIGHT, "Hinweise zur getroffenen Farbauswahl:")
         y_pos += PDF_LINE_HEIGHT
-        self.set_font(PDF_FONT, '', 9)  # Normal text
-        self.set_x(COL2_X)  # Indent the hints
-        self.cell(0, PDF_LINE_HEIGHT, "- Farbauswahl Behang nur bei ALU-Rollladen möglich.", ln=1)
-        self.set_x(COL2_X)
-        self.cell(0, PDF_LINE_HEIGHT, "- Farbauswahl Reviblende nur bei ALU möglich.", ln=1)
-        self.set_x(COL2_X)
-        self.cell(0, PDF_LINE_HEIGHT, "- Farbauswahl Führungsschiene nur bei ALU möglich.", ln=1)
+        self.set_font(self.font_name, '', 9)  # Normal text
+        for hint in KOPF_COLOR_HINTS:
+            self.set_xy(COL2_X, y_pos)  # Indent the hints
+            self.cell(0, PDF_LINE_HEIGHT, hint)
+            y_pos += PDF_LINE_HEIGHT
+
+    def _draw_kopf_values(self, kopf_data: Dict, hinweis_text: str, y_top: float, y_bottom: float):
+        """ Order-specific values of the Kopf page, underlined, at the rows left free by the static stamps. """
+        # --- Row 2: Address values ---
+        y_pos = y_top + PDF_LINE_HEIGHT * 5.5
+        self.set_font(self.font_name, '', 8)
+        self.set_xy(COL2_X, y_pos);
+        self.cell(30, PDF_LINE_HEIGHT, self.pdf_text(kopf_data.get("Kundenadr.", "2144")), border=self.value_border)
+        self.set_xy(COL3_X, y_pos);
+        self.cell(35, PDF_LINE_HEIGHT, self.pdf_text(kopf_data.get("Rechnungsadr.", "58")), border=self.value_border)
+        self.set_xy(COL4_X, y_pos);
+        self.cell(30, PDF_LINE_HEIGHT, self.pdf_text(kopf_data.get("Lieferadr.", "58")), border=self.value_border)
+        self.set_xy(COL5_X, y_pos);
+        self.cell(30, PDF_LINE_HEIGHT, self.pdf_text(kopf_data.get("AufBestAdr.", "58")), border=self.value_border)
 
-        # --- Footer Text ---
-        # Position near bottom - check page height if needed
-        self.set_y(PAGE_HEIGHT_L - PDF_MARGIN - 10)  # Position near bottom
-        self.set_x(COL1_X)
-        self.set_font(PDF_FONT, '', 8)
-        self.cell(40, PDF_LINE_HEIGHT, "Bestellblatt_Kopf")
+        # --- Row 3: Bestellinformationen ---
+        y_pos = y_top + PDF_LINE_HEIGHT * 9.5
+        self.set_font(self.font_name, '', 9)
+        self.set_xy(COL2_X, y_pos);
+        self.cell(30, PDF_LINE_HEIGHT, self.pdf_text(kopf_data.get("Bestelldatum", "")), border=self.value_border)
+        self.set_xy(COL3_X, y_pos);
+        self.cell(35, PDF_LINE_HEIGHT, self.pdf_text(kopf_data.get("Auftragsname", "")), border=self.value_border)
+        self.set_xy(COL4_X, y_pos);
+        self.cell(40, PDF_LINE_HEIGHT, self.pdf_text(kopf_data.get("Kunden-Auftrags-Nr", "")), border=self.value_border)
+        self.set_xy(COL5_X, y_pos);
+        self.cell(40, PDF_LINE_HEIGHT, self.pdf_text(kopf_data.get("Wunsch-Liefertermin", "")), border=self.value_border)
+        self.set_xy(COL6_X, y_pos);
+        self.cell(30, PDF_LINE_HEIGHT, self.pdf_text(kopf_data.get("Besteller", "")), border=self.value_border)
+
+        # --- Row 4: Sonderausführung / Hinweistext ---
+        y_pos = y_top + PDF_LINE_HEIGHT * 13
+        self.set_xy(COL2_X, y_pos);
+        self.cell(30, PDF_LINE_HEIGHT, self.pdf_text(kopf_data.get("Sonderausführung", "")), border=self.value_border)
+        self.set_xy(COL4_X, y_pos);
+        self.multi_cell(KOPF_HINWEIS_WIDTH, PDF_LINE_HEIGHT, hinweis_text, border=self.value_border, align='L')
+
+        # --- Row 5: Angaben Verschattungselemente ---
+        y_pos = y_bottom + PDF_LINE_HEIGHT * 2
+        self.set_xy(COL2_X, y_pos);
+        self.cell(30, PDF_LINE_HEIGHT, self.pdf_text(kopf_data.get("BehangArt", "")), border=self.value_border)
+        self.set_xy(COL3_X, y_pos);
+        self.cell(35, PDF_LINE_HEIGHT, self.pdf_text(kopf_data.get("Kurbelstange", "")), border=self.value_border)
+
+        # --- Row 6: Farben Verschattungselemente ---
+        y_pos = y_bottom + PDF_LINE_HEIGHT * 5.5
+        self.set_xy(COL2_X, y_pos);
+        self.cell(30, PDF_LINE_HEIGHT, self.pdf_text(kopf_data.get("Farben_Behang", "")), border=self.value_border)
+        self.set_xy(COL3_X, y_pos);
+        self.cell(35, PDF_LINE_HEIGHT, self.pdf_text(kopf_data.get("Farben_Anschlagstopfen", "")), border=self.value_border)
+        self.set_xy(COL4_X, y_pos);
+        self.cell(40, PDF_LINE_HEIGHT, self.pdf_text(kopf_data.get("Farben_Endleiste", "")), border=self.value_border)
+        self.set_xy(COL5_X, y_pos);
+        self.cell(30, PDF_LINE_HEIGHT, self.pdf_text(kopf_data.get("Farben_Aussenkasten", "")), border=self.value_border)
+        self.set_xy(COL6_X, y_pos);
+        self.cell(30, PDF_LINE_HEIGHT, self.pdf_text(kopf_data.get("Farben_Reviblende", "")), border=self.value_border)
+        self.set_xy(COL7_X, y_pos);
+        self.cell(0, PDF_LINE_HEIGHT, self.pdf_text(kopf_data.get("Farben_Fuehrungsschiene", "")), border=self.value_border) # Use 0 width
+
+        # --- Row 7: Farben Insektenschutz ---
+        y_pos = y_bottom + PDF_LINE_HEIGHT * 9
+        self.set_xy(COL2_X, y_pos);
+        self.cell(30, PDF_LINE_HEIGHT, self.pdf_text(kopf_data.get("Farben_Insekt_Element", "")), border=self.value_border)
+        self.set_xy(COL3_X, y_pos);
+        self.cell(35, PDF_LINE_HEIGHT, self.pdf_text(kopf_data.get("Farben_Insekt_Endleiste", "")), border=self.value_border)
+        self.set_xy(COL4_X, y_pos);
+        self.cell(40, PDF_LINE_HEIGHT, self.pdf_text(kopf_data.get("Farben_Insekt_Fuehrungsschiene", "")), border=self.value_border)
     # --- END UNCOMMENTED METHOD ---
 
     # =========================================================================
@@ -305,61 +571,27 @@ class PDFWithHeaderFooter(FPDF):
     def draw_positionen_pages(self, positions_data: List[Dict]):
         if not positions_data:
             self.add_page(orientation='L')
-            self.set_font(PDF_FONT, 'B', 12)
+            self.set_font(self.font_name, 'B', 12)
             self.cell(0, 20, "Keine Positionen gefunden.", 0, 1, 'C')
             return
 
-        self.add_page(orientation='L')
-        self.ln(5) # Add some space below header
-
-        # Sort definitions based on column index specified in config
-        sorted_pos_defs = sorted(POS_COLS_DEFS.items(), key=lambda item: item[1][1])
-        headers = [header for key, (header, idx) in sorted_pos_defs]
-        data_keys = [key for key, (header, idx) in sorted_pos_defs]
-
-        # Define column widths - THESE MUST MATCH THE ORDER AND NUMBER OF headers/data_keys
-        # Based on the POS_COLS_DEFS structure provided (31 columns defined)
-        col_widths = [
-            6, 6, 7, 8, 10, 10, 8, 12, 12, # lfdNr_1 to Fensterart (9 cols)
-            6,                          # Fensteröffnung_32 (1 col)
-            10, 10,                     # Fenstergeometrie, Konstruktion (2 cols)
-            20,                         # BehangTyp (1 col)
-            8, 18,                      # Schallschutz_48, Antrieb (2 cols)
-            10,                         # Fuehrungsschiene (1 col)
-            10,                         # ReviblendeArt (1 col)
-            7, 15,                      # Standardausführung_15, Fensterbankart (2 cols)
-            5, 5, 8, 8, 16,             # Anzahl_Links_13 to Maßbezug (5 cols)
-            10,                         # ISS_Ausführung (1 col)
-            8, 8, 8,                    # ISS_Behindertengerecht_40 to ISS_Anzahl_Rechts_42 (3 cols)
-            10,                         # EinzelteilTyp (1 col)
-            10,                         # EinzelteilArt (1 col)
-            8                           # EinzelteilAnzahl_25 (1 col)
-        ] # Total = 31 widths
-
-        # --- Sanity Checks ---
-        if len(headers) != len(col_widths):
-            logging.error(f"Header count ({len(headers)}) does not match column width count ({len(col_widths)}). PDF table layout will be incorrect.")
-            # Option: Truncate or pad to prevent index errors, but layout will be wrong.
-            # For now, let it proceed but log the error. User needs to fix config/widths.
-            min_len = min(len(headers), len(col_widths))
-            headers = headers[:min_len]
-            data_keys = data_keys[:min_len]
-            col_widths = col_widths[:min_len]
-            logging.warning(f"Proceeding with {min_len} columns.")
+        headers, data_keys, col_widths = positionen_columns()
 
+        # --- Lay out all data rows up front (each cell measured once, see layout_positionen_rows) ---
+        self.set_font(self.font_name, '', PDF_TABLE_ROW_HEIGHT - 1) # Font for data rows
+        row_plan = self.layout_positionen_rows(positions_data, data_keys, col_widths)
+        self.draw_positionen_table(self.paginate_positionen_rows(row_plan), headers, col_widths)
 
+    def paginate_positionen_rows(self, row_plan: List[tuple], first_page: bool = True) -> List[List[tuple]]:
+        """ Splits the row plan into pages of this document (see paginate_rows). """
+        return paginate_rows(row_plan, self.t_margin + PDF_PAGE_HEADER_HEIGHT, self.h - self.b_margin, first_page)
+
+    def draw_positionen_table(self, row_pages: List[List[tuple]], headers: List[str], col_widths: List[float], first_page: bool = True):
+        """ Draws pre-paginated Positionen rows (see paginate_positionen_rows), one page per entry, each with the rotated header. """
         total_w = sum(col_widths)
-        logging.info(f"Using Positionen table width: {total_w}mm (Printable: {PRINTABLE_WIDTH_L}mm)")
-        scale_factor = 1.0
-        if total_w > PRINTABLE_WIDTH_L:
-            logging.warning("Table width exceeds printable area. Scaling columns.")
-            scale_factor = PRINTABLE_WIDTH_L / total_w
-            col_widths = [w * scale_factor for w in col_widths]
-            total_w = sum(col_widths) # Recalculate total width after scaling
-            logging.info(f"Scaled Positionen table width to: {total_w}mm")
 
-        def draw_rotated_table_header():
-            self.set_font(PDF_FONT, 'B', 7) # Use a small font for headers
+        def draw_rotated_table_header_content():
+            self.set_font(self.font_name, 'B', 7) # Use a small font for headers
             self.set_line_width(0.2)
             header_start_y = self.get_y()
             current_x = PDF_MARGIN
@@ -386,7 +618,7 @@ class PDFWithHeaderFooter(FPDF):
                     # Width of multi_cell is the available vertical space (header height)
                     # Height of multi_cell lines (e.g., 2.5 or 3)
                     self.set_xy(start_x_rotated, rotation_y) # Set position in rotated context
-                    self.multi_cell(w=PDF_TABLE_HEADER_HEIGHT, h=3, txt=wrapped_header, align='C') # Use keywords for clarity
+                    self.multi_cell(w=PDF_TABLE_HEADER_HEIGHT, h=3, text=wrapped_header, align='C') # Use keywords for clarity
 
                 # Draw vertical lines for the cell borders
                 self.line(current_x, header_start_y, current_x, header_start_y + PDF_TABLE_HEADER_HEIGHT)
@@ -397,92 +629,175 @@ class PDFWithHeaderFooter(FPDF):
             self.line(PDF_MARGIN, header_start_y, PDF_MARGIN + total_w, header_start_y) # Top border
             self.line(PDF_MARGIN, header_start_y + PDF_TABLE_HEADER_HEIGHT, PDF_MARGIN + total_w, header_start_y + PDF_TABLE_HEADER_HEIGHT) # Bottom border
 
+        header_stamp_key = ("positionen_header", tuple(headers), tuple(col_widths))
+
+        def draw_rotated_table_header():
+            # The header is laid out (word_wrap + rotated multi_cells) only once and replayed on every page
+            header_start_y = self.get_y()
+            self.stamp(header_stamp_key, draw_rotated_table_header_content)
+            self.set_font(self.font_name, 'B', 7) # Leave font/line width as the drawn header does
+            self.set_line_width(0.2)
+
             # Set Y position for the first data row
             self.set_y(header_start_y + PDF_TABLE_HEADER_HEIGHT + 1) # Add small gap
             self.set_x(PDF_MARGIN)
 
-        # --- Draw Header ---
-        draw_rotated_table_header()
-
-        # --- Draw Data Rows ---
-        self.set_font(PDF_FONT, '', PDF_TABLE_ROW_HEIGHT - 1) # Font for data rows
-        self.set_line_width(0.1) # Thinner lines for data rows
-
-        for row_data in positions_data:
-            # --- Calculate Max Height Needed for this Row ---
+        # Page breaks come from the pagination only: fpdf's automatic break could otherwise split a row
+        # that ends exactly at the bottom margin across two pages (and shift the page count chunks rely on)
+        auto_page_break = self.auto_page_break
+        self.set_auto_page_break(False, margin=self.b_margin)
+        try:
+            for page_index, page_rows in enumerate(row_pages):
+                self.add_page(orientation='L')
+                if page_index == 0 and first_page:
+                    self.ln(PDF_POSITIONEN_TOP_GAP) # Add some space below header
+                draw_rotated_table_header()
+
+                # --- Draw Data Rows ---
+                self.set_font(self.font_name, '', PDF_TABLE_ROW_HEIGHT - 1) # Font for data rows
+                self.set_line_width(0.1) # Thinner lines for data rows
+
+                for row_texts, row_height in page_rows:
+                    row_start_y = self.get_y()
+
+                    # --- Draw the actual row cells ---
+                    current_x = PDF_MARGIN
+                    for width, value in zip(col_widths, row_texts):
+                        self.set_xy(current_x, row_start_y) # Reset Y for each cell in the row
+                        self.multi_cell(
+                            w=width,                    # Cell width
+                            text=value,                 # Text content (already converted by pdf_text; 'text' avoids fpdf's deprecated 'txt' shim)
+                            border=self.cell_border,    # Left-Right border (none in draft)
+                            align='L',                  # Left align
+                            max_line_height=PDF_TABLE_ROW_HEIGHT, # Height of each line
+                            h=row_height                # TOTAL height of the cell
+                        )
+                        current_x += width
+
+                    # --- Move Y position down by the height of the row and draw bottom border ---
+                    self.set_y(row_start_y + row_height)
+                    self.line(PDF_MARGIN, self.get_y(), PDF_MARGIN + total_w, self.get_y())
+        finally:
+            self.set_auto_page_break(auto_page_break, margin=self.b_margin)
+
+    def measure_lines(self, text: str, width: float) -> int:
+        """
+        Number of lines multi_cell needs for `text` in a column of `width` with the current font.
+        Results are cached process-wide by (text, width, font), since positions repeat a small
+        set of values ("Becker Motor", "ALU95", "Alubank", ...).
+        """
+        key = (text, width, self.font_family, self.font_style, self.font_size_pt)
+        line_count = _LINE_COUNT_CACHE.get(key)
+        if line_count is None:
+            lines = self.multi_cell(w=width, h=PDF_TABLE_ROW_HEIGHT, text=text, border=0, align='L', dry_run=True, output='LINES')
+            line_count = len(lines)
+            if len(_LINE_COUNT_CACHE) >= _LINE_COUNT_CACHE_MAX:
+                _LINE_COUNT_CACHE.clear() # Simple bound; the working set refills within a few rows
+            _LINE_COUNT_CACHE[key] = line_count
+        return line_count
+
+    def layout_positionen_rows(self, positions_data: List[Dict], data_keys: List[str], col_widths: List[float]) -> List[tuple]:
+        """
+        Builds the row plan for the Positionen table using the current (data) font.
+        Returns a list of (cell_texts, row_height); texts are already converted for the font (see pdf_text).
+        The trailing position without width/height is left out, like in the other writers.
+        """
+        row_plan = []
+        pdf_text = self.pdf_text
+        last_index = len(positions_data) - 1
+        for row_index, row_data in enumerate(positions_data):
             if (
-                row_data == positions_data[-1] and
+                row_index == last_index and
                 not row_data.get("FeBreite_11") and
                 not row_data.get("FeHoehe_12")
             ):
-            
                 logging.info("Skipping last row due to empty 'FeBreite_11' and 'FeHoehe_12'.")
                 continue
-            row_start_y = self.get_y()
-            max_cell_height_needed = PDF_TABLE_ROW_HEIGHT # Minimum height
-
-            # Pre-calculate height needed for each cell in the row
-            for i, key in enumerate(data_keys):
-                if i < len(col_widths):
-                    width = col_widths[i]
-                    value = str(row_data.get(key, ''))
-                    # Attempt to encode to handle potential unicode issues gracefully
-                    try:
-                        value.encode('latin-1')
-                    except UnicodeEncodeError:
-                        value = value.encode('latin-1', 'replace').decode('latin-1')
-
-                    # Estimate number of lines needed by multi_cell
-                    # Use keyword args for clarity in dry_run as well
-                    lines = self.multi_cell(w=width, h=PDF_TABLE_ROW_HEIGHT, txt=value, border=0, align='L', dry_run=True, output='LINES')
-                    cell_height = len(lines) * PDF_TABLE_ROW_HEIGHT
-                    max_cell_height_needed = max(max_cell_height_needed, cell_height)
-
-            # --- Check for Page Break BEFORE drawing the row ---
-            if row_start_y + max_cell_height_needed > (self.h - self.b_margin):
-                self.add_page(orientation='L')
-                draw_rotated_table_header() # Redraw header on new page
-                self.set_font(PDF_FONT, '', PDF_TABLE_ROW_HEIGHT - 1) # Reset font
-                row_start_y = self.get_y() # Update starting Y for the row
 
-            # --- Draw the actual row cells ---
-            current_x = PDF_MARGIN
-            for i, key in enumerate(data_keys):
-                if i < len(col_widths):
-                    self.set_xy(current_x, row_start_y) # Reset Y for each cell in the row
-                    width = col_widths[i]
-                    value = str(row_data.get(key, ''))
-                    try:
-                        value.encode('latin-1')
-                    except UnicodeEncodeError:
-                        value = value.encode('latin-1', 'replace').decode('latin-1')
-
-                    # --- FIX: Use keyword 'h' for total height, 'max_line_height' for line height ---
-                    # Remove the positional 'h' (PDF_TABLE_ROW_HEIGHT)
-                    self.multi_cell(
-                        w=width,                    # Cell width
-                        txt=value,                  # Text content
-                        border='LR',                # Left-Right border
-                        align='L',                  # Left align
-                        max_line_height=PDF_TABLE_ROW_HEIGHT, # Height of each line
-                        h=max_cell_height_needed    # TOTAL height of the cell
-                    )
-                    # --- END FIX ---
-                    current_x += width
-
-            # --- Move Y position down by the height of the row and draw bottom border ---
-            self.set_y(row_start_y + max_cell_height_needed)
-            self.line(PDF_MARGIN, self.get_y(), PDF_MARGIN + total_w, self.get_y())
+            row_texts = [pdf_text(row_data.get(key, '')) for key in data_keys[:len(col_widths)]]
+            max_lines = max((self.measure_lines(text, width) for text, width in zip(row_texts, col_widths)), default=1)
+            row_plan.append((row_texts, max(1, max_lines) * PDF_TABLE_ROW_HEIGHT))
+        return row_plan
     # =========================================================================
     # === END: draw_positionen_pages MOVED INSIDE THE CLASS ===
     # =========================================================================
 
 
+# --- Parallel Rendering of the Positionen Pages ---
+_RENDER_POOL = None
+
+def _render_pool() -> ProcessPoolExecutor:
+    """ Process pool for chunk rendering, created on first use and reused for later documents. """
+    global _RENDER_POOL
+    if _RENDER_POOL is None:
+        _RENDER_POOL = ProcessPoolExecutor(max_workers=PDF_PARALLEL_WORKERS)
+    return _RENDER_POOL
+
+def _render_positionen_chunk(profile: str, headers: List[str], col_widths: List[float], row_pages: List[List[tuple]],
+                             page_offset: int, total_pages: int, first_page: bool) -> bytes:
+    """ Worker: renders consecutive Positionen pages as a standalone PDF, numbered as part of the whole document. """
+    pdf = PDFWithHeaderFooter(orientation='L', unit='mm', format='A4', profile=profile)
+    pdf.set_auto_page_break(auto=True, margin=PDF_MARGIN)
+    pdf.register_fonts()
+    pdf.page_offset = page_offset
+    pdf.total_pages = total_pages
+    pdf.draw_positionen_table(row_pages, headers, col_widths, first_page=first_page)
+    return pdf.output()
+
+def _render_positionen_parallel(pdf: PDFWithHeaderFooter, positions_data: List[Dict]) -> bytes:
+    """
+    Lays out and paginates the Positionen rows in this process, renders chunks of
+    PDF_PARALLEL_CHUNK_PAGES pages in the process pool and appends them to `pdf` (Kopf page) with PyMuPDF.
+    Every chunk knows its page offset and the final page count, so "Seite x/y" and the
+    repeated table header are the same as in a serial render.
+    Falls back to serial drawing for tables shorter than PDF_PARALLEL_MIN_PAGES pages.
+    """
+    headers, data_keys, col_widths = positionen_columns()
+    pdf.set_font(pdf.font_name, '', PDF_TABLE_ROW_HEIGHT - 1)
+    row_pages = pdf.paginate_positionen_rows(pdf.layout_positionen_rows(positions_data, data_keys, col_widths))
+    if len(row_pages) < PDF_PARALLEL_MIN_PAGES:
+        pdf.draw_positionen_table(row_pages, headers, col_widths)
+        return pdf.output()
+
+    page_offset = pdf.page_no()
+    pdf.total_pages = page_offset + len(row_pages) # Before output(), which emits the Kopf page footer
+    pool = _render_pool()
+    futures = [
+        pool.submit(_render_positionen_chunk, pdf.profile_name, headers, col_widths,
+                    row_pages[start:start + PDF_PARALLEL_CHUNK_PAGES], page_offset + start, pdf.total_pages, start == 0)
+        for start in range(0, len(row_pages), PDF_PARALLEL_CHUNK_PAGES)
+    ]
+    logging.info(f"Rendering {len(row_pages)} Positionen pages in {len(futures)} chunks (parallel).")
+
+    merged = fitz.open(stream=pdf.output(), filetype="pdf")
+    try:
+        for future in futures:
+            with fitz.open(stream=future.result(), filetype="pdf") as chunk_doc:
+                merged.insert_pdf(chunk_doc)
+        return merged.tobytes(garbage=1, deflate=PDF_OUTPUT_PROFILES[pdf.profile_name]["compress"])
+    finally:
+        merged.close()
+
+
 # --- Main Function to Generate PDF ---
-def write_combined_pdf(mapped_data, output_directory, base_filename):
+def write_combined_pdf(mapped_data, output_directory=None, base_filename=None, sink=None, profile=None, parallel=False, backend=None):
     """
     Generates a multi-page PDF with Kopf and Positionen data using the new structure.
+    If `sink` (a binary file-like object) is given, the PDF bytes are written there
+    instead of to output_directory and the sink is returned.
+    `profile` selects an output profile from config.PDF_OUTPUT_PROFILES (default: DEFAULT_PDF_PROFILE).
+    `parallel=True` renders the Positionen pages in chunks in a process pool (for orders with many pages).
+    `backend` selects the renderer from config.PDF_RENDER_BACKENDS (default: DEFAULT_PDF_BACKEND);
+    "pymupdf" draws the same layout with PyMuPDF (see pymupdf_writer) and ignores `parallel`.
     """
+    profile = profile or DEFAULT_PDF_PROFILE
+    if profile not in PDF_OUTPUT_PROFILES:
+        logging.error(f"Unknown PDF profile '{profile}'. Available: {', '.join(PDF_OUTPUT_PROFILES)}")
+        return None
+    backend = backend or DEFAULT_PDF_BACKEND
+    if backend not in PDF_RENDER_BACKENDS:
+        logging.error(f"Unknown PDF backend '{backend}'. Available: {', '.join(PDF_RENDER_BACKENDS)}")
+        return None
     kopf_data = mapped_data.get("kopf")
     positions_data = mapped_data.get("positionen")
 
@@ -492,24 +807,38 @@ def write_combined_pdf(mapped_data, output_directory, base_filename):
     # No need to check positions_data here, draw_positionen_pages handles empty list
 
     try:
-        pdf = PDFWithHeaderFooter(orientation='L', unit='mm', format='A4') # START Landscape
-        pdf.set_auto_page_break(auto=True, margin=PDF_MARGIN)
-        pdf.alias_nb_pages() # Enable page numbering {nb}
-
-        # --- Page 1: Kopf (Landscape) ---
-        # This method MUST exist in the PDFWithHeaderFooter class
-        pdf.draw_kopf_page(kopf_data)
-
-        # --- Page 2+: Positionen ---
-        # This method MUST exist in the PDFWithHeaderFooter class
-        pdf.draw_positionen_pages(positions_data) # <<< THIS CALL WILL NOW WORK
+        if backend == "pymupdf":
+            import pymupdf_writer # Imported on use: it builds on this module's layout helpers
+            pdf_bytes = pymupdf_writer.render_combined_pdf(kopf_data, positions_data, profile)
+        else:
+            pdf = PDFWithHeaderFooter(orientation='L', unit='mm', format='A4', profile=profile) # START Landscape
+            pdf.set_auto_page_break(auto=True, margin=PDF_MARGIN)
+            pdf.alias_nb_pages() # Enable page numbering {nb}
+            pdf.register_fonts() # Stable font ids, so stamped static content can be replayed
+
+            # --- Page 1: Kopf (Landscape) ---
+            # This method MUST exist in the PDFWithHeaderFooter class
+            pdf.draw_kopf_page(kopf_data)
+
+            # --- Page 2+: Positionen ---
+            if parallel and positions_data:
+                pdf_bytes = _render_positionen_parallel(pdf, positions_data)
+            else:
+                # This method MUST exist in the PDFWithHeaderFooter class
+                pdf.draw_positionen_pages(positions_data) # <<< THIS CALL WILL NOW WORK
+                pdf_bytes = pdf.output() # output() without a name returns the document bytes
 
         # --- Save PDF ---
+        if sink is not None:
+            sink.write(pdf_bytes)
+            logging.info(f"Successfully wrote Combined PDF ({profile} profile, {backend}) to in-memory sink.")
+            return sink
+
         output_filename = f"{base_filename}.pdf"
         output_path = output_directory / output_filename
-        pdf.output(str(output_path))
+        output_path.write_bytes(pdf_bytes)
 
-        logging.info(f"Successfully generated Combined PDF: {output_path}")
+        logging.info(f"Successfully generated Combined PDF ({profile} profile, {backend}): {output_path}")
         return str(output_path)
 
     except Exception as e:
@@ -0,0 +1,487 @@
+# pymupdf_writer.py
+"""
+Alternative renderer for the combined Bestellblatt PDF using PyMuPDF's native drawing and text APIs.
+Draws the same Kopf page and rotated-header Positionen table as pdf_writer.PDFWithHeaderFooter
+(same layout constants, column widths, pagination and profiles), selected with
+pdf_writer.write_combined_pdf(..., backend="pymupdf").
+
+Every page is drawn through one fitz.Shape (one content stream per page). Each PyMuPDF call has
+a fixed Python-side cost, so the table is drawn per column rather than per cell: all baselines of
+a page lie on a half-row grid, so the cells of one column become a single multi-line insert_text,
+and the 'LR' cell borders become one line per column boundary. Static content (Kopf labels, rotated
+table header) is drawn once per process and placed on the pages as a Form XObject.
+"""
+import logging
+import pathlib
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+import fitz # PyMuPDF
+
+from config import PDF_OUTPUT_PROFILES, PDF_EMBED_FONT_FILES
+from pdf_writer import (
+    PDF_MARGIN, PDF_LINE_HEIGHT, PDF_TABLE_HEADER_HEIGHT, PDF_TABLE_ROW_HEIGHT, PDF_PAGE_HEADER_HEIGHT,
+    PDF_POSITIONEN_TOP_GAP, PAGE_WIDTH_L, PAGE_HEIGHT_L, PRINTABLE_WIDTH_L, KOPF_PDF_LABELS, KOPF_COLOR_HINTS,
+    COL1_X, COL2_X, COL3_X, COL4_X, COL5_X, COL6_X, COL7_X, KOPF_HINWEIS_WIDTH,
+    positionen_columns, paginate_rows,
+)
+
+MM = 72 / 25.4 # Points per millimetre
+CELL_MARGIN = 1.0 # Interior cell margin in mm (fpdf's default c_margin)
+DATA_FONT_SIZE = PDF_TABLE_ROW_HEIGHT - 1
+TEXT_GRID = PDF_TABLE_ROW_HEIGHT / 2 # Data cell baselines lie on this grid, counted from the row top
+
+# Base-14 fonts (referenced, not embedded) by style; profiles with embed_font use PDF_EMBED_FONT_FILES
+CORE_FONT_NAMES = {"": "helv", "B": "hebo", "I": "heit"}
+EMBED_FONT_NAMES = {"": "EmbedSans", "B": "EmbedSansB", "I": "EmbedSansI"}
+
+# --- Font specs with their advance widths, shared by all documents of the process: (fontname, fontfile) -> _FontSpec ---
+_FONT_CACHE = {}
+
+# --- Wrapped cell text: (text, width, font, size) -> list of lines ---
+_WRAP_CACHE = {}
+_WRAP_CACHE_MAX = 20000
+
+# --- Static content drawn once per process (Kopf labels, rotated table header): key -> one-page fitz.Document ---
+_TEMPLATE_CACHE = {}
+
+
+class _FontSpec:
+    """
+    One font style: PDF resource name, TTF file (None for base-14) and per-character advance widths.
+    Base-14 widths come from the standard AFM metrics, like fpdf's core fonts and PDF viewers use.
+    """
+    def __init__(self, fontname: str, fontfile: str = None):
+        self.fontname = fontname
+        self.fontfile = fontfile
+        self.key = (fontname, fontfile)
+        self._font = fitz.Font(fontfile=fontfile) if fontfile else None
+        self._widths = {}
+
+    def text_width(self, text: str, size: float) -> float:
+        """ Width of `text` in mm at `size` pt (no kerning). """
+        widths = self._widths
+        total = 0.0
+        for char in text:
+            width = widths.get(char)
+            if width is None:
+                if self._font is not None:
+                    width = self._font.glyph_advance(ord(char))
+                else:
+                    width = fitz.get_text_length(char, fontname=self.fontname, fontsize=1)
+                widths[char] = width
+            total += width
+        return total * size / MM
+
+def _font(fontname: str, fontfile: str = None) -> _FontSpec:
+    font = _FONT_CACHE.get((fontname, fontfile))
+    if font is None:
+        font = _FONT_CACHE[(fontname, fontfile)] = _FontSpec(fontname, fontfile)
+    return font
+
+def _profile_fonts(embed_font: bool) -> Tuple[Dict[str, _FontSpec], bool]:
+    """
+    Fonts by style for a profile, and whether they are embedded TTF fonts.
+    Raises ValueError if embed_font is requested and the TTF file is missing.
+    """
+    regular = PDF_EMBED_FONT_FILES.get("")
+    if embed_font and regular and pathlib.Path(regular).is_file():
+        fonts = {}
+        for style, fontname in EMBED_FONT_NAMES.items():
+            font_file = PDF_EMBED_FONT_FILES.get(style)
+            if not font_file or not pathlib.Path(font_file).is_file():
+                font_file = regular
+            fonts[style] = _font(fontname, font_file)
+        return fonts, True
+    if embed_font: # No silent base-14 fallback: the profile promises embedded fonts (see config.PDF_UNAVAILABLE_PROFILES)
+        raise ValueError(f"The PDF profile needs the embedded font file {regular}, which is not installed.")
+    return {style: _font(name) for style, name in CORE_FONT_NAMES.items()}, False
+
+
+def _wrap_lines(text: str, font: _FontSpec, size: float, width: float) -> List[str]:
+    """
+    Splits `text` into lines for a cell of `width` mm like fpdf's multi_cell: greedy word wrap
+    inside the cell margins, explicit newlines kept, words longer than a line split by character.
+    """
+    key = (text, width, font.key, size)
+    lines = _WRAP_CACHE.get(key)
+    if lines is not None:
+        return lines
+    max_width = width - 2 * CELL_MARGIN
+    lines = []
+    for paragraph in text.split("\n"):
+        line = ""
+        for word in paragraph.split(" "):
+            candidate = f"{line} {word}" if line else word
+            if font.text_width(candidate, size) <= max_width:
+                line = candidate
+                continue
+            if line:
+                lines.append(line)
+                line = ""
+            for char in word: # Word alone does not fit: break it by character
+                if line and font.text_width(line + char, size) > max_width:
+                    lines.append(line)
+                    line = char
+                else:
+                    line += char
+        lines.append(line)
+    if len(_WRAP_CACHE) >= _WRAP_CACHE_MAX:
+        _WRAP_CACHE.clear()
+    _WRAP_CACHE[key] = lines
+    return lines
+
+def _header_word_wrap(text: str, font: _FontSpec, size: float, width: float) -> List[str]:
+    """ Same wrapping as PDFWithHeaderFooter.word_wrap for the rotated column headers. """
+    lines = []
+    current_line = ""
+    for word in str(text).split():
+        if font.text_width((current_line + word + " ").strip(), size) < width:
+            current_line += word + " "
+        else:
+            if current_line:
+                lines.append(current_line.strip())
+            current_line = word + " "
+    lines.append(current_line.strip())
+    return lines
+
+
+class _PageCanvas:
+    """
+    Draws one page through a single Shape, in mm with a top-left origin like fpdf.
+    Lines are collected by width and stroked as one path per width when the page is finished.
+    """
+    def __init__(self, page: fitz.Page, fonts: Dict[str, _FontSpec]):
+        self.page = page
+        self.fonts = fonts
+        self.shape = page.new_shape()
+        self.lines = {} # line width (mm) -> [(x1, y1, x2, y2), ...]
+        self.templates = [] # (template document, y offset in mm)
+
+    def text(self, x: float, baseline: float, text, style: str, size: float, line_spacing: float = None, rotate: int = 0):
+        """ Text at a baseline; `text` may be a list of lines, `line_spacing` mm apart. """
+        if not text or (isinstance(text, list) and not any(text)):
+            return
+        font = self.fonts[style]
+        self.shape.insert_text((x * MM, baseline * MM), text, fontsize=size, fontname=font.fontname, fontfile=font.fontfile,
+                               lineheight=line_spacing * MM / size if line_spacing else None, rotate=rotate)
+
+    def place(self, template: fitz.Document, y: float):
+        """ Shows the page of a template document, shifted down by `y` mm. """
+        self.templates.append((template, y))
+
+    def line(self, x1: float, y1: float, x2: float, y2: float, width: float):
+        self.lines.setdefault(width, []).append((x1, y1, x2, y2))
+
+    def cell(self, x: float, y: float, w: float, h: float, text: str, style: str, size: float, align: str = 'L', border=0):
+        """ Single-line cell like fpdf's cell(); w=0 extends to the right margin. """
+        if w == 0:
+            w = PAGE_WIDTH_L - PDF_MARGIN - x
+        if text:
+            baseline = y + 0.5 * h + 0.3 * size / MM
+            if align == 'L':
+                text_x = x + CELL_MARGIN
+            else:
+                text_width = self.fonts[style].text_width(text, size)
+                text_x = x + w - CELL_MARGIN - text_width if align == 'R' else x + (w - text_width) / 2
+            self.text(text_x, baseline, text, style, size)
+        if border == 'B':
+            self.line(x, y + h, x + w, y + h, 0.2)
+
+    def finish(self):
+        shape = self.shape
+        for width, segments in self.lines.items():
+            for x1, y1, x2, y2 in segments:
+                shape.draw_line((x1 * MM, y1 * MM), (x2 * MM, y2 * MM))
+            shape.finish(width=width * MM, color=(0, 0, 0), closePath=False)
+        shape.commit()
+        # Templates last: insert_text only registers a font on the page if no font of that name is visible yet,
+        # and a placed template's fonts would hide the page's own
+        for template, y in self.templates:
+            self.page.show_pdf_page(self.page.rect + (0, y * MM, 0, y * MM), template, 0)
+
+
+class PyMuPDFBestellblatt:
+    """ Renders the combined Bestellblatt PDF (Kopf page + Positionen table) into a fitz.Document. """
+
+    def __init__(self, profile: str):
+        settings = PDF_OUTPUT_PROFILES[profile]
+        self.profile_name = profile
+        self.compress = settings["compress"]
+        self.value_border = 'B' if settings["borders"] else 0
+        self.cell_borders = settings["borders"]
+        self.fonts, self.embedded = _profile_fonts(settings["embed_font"])
+        self.doc = fitz.open()
+        self.total_pages = 0
+        self.date_text = datetime.now().strftime('%d.%m.%Y')
+        self.font_xrefs = {} # Font resource name -> xref, shared by all pages of the document
+
+    def _new_page(self) -> _PageCanvas:
+        page = self.doc.new_page(width=PAGE_WIDTH_L * MM, height=PAGE_HEIGHT_L * MM)
+        # Fonts already in the document are linked into the page resources, so insert_text finds them
+        # instead of adding (and for TTF fonts embedding) another copy per page
+        if self.font_xrefs:
+            resources = self.doc.xref_get_key(page.xref, "Resources")
+            target, key = (int(resources[1].split()[0]), "Font") if resources[0] == "xref" else (page.xref, "Resources/Font")
+            fonts = "".join(f"/{fontname} {xref} 0 R" for fontname, xref in self.font_xrefs.items())
+            self.doc.xref_set_key(target, key, f"<<{fonts}>>")
+        canvas = _PageCanvas(page, self.fonts)
+        # --- Running header and footer (PDFWithHeaderFooter.header/footer) ---
+        page_w = PAGE_WIDTH_L - 2 * PDF_MARGIN
+        canvas.cell(PDF_MARGIN, PDF_MARGIN, page_w / 2, 5, "Bestellblatt Fehro.AR AV-Import", 'I', 8)
+        canvas.cell(PDF_MARGIN + page_w / 2, PDF_MARGIN, page_w / 2, 5, self.date_text, 'I', 8, align='R')
+        canvas.cell(PDF_MARGIN, PAGE_HEIGHT_L - 15, page_w, 10, f"Seite {page.number + 1}/{self.total_pages}", 'I', 8, align='C')
+        return canvas
+
+    def _finish_page(self, canvas: _PageCanvas):
+        canvas.finish()
+        for xref, ext, font_type, basefont, fontname, encoding, referencer in canvas.page.get_fonts(full=True):
+            if referencer == 0: # Page's own fonts, not those of placed templates
+                self.font_xrefs.setdefault(fontname, xref)
+
+    def _template(self, key: tuple, draw_fn) -> fitz.Document:
+        """
+        One-page document with static content drawn by `draw_fn(canvas)`, created once per process
+        and font set and placed on the pages with show_pdf_page (a Form XObject) instead of being drawn again.
+        """
+        key = (self.fonts[""].key,) + key
+        template = _TEMPLATE_CACHE.get(key)
+        if template is None:
+            template = fitz.open()
+            canvas = _PageCanvas(template.new_page(width=PAGE_WIDTH_L * MM, height=PAGE_HEIGHT_L * MM), self.fonts)
+            draw_fn(canvas)
+            canvas.finish()
+            _TEMPLATE_CACHE[key] = template
+        return template
+
+    # --- Page 1: Kopf ---
+    def draw_kopf_page(self, kopf_data: Dict):
+        canvas = self._new_page()
+        y_top = PDF_MARGIN + PDF_PAGE_HEADER_HEIGHT + 5
+        hinweis_lines = _wrap_lines(str(kopf_data.get("Hinweistext", "")), self.fonts[""], 9, KOPF_HINWEIS_WIDTH)
+        y_bottom = y_top + 72.5 + (len(hinweis_lines) - 1) * PDF_LINE_HEIGHT
+        # Static labels (templates): the top part at its fixed position, the bottom part below the Hinweistext
+        canvas.place(self._template(("kopf_static_top",), lambda c: self._draw_kopf_static_top(c, y_top)), 0)
+        canvas.place(self._template(("kopf_static_bottom",), self._draw_kopf_static_bottom), y_bottom)
+        self._draw_kopf_values(canvas, kopf_data, hinweis_lines, y_top, y_bottom)
+        self._finish_page(canvas)
+
+    def _draw_kopf_static_top(self, canvas: _PageCanvas, y_top: float):
+        """ Static labels from the company info down to Sonderausführung/Hinweistext, plus the page footer text. """
+        lh = PDF_LINE_HEIGHT
+        cell = canvas.cell
+        # --- Company info ---
+        cell(COL1_X, y_top, 40, lh, "D&M KG", 'B', 10)
+        cell(COL4_X, y_top, 40, lh, "Bestellblatt Fehro.AR", '', 9)
+        cell(COL1_X, y_top + lh, 40, lh, "Auf den Dorfwiesen 1-5", '', 9)
+        cell(COL4_X + 20, y_top + lh, 40, lh, "AV-Import", '', 9)
+        cell(COL1_X, y_top + lh * 2, 40, lh, "56204 Hillscheid", '', 9)
+        # --- Address headers ---
+        y_pos = y_top + lh * 4
+        cell(COL1_X, y_pos, 45, lh, "Eingabe Kundennummern", '', 8)
+        cell(COL2_X, y_pos, 30, lh, "Kundenadr.", '', 8)
+        cell(COL3_X, y_pos, 35, lh, "Rechnungsadr.", '', 8)
+        cell(COL4_X, y_pos, 30, lh, "Lieferadr.", '', 8)
+        cell(COL5_X, y_pos, 30, lh, "AufBestAdr.", '', 8)
+        # --- Bestellinformationen ---
+        y_pos = y_top + lh * 7.5
+        cell(COL1_X, y_pos, 40, lh, "Bestellinformationen", 'B', 10)
+        y_pos += lh
+        cell(COL2_X, y_pos, 30, lh, KOPF_PDF_LABELS["Bestelldatum"], '', 9)
+        cell(COL3_X, y_pos, 35, lh, KOPF_PDF_LABELS["Auftragsname"], '', 9)
+        cell(COL4_X, y_pos, 40, lh, KOPF_PDF_LABELS["Kunden-Auftrags-Nr"], '', 9)
+        cell(COL5_X, y_pos, 40, lh, KOPF_PDF_LABELS["Wunsch-Liefertermin"], '', 9)
+        cell(COL6_X, y_pos, 30, lh, KOPF_PDF_LABELS.get("Besteller", "Besteller:"), '', 9)
+        # --- Sonderausführung / Hinweistext ---
+        y_pos = y_top + lh * 11
+        cell(COL1_X, y_pos, 40, lh, "Sonderausführung", 'B', 10)
+        y_pos += lh
+        cell(COL2_X, y_pos, 30, lh, "J/N", '', 9)
+        cell(COL4_X, y_pos, 40, lh, KOPF_PDF_LABELS["Hinweistext"], '', 9)
+        cell(COL1_X, PAGE_HEIGHT_L - PDF_MARGIN - 10, 40, lh, "Bestellblatt_Kopf", '', 8)
+
+    def _draw_kopf_static_bottom(self, canvas: _PageCanvas):
+        """ Static labels below the Hinweistext, drawn from Y=0 (placed at y_bottom). """
+        lh = PDF_LINE_HEIGHT
+        cell = canvas.cell
+        # --- Verschattungselemente ---
+        cell(COL1_X, 0, 40, lh, "Angaben Verschattungselemente", 'B', 10)
+        cell(COL2_X, lh, 30, lh, KOPF_PDF_LABELS["BehangArt"], '', 9)
+        cell(COL3_X, lh, 35, lh, KOPF_PDF_LABELS["Kurbelstange"], '', 9)
+        # --- Farben Verschattungselemente ---
+        y_pos = lh * 3.5
+        cell(COL1_X, y_pos, 40, lh, "Farben Verschattungselemente", 'B', 10)
+        y_pos += lh
+        cell(COL2_X, y_pos, 30, lh, KOPF_PDF_LABELS["Farben_Behang"], '', 9)
+        cell(COL3_X, y_pos, 35, lh, KOPF_PDF_LABELS["Farben_Anschlagstopfen"], '', 9)
+        cell(COL4_X, y_pos, 40, lh, KOPF_PDF_LABELS["Farben_Endleiste"], '', 9)
+        cell(COL5_X, y_pos, 30, lh, KOPF_PDF_LABELS["Farben_Aussenkasten"], '', 9)
+        cell(COL6_X, y_pos, 30, lh, KOPF_PDF_LABELS["Farben_Reviblende"], '', 9)
+        cell(COL7_X, y_pos, 0, lh, KOPF_PDF_LABELS["Farben_Fuehrungsschiene"], '', 9)
+        # --- Farben Insektenschutz ---
+        y_pos = lh * 7
+        cell(COL1_X, y_pos, 40, lh, "Farben Insektenschutzelemente", 'B', 10)
+        y_pos += lh
+        cell(COL2_X, y_pos, 30, lh, KOPF_PDF_LABELS["Farben_Insekt_Element"], '', 9)
+        cell(COL3_X, y_pos, 35, lh, KOPF_PDF_LABELS["Farben_Insekt_Endleiste"], '', 9)
+        cell(COL4_X, y_pos, 40, lh, KOPF_PDF_LABELS["Farben_Insekt_Fuehrungsschiene"], '', 9)
+        # --- Hinweise ---
+        y_pos = lh * 11
+        cell(COL1_X, y_pos, 0, lh, "Hinweise zur getroffenen Farbauswahl:", 'B', 9)
+        for hint in KOPF_COLOR_HINTS:
+            y_pos += lh
+            cell(COL2_X, y_pos, 0, lh, hint, '', 9)
+
+    def _draw_kopf_values(self, canvas: _PageCanvas, kopf_data: Dict, hinweis_lines: List[str], y_top: float, y_bottom: float):
+        lh = PDF_LINE_HEIGHT
+        border = self.value_border
+
+        def value(x, y, w, key, default="", size=9):
+            canvas.cell(x, y, w, lh, str(kopf_data.get(key, default)), '', size, border=border)
+
+        y_pos = y_top + lh * 5.5
+        value(COL2_X, y_pos, 30, "Kundenadr.", "2144", size=8)
+        value(COL3_X, y_pos, 35, "Rechnungsadr.", "58", size=8)
+        value(COL4_X, y_pos, 30, "Lieferadr.", "58", size=8)
+        value(COL5_X, y_pos, 30, "AufBestAdr.", "58", size=8)
+
+        y_pos = y_top + lh * 9.5
+        value(COL2_X, y_pos, 30, "Bestelldatum")
+        value(COL3_X, y_pos, 35, "Auftragsname")
+        value(COL4_X, y_pos, 40, "Kunden-Auftrags-Nr")
+        value(COL5_X, y_pos, 40, "Wunsch-Liefertermin")
+        value(COL6_X, y_pos, 30, "Besteller")
+
+        y_pos = y_top + lh * 13
+        value(COL2_X, y_pos, 30, "Sonderausführung")
+        # Hinweistext as in multi_cell: one line per PDF_LINE_HEIGHT, underlined below the last line
+        canvas.text(COL4_X + CELL_MARGIN, y_pos + 0.5 * lh + 0.3 * 9 / MM, hinweis_lines, '', 9, line_spacing=lh)
+        if border:
+            hinweis_bottom = y_pos + len(hinweis_lines) * lh
+            canvas.line(COL4_X, hinweis_bottom, COL4_X + KOPF_HINWEIS_WIDTH, hinweis_bottom, 0.2)
+
+        y_pos = y_bottom + lh * 2
+        value(COL2_X, y_pos, 30, "BehangArt")
+        value(COL3_X, y_pos, 35, "Kurbelstange")
+
+        y_pos = y_bottom + lh * 5.5
+        value(COL2_X, y_pos, 30, "Farben_Behang")
+        value(COL3_X, y_pos, 35, "Farben_Anschlagstopfen")
+        value(COL4_X, y_pos, 40, "Farben_Endleiste")
+        value(COL5_X, y_pos, 30, "Farben_Aussenkasten")
+        value(COL6_X, y_pos, 30, "Farben_Reviblende")
+        value(COL7_X, y_pos, 0, "Farben_Fuehrungsschiene")
+
+        y_pos = y_bottom + lh * 9
+        value(COL2_X, y_pos, 30, "Farben_Insekt_Element")
+        value(COL3_X, y_pos, 35, "Farben_Insekt_Endleiste")
+        value(COL4_X, y_pos, 40, "Farben_Insekt_Fuehrungsschiene")
+
+    # --- Page 2+: Positionen ---
+    def layout_positionen_rows(self, positions_data: List[Dict], data_keys: List[str], col_widths: List[float]) -> List[tuple]:
+        """
+        Row plan [(wrapped lines per cell, row_height), ...] in the format of pdf_writer.paginate_rows.
+        The trailing position without width/height is left out, like in the other writers.
+        """
+        font = self.fonts[""]
+        row_plan = []
+        last_index = len(positions_data) - 1
+        for row_index, row_data in enumerate(positions_data):
+            if row_index == last_index and not row_data.get("FeBreite_11") and not row_data.get("FeHoehe_12"):
+                logging.info("Skipping last row due to empty 'FeBreite_11' and 'FeHoehe_12'.")
+                continue
+            cells = [_wrap_lines(str(row_data.get(key, '')), font, DATA_FONT_SIZE, width) for key, width in zip(data_keys, col_widths)]
+            row_plan.append((cells, max((len(lines) for lines in cells), default=1) * PDF_TABLE_ROW_HEIGHT))
+        return row_plan
+
+    def _draw_table_header(self, canvas: _PageCanvas, headers: List[str], col_widths: List[float]):
+        """ Rotated table header with its grid, drawn from Y=0 (placed above the rows of every Positionen page). """
+        font = self.fonts["B"]
+        size = 7
+        rotation_y = PDF_TABLE_HEADER_HEIGHT - 2
+        current_x = PDF_MARGIN
+        for header, width in zip(headers, col_widths):
+            # Lines laid out like the rotated multi_cell of the fpdf writer (centered in the header height),
+            # then turned 90° counter-clockwise around (center_x, rotation_y)
+            center_x = current_x + width / 2
+            lines = _header_word_wrap(header, font, size, PDF_TABLE_HEADER_HEIGHT - 4)
+            start_x_rotated = center_x - font.text_width(lines[0], size) / 2
+            for i, line in enumerate(lines):
+                line_x = start_x_rotated + (PDF_TABLE_HEADER_HEIGHT - font.text_width(line, size)) / 2
+                baseline = rotation_y + i * 3 + 1.5 + 0.3 * size / MM
+                canvas.text(center_x + (baseline - rotation_y), rotation_y - (line_x - center_x), line, 'B', size, rotate=90)
+            canvas.line(current_x, 0, current_x, PDF_TABLE_HEADER_HEIGHT, 0.2)
+            current_x += width
+        canvas.line(current_x, 0, current_x, PDF_TABLE_HEADER_HEIGHT, 0.2)
+        canvas.line(PDF_MARGIN, 0, current_x, 0, 0.2)
+        canvas.line(PDF_MARGIN, PDF_TABLE_HEADER_HEIGHT, current_x, PDF_TABLE_HEADER_HEIGHT, 0.2)
+
+    def draw_positionen_pages(self, row_pages: List[List[tuple]], headers: List[str], col_widths: List[float]):
+        template = self._template(("positionen_header", tuple(headers), tuple(col_widths)),
+                                  lambda canvas: self._draw_table_header(canvas, headers, col_widths))
+        total_w = sum(col_widths)
+        font_offset = 0.3 * DATA_FONT_SIZE / MM # Baseline below the vertical center of a line (as fpdf's cell)
+        page_top = PDF_MARGIN + PDF_PAGE_HEADER_HEIGHT
+        for page_index, page_rows in enumerate(row_pages):
+            canvas = self._new_page()
+            header_y = page_top + (PDF_POSITIONEN_TOP_GAP if page_index == 0 else 0)
+            canvas.place(template, header_y)
+
+            # One line list per column on the TEXT_GRID: a row of n lines has 2n slots; a single line sits
+            # in slot n (centered, like multi_cell with one line), line i of several lines in slot 2i+1
+            table_top = header_y + PDF_TABLE_HEADER_HEIGHT + 1
+            column_slots = [[] for _ in col_widths]
+            row_y = table_top
+            for cells, row_height in page_rows:
+                row_lines = int(round(row_height / PDF_TABLE_ROW_HEIGHT))
+                for lines, slots in zip(cells, column_slots):
+                    start = len(slots)
+                    slots.extend([""] * (2 * row_lines))
+                    if len(lines) == 1:
+                        slots[start + row_lines] = lines[0]
+                    else:
+                        slots[start + 1:start + 2 * len(lines):2] = lines
+                row_y += row_height
+                canvas.line(PDF_MARGIN, row_y, PDF_MARGIN + total_w, row_y, 0.1)
+            x = PDF_MARGIN
+            for width, slots in zip(col_widths, column_slots):
+                canvas.text(x + CELL_MARGIN, table_top + font_offset, slots, '', DATA_FONT_SIZE, line_spacing=TEXT_GRID)
+                x += width
+
+            if self.cell_borders: # 'LR' borders of all rows of the page, one line per column boundary
+                x = PDF_MARGIN
+                for width in col_widths + [0]:
+                    canvas.line(x, table_top, x, row_y, 0.1)
+                    x += width
+            self._finish_page(canvas)
+
+    def draw_no_positionen_page(self):
+        canvas = self._new_page()
+        canvas.cell(PDF_MARGIN, PDF_MARGIN + PDF_PAGE_HEADER_HEIGHT, PRINTABLE_WIDTH_L, 20, "Keine Positionen gefunden.", 'B', 12, align='C')
+        self._finish_page(canvas)
+
+    def render(self, kopf_data: Dict, positions_data: List[Dict]) -> bytes:
+        if positions_data:
+            headers, data_keys, col_widths = positionen_columns()
+            row_plan = self.layout_positionen_rows(positions_data, data_keys, col_widths)
+            row_pages = paginate_rows(row_plan, PDF_MARGIN + PDF_PAGE_HEADER_HEIGHT, PAGE_HEIGHT_L - PDF_MARGIN)
+            self.total_pages = 1 + len(row_pages)
+            self.draw_kopf_page(kopf_data)
+            self.draw_positionen_pages(row_pages, headers, col_widths)
+        else:
+            self.total_pages = 2
+            self.draw_kopf_page(kopf_data)
+            self.draw_no_positionen_page()
+        if self.embedded:
+            self.doc.subset_fonts()
+        try:
+            if self.compress: # Templates bring their own copies of the font dictionaries: merge duplicates, pack small objects
+                return self.doc.tobytes(garbage=3, deflate=True, use_objstms=1)
+            return self.doc.tobytes(garbage=1)
+        finally:
+            self.doc.close()
+
+
+def render_combined_pdf(kopf_data: Dict, positions_data: List[Dict], profile: str) -> bytes:
+    """ Renders the combined Bestellblatt PDF with PyMuPDF and returns the document bytes. """
+    return PyMuPDFBestellblatt(profile).render(kopf_data, positions_data or [])
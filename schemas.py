@@ -1,7 +1,7 @@
 # schemas.py
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional, Dict
+from typing import Optional, Dict, List
 import models # Import your SQLAlchemy models to reference the Enum
 
 class OutputFileBase(BaseModel):
@@ -28,4 +28,12 @@ class JobStatusResponse(BaseModel):
 
     class Config:
         orm_mode = True
-        use_enum_values = True # Important for serializing Enum members as strings
\ No newline at end of file
+        use_enum_values = True # Important for serializing Enum members as strings
+# Response models for the job listing (/jobs)
+class JobListItem(JobStatusResponse):
+    auftragsname: Optional[str] = None
+    kunden_auftrags_nr: Optional[str] = None
+
+class JobListResponse(BaseModel):
+    jobs: List[JobListItem] = []
+    next_cursor: Optional[str] = None # Pass as ?cursor= (with the same filters) for the next page; None on the last page
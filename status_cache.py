@@ -0,0 +1,78 @@
+# status_cache.py
+"""
+Short-lived in-process cache of /job_status/ responses (api_mainB). Front ends poll every second
+or two; instead of one query per poll, api_mainB's watcher re-reads all recently polled unfinished
+jobs in one query per JOB_EVENTS_POLL_SECONDS and confirms or replaces their entries here (the
+workers run elsewhere, so a status change they write reaches the cache through that query).
+An unfinished job's entry is only served while it is polled without a gap of TTL (so the watcher
+kept confirming it) and its last confirmation is younger than the TTL; if the watcher stalls,
+polls fall through to the database. Completed and failed are final states, so their entries
+are kept until evicted and never go stale. Used on the event loop only.
+"""
+import time
+from collections import OrderedDict
+
+import models
+from config import STATUS_CACHE_TTL_SECONDS, STATUS_CACHE_MAX_JOBS
+
+FINAL_STATUSES = (models.JobStatus.COMPLETED.value, models.JobStatus.FAILED.value)
+
+class StatusCache:
+    """ Bounded (least recently used evicted) job_id -> status response cache with hit-ratio counters; ttl 0 disables it. """
+    def __init__(self, ttl: float = STATUS_CACHE_TTL_SECONDS, max_jobs: int = STATUS_CACHE_MAX_JOBS):
+        self.ttl, self.max_jobs = ttl, max_jobs
+        self._entries = OrderedDict() # job_id -> [response, final, checked_at, last_read]
+        self._counters = {"hits": 0, "misses": 0, "confirmed": 0, "changed": 0, "invalidated": 0, "evicted": 0}
+
+    @staticmethod
+    def _is_final(response) -> bool:
+        status = response.status
+        return (status.value if isinstance(status, models.JobStatus) else status) in FINAL_STATUSES
+
+    def get(self, job_id: str):
+        """ The cached response, or None (miss) if there is none, it is older than the TTL or it went unwatched. """
+        entry = self._entries.get(job_id)
+        now = time.monotonic()
+        if entry is not None:
+            fresh = entry[1] or (now - entry[2] < self.ttl and now - entry[3] < self.ttl)
+            entry[3] = now # Polled: the watcher keeps confirming it
+            self._entries.move_to_end(job_id)
+            if fresh:
+                self._counters["hits"] += 1
+                return entry[0]
+        self._counters["misses"] += 1
+        return None
+
+    def put(self, job_id: str, response, checked_at: float):
+        """
+        Stores a response read from the database at checked_at (time.monotonic() before the query); an
+        older read than the cached one is ignored, so a slow query never overwrites a newer state.
+        """
+        if self.ttl <= 0:
+            return
+        entry = self._entries.get(job_id)
+        if entry is not None:
+            if checked_at < entry[2]:
+                return
+            self._counters["confirmed" if response == entry[0] else "changed"] += 1
+            entry[:3] = [response, self._is_final(response), checked_at]
+            return
+        self._entries[job_id] = [response, self._is_final(response), checked_at, time.monotonic()]
+        while len(self._entries) > self.max_jobs:
+            self._entries.popitem(last=False)
+            self._counters["evicted"] += 1
+
+    def invalidate(self, job_id: str):
+        if self._entries.pop(job_id, None) is not None:
+            self._counters["invalidated"] += 1
+
+    def watched_jobs(self) -> list:
+        """ Unfinished jobs polled within the TTL: the ones the watcher keeps confirming. """
+        since = time.monotonic() - self.ttl
+        return [job_id for job_id, entry in self._entries.items() if not entry[1] and entry[3] >= since]
+
+    def stats(self) -> dict:
+        lookups = self._counters["hits"] + self._counters["misses"]
+        return {"ttl_seconds": self.ttl, "max_jobs": self.max_jobs, "jobs": len(self._entries),
+                "watched": len(self.watched_jobs()), **self._counters,
+                "hit_ratio": round(self._counters["hits"] / lookups, 4) if lookups else None}
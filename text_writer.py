@@ -2,12 +2,21 @@
 # text_writer.py
 import logging
 import csv
+import io
 import pathlib
 from datetime import datetime
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Iterable, Iterator
 import os
 import re
-from config import KOPF_DEFAULTS, POS_COLS_DEFS
+import json
+import tempfile
+import threading
+from contextlib import contextmanager
+from config import KOPF_DEFAULTS, POS_COLS_DEFS, TXT_STREAM_BATCH_ROWS, TXT_STREAM_SPOOL_MAX_BYTES, ERP_IMPORT_DIR
+try:
+    import fcntl # POSIX: lock the daily import file across API/CLI processes
+except ImportError:
+    fcntl = None
 
 KOPF_TXT_LABELS = {
     'Kundennummer': 'Kundennummer',
@@ -47,32 +56,52 @@ def safe_get(data_dict: Dict, key: str, default: Any = '') -> Any:
     val = data_dict.get(key, default)
     return val if val is not None and val != '' else default
 
+# --- Order-level header inputs, collected one position at a time ---
+class TxtOrderFacts:
+    """IS-Rollo / Sonder state of an order; add() every position (including the last one)."""
+    def __init__(self):
+        self.has_is_rollo = False
+        self.is_sonder = False
+        self.max_width = 0
+        self.max_width_pos_id = None
+        self.first_pos = None
+
+    def add(self, pos: Dict):
+        if self.first_pos is None: self.first_pos = pos
+        if not self.has_is_rollo:
+            fehro_fs_text = safe_get(pos, 'FehroFS', '')
+            self.has_is_rollo = isinstance(fehro_fs_text, str) and "Insektenschutzrollo Fehro: Ja" in fehro_fs_text
+        # Width threshold (>= 2396 triggers Sonder)
+        breite_str = safe_get(pos, 'FeBreite_11', '0')
+        try:
+            width = int(breite_str) if breite_str else 0
+        except (ValueError, TypeError): return
+        if width >= 2396:
+            self.is_sonder = True
+            if self.max_width_pos_id is None or width > self.max_width:
+                self.max_width = width; self.max_width_pos_id = safe_get(pos, 'Pos', 'UNKNOWN')
+
+    def sonder_text(self) -> str:
+        if not self.is_sonder or self.max_width_pos_id == 'UNKNOWN': return "0"
+        fenster_nr_match = re.match(r'0*(\d+)', str(self.max_width_pos_id))
+        display_pos_num = fenster_nr_match.group(1) if fenster_nr_match else self.max_width_pos_id
+        return f"Pos.{display_pos_num}>{self.max_width-1}mm"
+
+    @classmethod
+    def of(cls, positions) -> 'TxtOrderFacts':
+        facts = cls()
+        for pos in positions: facts.add(pos)
+        return facts
+
 # --- Helper function to check for IS Rollo in any position ---
 def check_order_has_is_rollo(positions: List[Dict]) -> bool:
     # Check all positions *including* the last one for the header logic
-    for pos in positions:
-        fehro_fs_text = safe_get(pos, 'FehroFS', '')
-        if isinstance(fehro_fs_text, str) and "Insektenschutzrollo Fehro: Ja" in fehro_fs_text:
-            return True
-    return False
+    return TxtOrderFacts.of(positions).has_is_rollo
 
 # --- Helper function to check width threshold (>= 2396 triggers Sonder) ---
 def check_order_is_sonder(positions: List[Dict]) -> (bool, str):
-    max_width_pos_id = None; max_width = 0; sonder = False; sonder_text = "0"
-    # Check all positions *including* the last one for the header logic
-    for pos in positions:
-        breite_str = safe_get(pos, 'FeBreite_11', '0'); pos_id = safe_get(pos, 'Pos', 'UNKNOWN')
-        try:
-            width = int(breite_str) if breite_str else 0
-            if width >= 2396:
-                sonder = True
-                if max_width_pos_id is None or width > max_width : max_width = width; max_width_pos_id = pos_id
-        except (ValueError, TypeError): continue
-    if sonder and max_width_pos_id != 'UNKNOWN':
-        fenster_nr_match = re.match(r'0*(\d+)', str(max_width_pos_id))
-        display_pos_num = fenster_nr_match.group(1) if fenster_nr_match else max_width_pos_id
-        sonder_text = f"Pos.{display_pos_num}>{max_width-1}mm"
-    return sonder, sonder_text
+    facts = TxtOrderFacts.of(positions)
+    return facts.is_sonder, facts.sonder_text()
 
 # --- Helper function to format date dd.mm.yyyy ---
 def format_date_dmy_txt(date_str):
@@ -95,12 +124,336 @@ def get_konstruktion_code(zeich_text: Any, default: str = '0') -> str:
     if not isinstance(zeich_text, str): return default
     match = re.search(r'R\d+\/(\d+)', zeich_text); return match.group(1) if match else default
 
+# --- Helper to open the TXT target (file path or caller-provided sink) ---
+@contextmanager
+def _open_txt_target(output_path, sink=None):
+    """
+    Yields a text stream for csv.writer. Binary sinks are wrapped in a UTF-8 TextIOWrapper
+    that is detached (not closed) afterwards, so the caller keeps ownership of the sink.
+    """
+    if sink is None:
+        with open(output_path, 'w', newline='', encoding='utf-8') as txtfile:
+            yield txtfile
+    elif isinstance(sink, io.TextIOBase):
+        yield sink
+    else:
+        wrapper = io.TextIOWrapper(sink, encoding='utf-8', newline='')
+        try:
+            yield wrapper
+        finally:
+            wrapper.flush()
+            wrapper.detach()
+
+# --- Declarative TXT column spec ---
+# Each column is (name, source). Sources are plain tuples built with the col_* helpers below;
+# compile_txt_row_builder() turns a spec into one generated function, so the lookups,
+# code tables and conditions are resolved once per row instead of per append/if-chain.
+def col_const(value):
+    """Fixed value."""
+    return ('const', str(value))
+
+def col_get(key, default=''):
+    """record.get(key, default) as text (None stays 'None', like the Kopf fields always did)."""
+    return ('get', key, default)
+
+def col_field(key, default=''):
+    """safe_get(record, key, default) as text; default may be another source."""
+    return ('field', key, default)
+
+def col_date(key):
+    """format_date_dmy_txt(record.get(key, ''))."""
+    return ('date', key)
+
+def col_contains(key, codes, default='0', upper=False):
+    """Code of the first (substring, code) pair found in the field text."""
+    return ('contains', key, tuple(codes), default, upper)
+
+def col_exact(key, codes, default='0', normalize=False):
+    """codes[value] or default; normalize compares stripped, lower-cased text."""
+    return ('exact', key, tuple(sorted(codes.items())), default, normalize)
+
+def col_regex(key, pattern, default='0'):
+    """First group of pattern in the field text, or default."""
+    return ('regex', key, pattern, default)
+
+def col_row_number():
+    """1-based position of the record in the input list."""
+    return ('row_number',)
+
+def col_if(condition, then, otherwise):
+    """then if the condition source is truthy, else otherwise."""
+    return ('if', condition, then, otherwise)
+
+def _zeros(first: int, last: int):
+    return [(f"Spalte_{n}", col_const('0')) for n in range(first, last + 1)]
+
+# --- Code tables (Translation.xlsx) ---
+GESCHOSS_TXT_CODES = [('DACHGESCHOSS', '4'), ('OBERGESCHOSS', '3'), ('ERDGESCHOSS', '2'), ('KG', '1')] # First match wins
+ANTRIEB_TXT_CODES = [('Motor Becker E03', '23'), ('Motor Becker E22 mit NHK-Kit3', '24')]
+MEHRPREIS_ART_TXT_CODES = {'0': '9', '5': '2'} # WinkelFS_raw -> Mehrpreisposition-Art
+IS_ROLLO_MARKER = "Insektenschutzrollo Fehro: Ja"
+
+POS_HAS_IS_ROLLO = col_contains('FehroFS', [(IS_ROLLO_MARKER, True)], default=False)
+POS_LINKS = col_field('Anzahl_Links_13', '0')
+POS_RECHTS = col_field('Anzahl_Rechts_14', '0')
+
+# Header row; the record is the Kopf dict plus the order-level values of _txt_header_record()
+TXT_HEADER_COLUMNS = [
+    ('Kundennummer', col_get('Kundennummer', '2144')), # 1
+    ('Rechnungsadr', col_get('Rechnungsadr', '58')), # 2
+    ('Lieferadr', col_get('Lieferadr', '58')), # 3
+    ('AufBestAdr', col_get('AufBestAdr', '58')), # 4
+    ('VomDate', col_date('Bestelldatum')), # 5
+    ('Auftragsname', col_get('Auftragsname', '')), # 6
+    ('Kunden-Auftrag-Nr', col_get('Kunden-Auftrags-Nr', '')), # 7
+    ('Liefertermin', col_date('Wunsch-Liefertermin')), # 8
+    ('Besteller', col_get('Besteller', '')), # 9
+    ('Panzer', col_get('Panzer')), # 10
+    ('Anschlag', col_get('Anschlag')), # 11
+    ('FehroFS', col_get('FehroFS')), # 12
+    *_zeros(13, 17),
+    ('Endschiene', col_get('Endschiene')), # 18
+    *_zeros(19, 19),
+    ('Kurbel', col_get('Kurbel')), # 20
+    *_zeros(21, 22),
+    ('IS_Endschiene', col_if(col_get('order_has_is_rollo'), col_get('Endschiene'), col_const('0'))), # 23
+    ('IS_Fuehrungsschiene', col_if(col_get('order_has_is_rollo'), col_get('FehroFS'), col_const('0'))), # 24
+    ('IS_Element', col_if(col_get('order_has_is_rollo'), col_get('Panzer'), col_const('0'))), # 25
+    ('Besonderheiten', col_get('Besonderheiten')), # 26
+    ('LKW', col_const('LKW')), # 27
+    ('Sonder', col_if(col_get('is_sonder'), col_const('Ja'), col_const('Nein'))), # 28
+    ('SonderText', col_if(col_get('is_sonder'), col_get('SonderText'), col_const('0'))), # 29
+    *_zeros(30, 34),
+    ('Revision', col_get('Revision')), # 35
+]
+
+# Position rows (one per item, see write_auftrag_export_txt for the skipped last item)
+TXT_POSITION_COLUMNS = [
+    ('Importzeilen-Num', col_row_number()), # 1
+    ('Kernwand', col_const('13')), # 2
+    ('Geschoss', col_contains('Geschoss', GESCHOSS_TXT_CODES, upper=True)), # 3
+    ('Spalte_4', col_const('1')), ('Spalte_5', col_const('1')), # 4, 5
+    ('Fensteraufteilung', col_exact('Antriebsseite', {'beidseitig': '2'}, default='1', normalize=True)), # 6
+    ('Material FS', col_if(POS_HAS_IS_ROLLO, col_const('6'), col_const('5'))), # 7
+    ('Spalte_8', col_const('1')), # 8
+    *_zeros(9, 10),
+    ('FeBreite', col_field('FeBreite_11')), # 11
+    ('FeHoehe', col_field('FeHoehe_12')), # 12
+    ('Bedienung Links', POS_LINKS), # 13
+    ('Bedienung Rechts', POS_RECHTS), # 14
+    ('Spalte_15', col_const('Ja')), # 15
+    *_zeros(16, 16),
+    ('Konstruktion', col_regex('Zeichnung', r'R\d+\/(\d+)')), # 17
+    ('Behang', col_const('2')), # 18
+    ('Antrieb', col_contains('Antrieb', ANTRIEB_TXT_CODES)), # 19
+    *_zeros(20, 20),
+    ('Spalte_21', col_const('13')), ('Spalte_22', col_const('9')), # 21, 22
+    *_zeros(23, 30),
+    ('Positionsnummerierung', col_field('PosNr_31', col_row_number())), # 31
+    ('Spalte_32', col_const('Ja')), # 32
+    *_zeros(33, 35),
+    *[(f"ISS_{n}", col_if(POS_HAS_IS_ROLLO, col_const('1'), col_const('0'))) for n in (36, 37, 38)],
+    *_zeros(39, 40),
+    ('ISS Links', col_if(POS_HAS_IS_ROLLO, POS_LINKS, col_const('0'))), # 41
+    ('ISS Rechts', col_if(POS_HAS_IS_ROLLO, POS_RECHTS, col_const('0'))), # 42
+    ('Fensterbankart', col_const('0')), # 43
+    *[(f"Mehrpreis_{n}", col_const('0')) for n in (44, 45, 46)], # Typ/Anzahl/Preis
+    ('Mehrpreisposition-Art', col_exact('WinkelFS_raw', MEHRPREIS_ART_TXT_CODES)), # 47
+    ('Spalte_48', col_const('Nein')), # 48
+    *_zeros(49, 50),
+    ('ReviblendeArt', col_if(POS_HAS_IS_ROLLO, col_const('0'), col_const('1'))), # 51
+]
+
+# --- Spec compiler ---
+def compile_txt_row_builder(columns: List, name: str = 'build_row'):
+    """
+    Generates `name(record, index) -> list[str]` for a column spec. Every distinct source
+    becomes one local that is computed once per row, shared by all columns using it.
+    """
+    namespace = {'format_date_dmy_txt': format_date_dmy_txt}
+    preamble, locals_by_source = [], {}
+
+    def constant(value):
+        ref = f"_c{len(namespace)}"
+        namespace[ref] = value
+        return ref
+
+    def local(source, statements):
+        ref = f"v{len(locals_by_source)}"
+        preamble.extend(statement.format(v=ref) for statement in statements)
+        locals_by_source[source] = ref
+        return ref
+
+    def raw(source):
+        """Expression for the source value (not yet converted to text)."""
+        kind = source[0]
+        if kind == 'const':
+            return repr(source[1])
+        if kind == 'if':
+            return f"({text(source[2])} if {raw(source[1])} else {text(source[3])})"
+        if source in locals_by_source:
+            return locals_by_source[source]
+        if kind == 'row_number':
+            return local(source, ["{v} = str(index + 1)"])
+        if kind == 'get':
+            return local(source, [f"{{v}} = get({source[1]!r}, {constant(source[2])})"])
+        if kind == 'field':
+            default = source[2]
+            default_expr = raw(default) if isinstance(default, tuple) else constant(default)
+            return local(source, [f"{{v}} = get({source[1]!r})",
+                                  f"if {{v}} is None or {{v}} == '': {{v}} = {default_expr}"])
+        if kind == 'date':
+            return local(source, [f"{{v}} = format_date_dmy_txt(get({source[1]!r}, ''))"])
+        if kind == 'contains':
+            _, key, codes, default, upper = source
+            statements = [f"{{v}} = get({key!r})", "{v} = '' if {v} is None else str({v})"]
+            if upper: statements.append("{v} = {v}.upper()")
+            chain = " else ".join(f"{constant(code)} if {needle!r} in {{v}}" for needle, code in codes)
+            statements.append(f"{{v}} = {chain} else {constant(default)}" if codes else f"{{v}} = {constant(default)}")
+            return local(source, statements)
+        if kind == 'exact':
+            _, key, codes, default, normalize = source
+            table, default_ref = constant(dict(codes)), constant(default)
+            if normalize:
+                return local(source, [f"{{v}} = get({key!r})",
+                                      f"{{v}} = {table}.get({{v}}.strip().lower(), {default_ref}) if isinstance({{v}}, str) else {default_ref}"])
+            return local(source, [f"{{v}} = {table}.get(get({key!r}, ''), {default_ref})"])
+        if kind == 'regex':
+            _, key, pattern, default = source
+            compiled = constant(re.compile(pattern))
+            return local(source, [f"{{v}} = get({key!r})",
+                                  f"{{v}} = {compiled}.search({{v}}) if isinstance({{v}}, str) else None",
+                                  f"{{v}} = {{v}}.group(1) if {{v}} else {constant(default)}"])
+        raise ValueError(f"Unknown TXT column source: {source!r}")
+
+    def text(source):
+        """Expression for the column text; only raw record values need str()."""
+        expr = raw(source)
+        return f"str({expr})" if source[0] in ('get', 'field') else expr
+
+    fields = [text(source) for _, source in columns]
+    body = "".join(f"    {line}\n" for line in ["get = record.get", *preamble])
+    code = f"def {name}(record, index=0):\n{body}    return [{', '.join(fields)}]\n"
+    exec(compile(code, f"<txt column spec {name}>", "exec"), namespace)
+    builder = namespace[name]
+    builder.source = code
+    return builder
+
+build_txt_header_row = compile_txt_row_builder(TXT_HEADER_COLUMNS, 'build_txt_header_row')
+build_txt_position_row = compile_txt_row_builder(TXT_POSITION_COLUMNS, 'build_txt_position_row')
+
+# A joined row can be used as-is when csv.QUOTE_MINIMAL would not quote any field
+_TXT_QUOTE_CHARS = re.compile('["\r\n]')
+
+def _txt_line(fields: List[str]) -> str:
+    """One TXT line (with newline), csv-quoted only if a field needs it."""
+    line = DELIMITER.join(fields)
+    if line.count(DELIMITER) == len(fields) - 1 and not _TXT_QUOTE_CHARS.search(line):
+        return line + '\n'
+    buffer = io.StringIO()
+    csv.writer(buffer, delimiter=DELIMITER, quoting=csv.QUOTE_MINIMAL, lineterminator='\n').writerow(fields)
+    return buffer.getvalue()
+
+# --- Order-level values of the header row ---
+def _txt_header_record(kopf: Dict, facts: TxtOrderFacts) -> Dict:
+    """Kopf plus the colors, IS-Rollo/Sonder flags and texts the header columns refer to."""
+    # Header logic considers ALL positions (including the last one)
+    order_has_is_rollo = facts.has_is_rollo
+    is_sonder, sonder_text_generated = facts.is_sonder, facts.sonder_text()
+    first_pos = facts.first_pos or {}
+
+    besonderheiten_parts = []
+    if order_has_is_rollo: besonderheiten_parts.append("mit IS-Rollo")
+    fs_code = get_color_code(safe_get(first_pos, 'Farben_Fuehrungsschiene')); el_code = get_color_code(safe_get(first_pos, 'Farben_Endleist')); rev_code = get_color_code(safe_get(first_pos, 'Farben_Reviblende'))
+    if any(c and c not in ['hwf9006', 'hwf7016'] for c in [fs_code, el_code, rev_code]): besonderheiten_parts.append("+ RAL MP")
+
+    record = dict(kopf)
+    record.update({
+        # Colors from the mapped Kopf data, with defaults if missing
+        'Panzer': get_color_code(kopf.get('Farben_Behang')) or KOPF_DEFAULTS.get("Farben_Behang", 'silber'),
+        'Anschlag': get_color_code(kopf.get('Farben_Anschlagstopfen')) or KOPF_DEFAULTS.get("Farben_Anschlagstopfen", 'grau'),
+        'FehroFS': get_color_code(kopf.get('Farben_Fuehrungsschiene')) or KOPF_DEFAULTS.get("Farben_Fuehrungsschiene", '0'),
+        'Endschiene': get_color_code(kopf.get('Farben_Endleiste')) or KOPF_DEFAULTS.get("Farben_Endleiste", '0'),
+        'Kurbel': get_color_code(kopf.get('Kurbelstange')) or KOPF_DEFAULTS.get("Kurbelstange", 'grau'),
+        'Revision': get_color_code(kopf.get('Farben_Reviblende')) or KOPF_DEFAULTS.get("Farben_Reviblende", '0'),
+        'Besonderheiten': " ".join(besonderheiten_parts) if besonderheiten_parts else '0',
+        'SonderText': sonder_text_generated,
+        'order_has_is_rollo': order_has_is_rollo,
+        'is_sonder': is_sonder,
+    })
+    return record
+
+# --- Streaming TXT export ---
+def _iter_txt_position_lines(positions: Iterable[Dict]) -> Iterator[str]:
+    """Position lines; one item of look-ahead to skip the last item if it has no dimensions."""
+    previous, i = None, -1
+    for i, pos in enumerate(positions):
+        if previous is not None:
+            yield _txt_line(build_txt_position_row(previous, i - 1))
+        previous = pos
+    if previous is None:
+        return
+    if not safe_get(previous, 'FeBreite_11') and not safe_get(previous, 'FeHoehe_12'):
+        logging.info(f"Skipping last row due to empty 'FeBreite_11' and 'FeHoehe_12'.")
+        return
+    yield _txt_line(build_txt_position_row(previous, i))
+
+TXT_SPOOL_READ_CHARS = 64 * 1024
+
+def _batched_text(lines: Iterable[str], batch_rows: int) -> Iterator[str]:
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= batch_rows:
+            yield ''.join(batch); batch = []
+    if batch:
+        yield ''.join(batch)
+
+def iter_auftrag_export_txt(kopf: Dict, positions, batch_rows: int = TXT_STREAM_BATCH_ROWS,
+                            spool_max_bytes: int = TXT_STREAM_SPOOL_MAX_BYTES) -> Iterator[str]:
+    """
+    Yields the Auftrag Export TXT (header row, then position rows) as text chunks of `batch_rows` lines.
+    `positions` may be:
+      - a sequence or other re-iterable collection, or a zero-argument callable returning a fresh
+        iterator: iterated twice (header facts, then rows), so memory stays constant and the
+        header is sent as soon as the first pass is done;
+      - a one-shot iterator/generator: rows are built in a single pass into a spool
+        (SpooledTemporaryFile, on disk beyond `spool_max_bytes`) and streamed after the header.
+    Suitable as the body of an HTTP streaming response.
+    """
+    if callable(positions):
+        facts = TxtOrderFacts.of(positions())
+        yield _txt_line(build_txt_header_row(_txt_header_record(kopf, facts)))
+        yield from _batched_text(_iter_txt_position_lines(positions()), batch_rows)
+    elif iter(positions) is not positions:
+        facts = TxtOrderFacts.of(positions)
+        yield _txt_line(build_txt_header_row(_txt_header_record(kopf, facts)))
+        yield from _batched_text(_iter_txt_position_lines(positions), batch_rows)
+    else:
+        facts = TxtOrderFacts()
+        def observed():
+            for pos in positions:
+                facts.add(pos); yield pos
+        with tempfile.SpooledTemporaryFile(max_size=spool_max_bytes, mode='w+', encoding='utf-8', newline='') as spool:
+            rows_text_size = 0
+            for chunk in _batched_text(_iter_txt_position_lines(observed()), batch_rows):
+                spool.write(chunk); rows_text_size += len(chunk)
+            logging.info(f"Spooled {rows_text_size} characters of TXT position rows.")
+            yield _txt_line(build_txt_header_row(_txt_header_record(kopf, facts)))
+            spool.seek(0)
+            while chunk := spool.read(TXT_SPOOL_READ_CHARS):
+                yield chunk
+
 # --- Main TXT Writing Function ---
-def write_auftrag_export_txt(mapped_data: Dict, output_directory: pathlib.Path, base_filename: str) -> str | None:
+def write_auftrag_export_txt(mapped_data: Dict, output_directory: pathlib.Path = None, base_filename: str = None, sink=None):
     """
     Writes mapped data to a semicolon-delimited TXT file (data rows only)
     applying logic from Translation.xlsx and incorporating specific corrections.
+    The row layout is TXT_HEADER_COLUMNS / TXT_POSITION_COLUMNS; rows are written in
+    batches from iter_auftrag_export_txt, so "positionen" may also be an iterator.
     Skips the last position item.
+    If `sink` is given (text or binary file-like object), rows are written there
+    instead of to output_directory and the sink is returned.
     """
     kopf = mapped_data.get("kopf", {})
     positions = mapped_data.get("positionen", [])
@@ -109,161 +462,267 @@ def write_auftrag_export_txt(mapped_data: Dict, output_directory: pathlib.Path,
     logging.info(f"Kopf Data: {kopf}")
 
     try:
-        output_filename = f"{base_filename}.txt"
-        output_path = output_directory / output_filename
-        logging.info(f"Writing Auftrag Export TXT (Translation.xlsx logic + fixes): {output_path}")
-
-        # Header logic should still consider ALL positions (including the last one)
-        order_has_is_rollo = check_order_has_is_rollo(positions)
-        is_sonder, sonder_text_generated = check_order_is_sonder(positions)
-        first_pos = positions[0] if positions else {}
-
-        # --- Prepare Header Data Row (Applying Corrections) ---
-        header_data_row = []
-       # actual_panzer_color = get_color_code(safe_get(first_pos, 'Panzer')) or 'anthrazit'
-        actual_panzer_color = get_color_code(kopf.get('Farben_Behang', ''))
-        actual_fuehrung_color = get_color_code(kopf.get('Farben_Fuehrungsschiene', ''))
-        actual_endschiene_color = get_color_code(kopf.get('Farben_Endleiste', ''))
-        actual_revision_color = get_color_code(kopf.get('Farben_Reviblende', '')) 
-        
- # Prioritize colors from the mapped Kopf data
-#         # Provide sensible defaults if Kopf colors are missing
-        actual_panzer_color = get_color_code(kopf.get('Farben_Behang')) or KOPF_DEFAULTS.get("Farben_Behang", 'silber')
-        actual_fuehrung_color = get_color_code(kopf.get('Farben_Fuehrungsschiene')) or KOPF_DEFAULTS.get("Farben_Fuehrungsschiene", '0')
-        actual_endschiene_color = get_color_code(kopf.get('Farben_Endleiste')) or KOPF_DEFAULTS.get("Farben_Endleiste", '0')
-        actual_revision_color = get_color_code(kopf.get('Farben_Reviblende')) or KOPF_DEFAULTS.get("Farben_Reviblende", '0')
-        actual_anschlag_color = get_color_code(kopf.get('Farben_Anschlagstopfen')) or KOPF_DEFAULTS.get("Farben_Anschlagstopfen", 'grau')
-        actual_kurbel_color = get_color_code(kopf.get('Kurbelstange')) or KOPF_DEFAULTS.get("Kurbelstange", 'grau')
-        # Get IS colors from Kopf (used if order_has_is_rollo)
-        is_endschiene_color = get_color_code(kopf.get('Farben_Insekt_Endleiste')) or actual_endschiene_color # Fallback to standard
-        is_fuehrung_color = get_color_code(kopf.get('Farben_Insekt_Fuehrungsschiene')) or actual_fuehrung_color # Fallback to standard
-        is_element_color = get_color_code(kopf.get('Farben_Insekt_Element')) or actual_panzer_color # Fallback to standard
-
-        header_data_row.append(kopf.get( 'Kundennummer', '2144')) # 1
-        header_data_row.append(kopf.get( 'Rechnungsadr', '58')) # 2
-        header_data_row.append(kopf.get( 'Lieferadr', '58')) # 3
-        header_data_row.append(kopf.get( 'AufBestAdr', '58')) # 4
-        header_data_row.append(format_date_dmy_txt(kopf.get( 'Bestelldatum', ''))) # 5 Use VomDate
-        header_data_row.append(kopf.get( 'Auftragsname', '')) # 6
-        header_data_row.append(kopf.get( 'Kunden-Auftrags-Nr', '')) # 7 Use Bestnr <<< CORRECTED KEY
-        header_data_row.append(format_date_dmy_txt(kopf.get( 'Wunsch-Liefertermin', '')))# 8 Use Liefertermin <<< CORRECTED KEY
-        header_data_row.append(kopf.get('Besteller', '')) # 9
-
-        header_data_row.append(actual_panzer_color); header_data_row.append(actual_anschlag_color); # 10, 11
-        header_data_row.append(actual_fuehrung_color); header_data_row.extend(['0'] * 5); # 12-17
-        header_data_row.append(actual_endschiene_color); header_data_row.append('0'); # 18, 19
-        header_data_row.append(actual_kurbel_color); header_data_row.extend(['0'] * 2); # 20-22
-        header_data_row.append(actual_endschiene_color if order_has_is_rollo else '0'); # 23
-        header_data_row.append(actual_fuehrung_color if order_has_is_rollo else '0');   # 24
-        header_data_row.append(actual_panzer_color if order_has_is_rollo else '0');      # 25
-
-        besonderheiten_parts = []
-        if order_has_is_rollo: besonderheiten_parts.append("mit IS-Rollo")
-        fs_code = get_color_code(safe_get(first_pos, 'Farben_Fuehrungsschiene')); el_code = get_color_code(safe_get(first_pos, 'Farben_Endleist')); rev_code = get_color_code(safe_get(first_pos, 'Farben_Reviblende'))
-        if any(c and c not in ['hwf9006', 'hwf7016'] for c in [fs_code, el_code, rev_code]): besonderheiten_parts.append("+ RAL MP")
-        header_data_row.append(" ".join(besonderheiten_parts) if besonderheiten_parts else '0') # 26
-
-        header_data_row.append('LKW'); header_data_row.append('Ja' if is_sonder else 'Nein'); # 27, 28
-        header_data_row.append(sonder_text_generated if is_sonder else '0'); # 29
-        header_data_row.extend(['0'] * 5); header_data_row.append(actual_revision_color); # 30-35
-
-        # --- Write to File ---
-        with open(output_path, 'w', newline='', encoding='utf-8') as txtfile:
-            writer = csv.writer(txtfile, delimiter=DELIMITER, quoting=csv.QUOTE_MINIMAL, lineterminator='\n')
-            writer.writerow([str(x) for x in header_data_row]) # Write Header Row
-
-            # --- MODIFICATION HERE: Loop through positions[:-1] ---
-            # Write Position Data Rows (excluding the last item)
-            logging.info(f"Processing {len(positions)} position rows for TXT output.")
-            for i, pos in enumerate(positions):
-                # Check if "FeBreite_11" and "FeHoehe_12" are empty for the current position
-                if not safe_get(pos, 'FeBreite_11') and not safe_get(pos, 'FeHoehe_12'):
-                    if i == len(positions) - 1:  # Skip only if it's the last row
-                        logging.info(f"Skipping last row due to empty 'FeBreite_11' and 'FeHoehe_12'.")
-                        continue
-                
-            # --- END MODIFICATION ---
-                pos_data_row = []
-                # Determine if THIS specific position has IS Rollo
-                pos_has_is_rollo = isinstance(safe_get(pos, 'FehroFS', ''), str) and "Insektenschutzrollo Fehro: Ja" in safe_get(pos, 'FehroFS', '')
-                winkel_fs_raw = safe_get(pos, 'WinkelFS_raw', '')
-                # Get the Antriebsseite stored by the data_mapper
-                antrieb_seite_val = safe_get(pos, 'Antriebsseite', '')
-
-                # --- Field mapping applying Translation.xlsx logic + specific fixes ---
-                pos_data_row.append(str(i + 1)) # 1 Importzeilen-Num (1, 2, 3...)
-                pos_data_row.append('13')       # 2 Kernwand ('13')
-                # 3 Geschoss (Dynamic)
-                geschoss_text = safe_get(pos, 'Geschoss', '').upper(); geschoss_code = '0'
-                if 'DACHGESCHOSS' in geschoss_text: geschoss_code = '4'
-                elif 'OBERGESCHOSS' in geschoss_text: geschoss_code = '3'
-                elif 'ERDGESCHOSS' in geschoss_text: geschoss_code = '2'
-                elif 'KG' in geschoss_text: geschoss_code = '1'
-                pos_data_row.append(geschoss_code)
-
-                pos_data_row.append('1'); pos_data_row.append('1'); # 4, 5 ('1')
-                # 6 Fensteraufteilung <<< CORRECTED >>>
-                # Use the value stored by data_mapper
-                is_beidseitig = isinstance(antrieb_seite_val, str) and antrieb_seite_val.strip().lower() == 'beidseitig'
-                pos_data_row.append('2' if is_beidseitig else '1')
-
-                pos_data_row.append('6' if pos_has_is_rollo else '5') # 7 Material FS (Dynamic 5/6)
-                pos_data_row.append('1'); # 8 ('1')
-                pos_data_row.extend(['0'] * 2)  # 9, 10 ('0')
-                pos_data_row.append(safe_get(pos, 'FeBreite_11')) # 11 (Dynamic)
-                pos_data_row.append(safe_get(pos, 'FeHoehe_12'))  # 12 (Dynamic)
-                # 13/14 Bedienung L/R (Dynamic - VALUE FROM DATA_MAPPER)
-                links = safe_get(pos, 'Anzahl_Links_13', '0')
-                rechts = safe_get(pos, 'Anzahl_Rechts_14', '0')
-                pos_data_row.append(links); pos_data_row.append(rechts);
-
-                pos_data_row.append('Ja'); pos_data_row.append('0'); # 15, 16
-                # 17 Konstruktion (Dynamic)
-                pos_data_row.append(get_konstruktion_code(safe_get(pos, 'Zeichnung', ''), default='0'))
-                pos_data_row.append('2') # 18 Behang ('2')
-                # 19 Antrieb (Dynamic)
-                antrieb_text = safe_get(pos, 'Antrieb', ''); antrieb_code = '0'
-                if 'Motor Becker E03' in antrieb_text: antrieb_code = '23'
-                elif 'Motor Becker E22 mit NHK-Kit3' in antrieb_text: antrieb_code = '24'
-                pos_data_row.append(antrieb_code)
-
-                pos_data_row.append('0'); pos_data_row.append('13'); pos_data_row.append('9'); # 20, 21, 22
-                pos_data_row.extend(['0'] * 8) # 23-30 ('0')
-                # 31 Positionsnummerierung (0, 1, 2...)
-                pos_nr_31_value = safe_get(pos, 'PosNr_31', str(i + 1)) # Get mapped value, fallback to index+1
-                pos_data_row.append(pos_nr_31_value)
-
-                pos_data_row.append('Ja'); # 32 ('Ja')
-                pos_data_row.extend(['0'] * 3) # 33-35 ('0')
-
-                # 36-42 ISS Fields (Dynamic 0/1)
-                iss_flag = '1' if pos_has_is_rollo else '0'
-                pos_data_row.extend([iss_flag] * 3); # 36, 37, 38
-                pos_data_row.extend(['0'] * 2); # 39, 40
-                pos_data_row.append(links if pos_has_is_rollo else '0');  # 41
-                pos_data_row.append(rechts if pos_has_is_rollo else '0'); # 42
-
-               
-                # 43 Fensterbankart (optional) <<< SWAPPED >>>
-                pos_data_row.append('0')
-                # 44,45,46 Mehrpreis Typ/Anzahl/Preis
-                pos_data_row.extend(['0'] * 3) # ('0')
-                # 47 Mehrpreisposition-Art <<< SWAPPED >>>
-                mehrpreis_art = '0' # Default
-                if winkel_fs_raw == '0': mehrpreis_art = '9' # Corrected value for Winkel 0
-                elif winkel_fs_raw == '5': mehrpreis_art = '2' # Corrected value for Winkel 5
-                pos_data_row.append(mehrpreis_art)
-                # --- END SWAP ---
-
-                pos_data_row.append('Nein'); # 48 ('Nein')
-                pos_data_row.extend(['0'] * 2); # 49,50 ('0')
-                pos_data_row.append('0' if pos_has_is_rollo else '1'); # 51 ReviblendeArt (Dynamic 0/1)
-
-                writer.writerow([str(x) for x in pos_data_row]) # Write row
-
+        if sink is None:
+            output_filename = f"{base_filename}.txt"
+            output_path = output_directory / output_filename
+            logging.info(f"Writing Auftrag Export TXT (Translation.xlsx logic + fixes): {output_path}")
+        else:
+            output_path = None
+            logging.info("Writing Auftrag Export TXT (Translation.xlsx logic + fixes) to in-memory sink.")
+
+        # --- Write to File (or sink) ---
+        if hasattr(positions, '__len__'): logging.info(f"Processing {len(positions)} position rows for TXT output.")
+        with _open_txt_target(output_path, sink) as txtfile:
+            for chunk in iter_auftrag_export_txt(kopf, positions):
+                txtfile.write(chunk)
+
+        if sink is not None:
+            logging.info("Successfully wrote Auftrag Export TXT to in-memory sink.")
+            return sink
         logging.info(f"Successfully generated Auftrag Export TXT file (Translation.xlsx logic + Col Fixes, last row skipped): {output_path}")
         return str(output_path)
 
     except Exception as e:
         logging.error(f"Error writing Auftrag Export TXT file (Translation.xlsx logic + Col Fixes): {e}", exc_info=True)
-        return None
\ No newline at end of file
+        return None
+
+
+# --- Daily consolidated ERP import file ---
+# Many orders (header row + position rows each) are appended to one import file per day, so the ERP
+# runs one bulk import instead of one per order. Layout in ERP_IMPORT_DIR, per batch ("YYYYMMDD",
+# then "YYYYMMDD-2", ... if a day is rotated more than once):
+#   <batch>_AUFTRAGEXPORT.txt.part   open batch, orders are appended here
+#   <batch>_AUFTRAGEXPORT.txt        rotated batch (os.replace of the .part), ready for the ERP
+#   <batch>_AUFTRAGEXPORT.index.json order boundaries: key, byte offset, length, rows
+# The index is replaced atomically after every append; bytes past the last indexed order
+# (an interrupted append) are cut off before the next write. Only open batches are ever rewritten.
+_DAILY_IMPORT_THREAD_LOCK = threading.Lock()
+_DAILY_IMPORT_SUFFIX = "_AUFTRAGEXPORT.txt"
+
+def _daily_import_paths(directory: pathlib.Path, batch: str):
+    """(final, part, index) paths of a batch."""
+    final = directory / f"{batch}{_DAILY_IMPORT_SUFFIX}"
+    return final, final.with_name(final.name + ".part"), directory / f"{batch}_AUFTRAGEXPORT.index.json"
+
+def _day_batches(directory: pathlib.Path, day: str) -> List[str]:
+    """Batches of a day that have an index, oldest first."""
+    batches = [path.name[:-len("_AUFTRAGEXPORT.index.json")] for path in directory.glob(f"{day}*_AUFTRAGEXPORT.index.json")]
+    batches = [batch for batch in batches if batch == day or re.fullmatch(rf"{day}-\d+", batch)]
+    return sorted(batches, key=lambda batch: int(batch.partition('-')[2] or 1))
+
+@contextmanager
+def _daily_import_lock(directory: pathlib.Path):
+    directory.mkdir(parents=True, exist_ok=True)
+    with _DAILY_IMPORT_THREAD_LOCK, open(directory / ".daily_import.lock", "a") as lock_file:
+        if fcntl: fcntl.flock(lock_file, fcntl.LOCK_EX) # Released when the file is closed
+        yield
+
+def _load_daily_index(index_path: pathlib.Path, batch: str) -> Dict:
+    if index_path.exists():
+        with open(index_path, encoding='utf-8') as index_file:
+            return json.load(index_file)
+    return {"batch": batch, "orders": []}
+
+def _replace_file(path: pathlib.Path, write_fn):
+    """Writes via a temporary file in the same directory and os.replace()s it into place."""
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, 'wb') as tmp_file:
+            write_fn(tmp_file)
+            tmp_file.flush(); os.fsync(tmp_file.fileno())
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists(): tmp_path.unlink()
+
+def _save_daily_index(index_path: pathlib.Path, index: Dict):
+    _replace_file(index_path, lambda f: f.write(json.dumps(index, indent=1).encode('utf-8')))
+
+def _indexed_size(index: Dict) -> int:
+    return max((entry["offset"] + entry["length"] for entry in index["orders"]), default=0)
+
+def _daily_order_key(kopf: Dict) -> str:
+    return f"{kopf.get('Auftragsname', '')}_{kopf.get('Kunden-Auftrags-Nr', '')}"
+
+def _compacted(orders: List[Dict]) -> List[Dict]:
+    """Index entries with the offsets they get when stored back to back in list order."""
+    compacted, offset = [], 0
+    for entry in orders:
+        compacted.append({**entry, "offset": offset}); offset += entry["length"]
+    return compacted
+
+def _rewrite_without(data_path: pathlib.Path, index_path: pathlib.Path, index: Dict, order_key: str) -> bool:
+    """
+    Drops an order's byte range from an open batch file and shifts the offsets of the following orders.
+    The index marks the rewrite as pending before the data file is replaced, so _check_open_batch can
+    finish it if the process dies between the two.
+    """
+    if not any(entry["key"] == order_key for entry in index["orders"]): return False
+    kept = [entry for entry in index["orders"] if entry["key"] != order_key]
+
+    def copy_kept(tmp_file):
+        with open(data_path, 'rb') as data_file:
+            for entry in kept:
+                data_file.seek(entry["offset"])
+                remaining = entry["length"]
+                while remaining:
+                    chunk = data_file.read(min(remaining, TXT_SPOOL_READ_CHARS))
+                    if not chunk: raise IOError(f"{data_path.name} is shorter than its index")
+                    tmp_file.write(chunk); remaining -= len(chunk)
+    index["rewrite"] = order_key
+    _save_daily_index(index_path, index)
+    _replace_file(data_path, copy_kept)
+    index["orders"] = _compacted(kept)
+    del index["rewrite"]
+    _save_daily_index(index_path, index)
+    return True
+
+def _check_open_batch(part: pathlib.Path, index_path: pathlib.Path, index: Dict):
+    """
+    Makes an open batch file and its index agree before they are used; caller holds the lock.
+    Finishes a rewrite interrupted after the data file was replaced, cuts off bytes past the last
+    indexed order (an interrupted append) and refuses a file shorter than its index.
+    """
+    size = part.stat().st_size if part.exists() else 0
+    if "rewrite" in index:
+        kept = [entry for entry in index["orders"] if entry["key"] != index["rewrite"]]
+        if size == sum(entry["length"] for entry in kept): # Data file already replaced
+            logging.warning(f"Completing interrupted removal of order {index['rewrite']} from {part.name}.")
+            index["orders"] = _compacted(kept)
+        del index["rewrite"]
+        _save_daily_index(index_path, index)
+    if size > _indexed_size(index):
+        logging.warning(f"Truncating incomplete append at the end of {part.name}.")
+        with open(part, 'rb+') as part_file: part_file.truncate(_indexed_size(index))
+    elif size < _indexed_size(index):
+        raise IOError(f"{part.name} ({size} bytes) is shorter than its index ({_indexed_size(index)} bytes)")
+
+def _rotate_batch(directory: pathlib.Path, batch: str) -> pathlib.Path | None:
+    final, part, _ = _daily_import_paths(directory, batch)
+    if not part.exists(): return None
+    with open(part, 'rb+') as part_file:
+        os.fsync(part_file.fileno())
+    os.replace(part, final)
+    logging.info(f"Rotated daily ERP import file -> {final}")
+    return final
+
+def _rotate_open_batches(directory: pathlib.Path, rotate_day) -> List[str]:
+    """Rotates the open batches whose day (YYYYMMDD) satisfies rotate_day(day); caller holds the lock."""
+    rotated = []
+    for part in sorted(directory.glob(f"*{_DAILY_IMPORT_SUFFIX}.part")):
+        batch = part.name[:-len(f"{_DAILY_IMPORT_SUFFIX}.part")]
+        if rotate_day(batch.partition('-')[0]):
+            final = _rotate_batch(directory, batch)
+            if final: rotated.append(str(final))
+    return rotated
+
+def rotate_daily_import(directory: pathlib.Path = None, day: str = None) -> List[str]:
+    """
+    Finalizes open daily import batches (.part -> .txt, atomic rename) so the ERP can pick them up.
+    day=None rotates every open batch of earlier days; day='YYYYMMDD' rotates that day's open batch.
+    Returns the finalized file paths.
+    """
+    directory = pathlib.Path(directory or ERP_IMPORT_DIR)
+    today = datetime.now().strftime("%Y%m%d")
+    try:
+        with _daily_import_lock(directory):
+            return _rotate_open_batches(directory, (lambda batch_day: batch_day < today) if day is None else (lambda batch_day: batch_day == day))
+    except Exception as e:
+        logging.error(f"Error rotating daily ERP import files in {directory}: {e}", exc_info=True)
+        return []
+
+def append_order_to_daily_import(mapped_data: Dict, directory: pathlib.Path = None, order_key: str = None, day: str = None):
+    """
+    Appends one order (header row + position rows, as write_auftrag_export_txt writes them) to the
+    day's consolidated ERP import file and records its byte range in the batch index.
+    An order that is already in the open batch is replaced (re-export). Open batches of earlier
+    days (before `day`) are rotated first. order_key defaults to "<Auftragsname>_<Kunden-Auftrags-Nr>".
+    Returns the path of the open batch file, or None on error.
+    """
+    kopf = mapped_data.get("kopf", {})
+    positions = mapped_data.get("positionen", [])
+    if not kopf and not positions: logging.warning("No Kopf/Pos data for TXT."); return None
+    directory = pathlib.Path(directory or ERP_IMPORT_DIR)
+    day = day or datetime.now().strftime("%Y%m%d")
+    order_key = order_key or _daily_order_key(kopf)
+
+    try:
+        with _daily_import_lock(directory):
+            _rotate_open_batches(directory, lambda batch_day: batch_day < day)
+            # Open batch of the day, or the next batch if the day was already rotated
+            batches = _day_batches(directory, day)
+            batch = batches[-1] if batches else day
+            final, part, index_path = _daily_import_paths(directory, batch)
+            if final.exists():
+                batch = f"{day}-{len(batches) + 1}"
+                final, part, index_path = _daily_import_paths(directory, batch)
+            index = _load_daily_index(index_path, batch)
+
+            _check_open_batch(part, index_path, index)
+            if part.exists() and _rewrite_without(part, index_path, index, order_key):
+                logging.info(f"Replacing order {order_key} in daily ERP import {part.name}.")
+
+            offset = _indexed_size(index)
+            length = rows = 0
+            with open(part, 'ab') as part_file:
+                for chunk in iter_auftrag_export_txt(kopf, positions):
+                    data = chunk.encode('utf-8')
+                    part_file.write(data); length += len(data); rows += chunk.count('\n')
+                part_file.flush(); os.fsync(part_file.fileno())
+            index["orders"].append({"key": order_key, "offset": offset, "length": length, "rows": rows,
+                                    "appended": datetime.now().isoformat(timespec='seconds')})
+            _save_daily_index(index_path, index)
+
+        logging.info(f"Appended order {order_key} ({rows} rows, {length} bytes at offset {offset}) to daily ERP import {part}")
+        return str(part)
+    except Exception as e:
+        logging.error(f"Error appending order {order_key} to daily ERP import: {e}", exc_info=True)
+        return None
+
+def _find_daily_order(directory: pathlib.Path, day: str, order_key: str):
+    """(data path, index path, index, entry) of the newest batch of the day containing the order."""
+    for batch in reversed(_day_batches(directory, day)):
+        final, part, index_path = _daily_import_paths(directory, batch)
+        index = _load_daily_index(index_path, batch)
+        if part.exists(): _check_open_batch(part, index_path, index)
+        for entry in index["orders"]:
+            if entry["key"] == order_key:
+                return (part if part.exists() else final), index_path, index, entry
+    return None
+
+def read_order_from_daily_import(order_key: str, directory: pathlib.Path = None, day: str = None) -> str | None:
+    """Rows of one order from a daily import file (for a single-order re-export), or None."""
+    directory = pathlib.Path(directory or ERP_IMPORT_DIR)
+    day = day or datetime.now().strftime("%Y%m%d")
+    try:
+        with _daily_import_lock(directory):
+            found = _find_daily_order(directory, day, order_key)
+            if not found: logging.warning(f"Order {order_key} not found in daily ERP import {day}."); return None
+            data_path, _, _, entry = found
+            with open(data_path, 'rb') as data_file:
+                data_file.seek(entry["offset"])
+                return data_file.read(entry["length"]).decode('utf-8')
+    except Exception as e:
+        logging.error(f"Error reading order {order_key} from daily ERP import: {e}", exc_info=True)
+        return None
+
+def remove_order_from_daily_import(order_key: str, directory: pathlib.Path = None, day: str = None) -> bool:
+    """
+    Removes one order from the newest batch of the day that contains it (file rewritten atomically).
+    Only open (.part) batches are changed; False if the order is only in a rotated batch.
+    """
+    directory = pathlib.Path(directory or ERP_IMPORT_DIR)
+    day = day or datetime.now().strftime("%Y%m%d")
+    try:
+        with _daily_import_lock(directory):
+            found = _find_daily_order(directory, day, order_key)
+            if not found: logging.warning(f"Order {order_key} not found in daily ERP import {day}."); return False
+            data_path, index_path, index, _ = found
+            if not data_path.name.endswith(".part"): # Rotated: handed off to the ERP, which may have imported it
+                logging.warning(f"Order {order_key} is in rotated daily ERP import {data_path.name}; not removed.")
+                return False
+            _rewrite_without(data_path, index_path, index, order_key)
+        logging.info(f"Removed order {order_key} from daily ERP import {data_path}")
+        return True
+    except Exception as e:
+        logging.error(f"Error removing order {order_key} from daily ERP import: {e}", exc_info=True)
+        return False
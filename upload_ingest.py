@@ -0,0 +1,98 @@
+# upload_ingest.py
+"""
+Single-pass ingest of uploaded order PDFs. The body is read once, in chunks, while it is
+hashed (SHA-256), size-limited, checked for the %PDF header and written to its destination;
+the complete file is then sniffed with PyMuPDF (page count, D&M KG markers on page 1)
+without a full parse. Rejected uploads raise UploadRejected before any processing starts.
+"""
+import hashlib
+import io
+import logging
+import pathlib
+import re
+import time
+
+import fitz # PyMuPDF
+
+from config import PDF_MARKERS, UPLOAD_MAX_BYTES, UPLOAD_MAX_PAGES, UPLOAD_CHUNK_BYTES, UPLOAD_PAGE1_MARKERS
+
+PDF_MAGIC = b"%PDF-"
+PDF_MAGIC_WINDOW = 1024 # Readers accept the header anywhere in the first 1024 bytes
+
+class UploadRejected(Exception):
+    """ Upload that must not be processed; status_code/detail are meant for the HTTP response. """
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+class IngestedUpload:
+    """ Result of ingest_pdf_stream: file identity plus what the sniff found. """
+    def __init__(self, sha256: str, size: int, page_count: int, path: pathlib.Path = None, content: bytes = None):
+        self.sha256 = sha256
+        self.size = size
+        self.page_count = page_count
+        self.path = path # Set if the upload was written to dest_path
+        self.content = content # Set for in-memory ingest
+
+def _sniff_pdf(source, filename: str) -> int:
+    """ Opens the PDF without parsing the order: page count, encryption and the page-1 markers. Returns the page count. """
+    try:
+        doc = fitz.open(stream=source, filetype="pdf") if isinstance(source, bytes) else fitz.open(source)
+    except Exception as e:
+        raise UploadRejected(422, f"{filename} is not a readable PDF: {e}")
+    try:
+        if doc.needs_pass:
+            raise UploadRejected(422, f"{filename} is encrypted.")
+        if doc.page_count == 0:
+            raise UploadRejected(422, f"{filename} has no pages.")
+        if doc.page_count > UPLOAD_MAX_PAGES:
+            raise UploadRejected(413, f"{filename} has {doc.page_count} pages (limit {UPLOAD_MAX_PAGES}).")
+        page1_text = doc[0].get_text("text")
+        missing = [marker for marker in UPLOAD_PAGE1_MARKERS if not re.search(PDF_MARKERS[marker], page1_text)]
+        if missing:
+            raise UploadRejected(422, f"{filename} does not look like a D&M KG order (page 1 lacks {', '.join(missing)}).")
+        return doc.page_count
+    finally:
+        doc.close()
+
+def ingest_pdf_stream(stream, dest_path: pathlib.Path = None, filename: str = "upload", max_bytes: int = UPLOAD_MAX_BYTES) -> IngestedUpload:
+    """
+    Reads `stream` (binary file-like) once: SHA-256, size limit and %PDF check per chunk, copying
+    to `dest_path` (or into memory if None). Raises UploadRejected (413 too large, 415 not a PDF,
+    422 unreadable/not an order); a partially written dest_path is removed.
+    """
+    start = time.perf_counter()
+    digest = hashlib.sha256()
+    size = 0
+    head = b""
+    out = open(dest_path, "wb") if dest_path is not None else io.BytesIO()
+    try:
+        try:
+            while chunk := stream.read(UPLOAD_CHUNK_BYTES):
+                if len(head) < PDF_MAGIC_WINDOW:
+                    head += chunk[:PDF_MAGIC_WINDOW - len(head)]
+                    if len(head) >= PDF_MAGIC_WINDOW and PDF_MAGIC not in head:
+                        raise UploadRejected(415, f"{filename} is not a PDF (no %PDF header).")
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadRejected(413, f"{filename} exceeds the upload limit of {max_bytes // (1024 * 1024)} MB.")
+                digest.update(chunk)
+                out.write(chunk)
+            if size == 0:
+                raise UploadRejected(400, f"{filename} is empty.")
+            if PDF_MAGIC not in head:
+                raise UploadRejected(415, f"{filename} is not a PDF (no %PDF header).")
+            content = out.getvalue() if dest_path is None else None
+        finally:
+            out.close()
+        page_count = _sniff_pdf(content if dest_path is None else str(dest_path), filename)
+    except UploadRejected as e:
+        if dest_path is not None:
+            pathlib.Path(dest_path).unlink(missing_ok=True)
+        logging.warning(f"Upload rejected after {(time.perf_counter() - start) * 1000:.1f} ms ({size} bytes read): {e.detail}")
+        raise
+
+    upload = IngestedUpload(digest.hexdigest(), size, page_count, pathlib.Path(dest_path) if dest_path is not None else None, content)
+    logging.info(f"Ingested {filename}: {size} bytes, {page_count} pages, sha256 {upload.sha256[:12]}... in {(time.perf_counter() - start) * 1000:.1f} ms")
+    return upload